@@ -0,0 +1,314 @@
+"""ASGI entry point with an async MySQL pool.
+
+    hypercorn asgi_app:app --workers 2
+
+/country_data, /state_data, /compare_states, /compare_data_aggregated and
+/global_stats are served by the Quart app below, with the same request
+bodies and responses as flask_app; a request's independent queries are
+awaited together instead of taking a thread each. Every other route
+(signup, login, saved graphs, batch, admin endpoints) is handed to the
+Flask app unchanged.
+"""
+import asyncio
+import time
+from functools import wraps
+
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, Response, g, jsonify, request
+from quart.wrappers.response import DataBody
+from quart_cors import cors
+
+import flask_app
+from async_db import create_async_pool, db_errors, timed_fetch
+from compare_stats import (comparison_query, fill_missing, resolve_indicators,
+                           state_comparison_query, UnknownIndicator)
+from country_profile import PROFILE_QUERIES, server_timing_header
+from db_pool import PoolTimeout
+from encoding import (COMPRESS_MIN_BYTES, COMPRESS_RESPONSES, COMPRESSIBLE, FastJSONProvider, choose_encoding,
+                      compressed, orjson, shaped)
+from instrumentation import METRICS_ENABLED, metrics
+from query_catalog import UnknownOption, validate, validate_years
+from result_cache import (CACHE_ENABLED, add_validators, body_scope, cache, is_error, mark_error, query_body,
+                          request_key)
+from state_profile import PROFILE_QUERIES as STATE_PROFILE_QUERIES
+from streaming import MIMETYPES, STREAM_CHUNK_ROWS, encode_chunk, stream_format
+
+
+quart_app = cors(Quart(__name__))
+if orjson is not None:
+    quart_app.json = FastJSONProvider(quart_app)
+DB_ERRORS = db_errors()
+pool = None
+
+
+@quart_app.before_serving
+async def open_pool():
+    global pool
+    pool = await create_async_pool()
+    # Reference data, the map index and WARM_PROFILES, as python flask_app.py does
+    await asyncio.to_thread(flask_app.warm_up)
+
+
+@quart_app.after_serving
+async def close_pool():
+    await pool.close()
+
+
+if METRICS_ENABLED:
+    # Same series as the Flask routes; /metrics itself is served by the Flask app
+    @quart_app.before_request
+    async def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @quart_app.after_request
+    async def record_request(response):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.observe_request(route, request.method, response.status_code,
+                                time.perf_counter() - g.request_start)
+        if isinstance(response.response, DataBody):
+            size = getattr(response, "serialized_length", None)
+            metrics.observe_size(route, len(await response.get_data()) if size is None else size)
+        return response
+
+
+if COMPRESS_RESPONSES:
+    @quart_app.after_request
+    async def compress_response(response):
+        # Buffered bodies only; streamed /global_stats goes out uncompressed here
+        if (response.status_code != 200 or response.mimetype not in COMPRESSIBLE
+                or "Content-Encoding" in response.headers or not isinstance(response.response, DataBody)):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings)
+        body = await response.get_data()
+        if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+            return response
+        # Uncompressed size for the response-size metric, recorded after this hook
+        response.serialized_length = len(body)
+        response.set_data(compressed(cache, response, body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+@quart_app.errorhandler(PoolTimeout)
+async def pool_timeout(err):
+    return jsonify({"error": str(err)}), 503
+
+
+@quart_app.route('/async_pool_stats', methods=['GET'])
+async def async_pool_stats():
+    return jsonify(pool.stats())
+
+
+async def request_body():
+    if request.method == "GET":
+        return query_body(request.args)
+    return await request.get_json(silent=True)
+
+
+def cached_response(*tables, scope=None):
+    """Async counterpart of result_cache.cached_response, sharing its cache and ETags."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            body = await request_body()
+            key = request_key(request.path, body)
+            tag = cache.etag(tables, key)
+            if request.method == "GET" and request.if_none_match.contains_weak(tag):
+                response = Response("", status=304)
+                add_validators(response, tag)
+                return response
+
+            cached = cache.get(key) if CACHE_ENABLED else None
+            if cached is not None:
+                response = Response(cached, mimetype="application/json")
+                response.headers["X-Cache"] = "HIT"
+                response.cache_key = key
+                add_validators(response, tag)
+                return response
+
+            response = await view(*args, **kwargs)
+            if isinstance(response, tuple):
+                return response
+            if not isinstance(response.response, DataBody):
+                add_validators(response, tag)
+                return response
+            if not is_error(response):
+                if CACHE_ENABLED:
+                    cache.put(key, await response.get_data(), tables, scope(body) if scope is not None else None)
+                    response.cache_key = key
+                add_validators(response, tag)
+            if CACHE_ENABLED:
+                response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
+
+
+@quart_app.route('/country_data', methods=['GET', 'POST'])
+@cached_response("Country", "SectoralEconomicImpact", "NationalEconomicImpact", "NaturalDisaster", "DirectDamage",
+                 scope=body_scope(country="country"))
+async def country_data():
+    data = await request_body() or {}
+    country = data.get('country')
+    if not country:
+        return jsonify({"error": "Country is required"}), 400
+
+    start = time.perf_counter()
+    try:
+        stages = await asyncio.gather(*(
+            timed_fetch(pool, sql, (country,), one=(fetch == "one"))
+            for fetch, sql in PROFILE_QUERIES.values()
+        ))
+    except DB_ERRORS as err:
+        return mark_error(jsonify({"error": str(err)}))
+
+    profile = {}
+    timings = {}
+    for name, (rows, query_ms) in zip(PROFILE_QUERIES, stages):
+        profile[name] = rows
+        timings[name] = query_ms
+    timings["total"] = (time.perf_counter() - start) * 1000
+    response = jsonify(shaped(profile, data))
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
+@quart_app.route('/state_data', methods=['GET', 'POST'])
+@cached_response("State", "StateIndustryGrowth", "StateEconomicTotals", "StateDisasters")
+async def state_data():
+    data = await request_body() or {}
+    state = data.get('state')
+    if not state:
+        return jsonify({"error": "State is required"}), 400
+
+    try:
+        sections = await asyncio.gather(*(
+            pool.fetch(sql, (state,), one=(fetch == "one"))
+            for fetch, sql in STATE_PROFILE_QUERIES.values()
+        ))
+    except DB_ERRORS as err:
+        return mark_error(jsonify({"error": str(err)}))
+    return jsonify(shaped(dict(zip(STATE_PROFILE_QUERIES, sections)), data))
+
+
+@quart_app.route('/compare_states', methods=['POST'])
+@cached_response("State", "StateEconomicTotals", "StateDisasters")
+async def compare_states():
+    data = await request.get_json(silent=True) or {}
+    states = data.get('states')
+    start_year = data.get('startYear')
+    end_year = data.get('endYear')
+
+    if not all([states, start_year, end_year]):
+        return jsonify({"error": "Missing required parameters"}), 400
+
+    try:
+        rows = await pool.fetch(*state_comparison_query(states, start_year, end_year))
+    except DB_ERRORS as err:
+        return jsonify({"error": str(err)}), 500
+
+    by_state = {row['StateName'].lower(): row for row in rows}
+    return jsonify(shaped([by_state[state.lower()] for state in states if by_state.get(state.lower())], data))
+
+
+@quart_app.route('/compare_data_aggregated', methods=['POST'])
+@cached_response("NationalEconomicImpact", "SectoralEconomicImpact", "NaturalDisaster", "DirectDamage",
+                 scope=body_scope(countries="countries", years=True))
+async def compare_data_aggregated():
+    data = await request.get_json(silent=True) or {}
+    countries = data.get('countries')
+    indicators = data.get('indicators')
+    start_year = data.get('startYear')
+    end_year = data.get('endYear')
+    disaster_types = data.get('disasterTypes')
+
+    if not all([countries, indicators, start_year, end_year, disaster_types]):
+        return jsonify({"error": "Missing required parameters"}), 400
+
+    try:
+        aliases = resolve_indicators(indicators)
+    except UnknownIndicator as err:
+        return jsonify({"error": str(err)}), 400
+
+    try:
+        results = await pool.fetch(*comparison_query(countries, aliases, start_year, end_year, disaster_types))
+    except DB_ERRORS as err:
+        return jsonify({"error": str(err)}), 500
+    return jsonify(shaped(fill_missing(results, countries, aliases), data))
+
+
+@quart_app.route('/global_stats', methods=['GET', 'POST'])
+@cached_response("NaturalDisaster", "DirectDamage", "NationalEconomicImpact", "SectoralEconomicImpact",
+                 scope=body_scope(years=True))
+async def global_stats():
+    data = await request_body() or {}
+    query = (
+        data.get('startYear'),
+        data.get('endYear'),
+        data.get('disasterTypes', []),
+        data.get('indicators', []),
+        data.get('aggregateBy', 'Disaster Types'),
+        data.get('sortOption', 'Year (Ascending)'),
+    )
+    stream = stream_format(data)
+    try:
+        indicators = validate(query[3], query[4], query[5])
+        validate_years(query[0], query[1])
+    except (UnknownIndicator, UnknownOption) as err:
+        return jsonify({"error": str(err)}), 400
+    query = query[:3] + (indicators,) + query[4:]
+
+    def has_indicator(row):
+        return any(row.get(ind) is not None for ind in indicators)
+
+    if flask_app.columnar_stats is not None:
+        # In-memory engine; pandas work stays off the event loop
+        result = await asyncio.to_thread(flask_app.columnar_stats.query, *query)
+        if not stream:
+            return jsonify(shaped(result, data))
+        chunks = _list_chunks(result)
+    else:
+        sql, params = flask_app.build_global_stats_query(*query)
+        if not stream:
+            try:
+                rows = await pool.fetch(sql, params)
+            except DB_ERRORS as err:
+                return jsonify({'error': str(err)}), 500
+            return jsonify(shaped([row for row in rows if has_indicator(row)], data))
+        chunks = pool.stream(sql, params, STREAM_CHUNK_ROWS)
+
+    return Response(_encode(chunks, stream, has_indicator), mimetype=MIMETYPES[stream])
+
+
+async def _list_chunks(rows, chunk_rows=STREAM_CHUNK_ROWS):
+    for offset in range(0, len(rows), chunk_rows):
+        yield rows[offset:offset + chunk_rows]
+
+
+async def _encode(chunks, fmt, keep):
+    # Same wire format as streaming.encode_chunks, over an async iterator
+    dumps = flask_app.app.json.dumps
+    first = True
+    if fmt == "json":
+        yield b"["
+    async for rows in chunks:
+        rows = [row for row in rows if keep(row)]
+        if not rows:
+            continue
+        yield encode_chunk(rows, fmt, dumps, first).encode()
+        first = False
+    if fmt == "json":
+        yield b"]"
+
+
+_ASYNC_PATHS = {rule.rule for rule in quart_app.url_map.iter_rules()}
+_flask = AsyncioWSGIMiddleware(flask_app.app)
+
+
+async def app(scope, receive, send):
+    """Routes ported above go to Quart; everything else to the Flask app."""
+    if scope["type"] == "http" and scope["path"] not in _ASYNC_PATHS:
+        await _flask(scope, receive, send)
+    else:
+        await quart_app(scope, receive, send)
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from db_pool import DB_CONFIG, PoolTimeout, get_pool
+from instrumentation import METRICS_ENABLED, metrics
+
+
+class AsyncPool:
+    """aiomysql pool with the same size and checkout timeout as the sync one.
+
+    Queries run on the event loop, so one worker process can keep
+    DB_POOL_SIZE queries in flight without a thread per request.
+    """
+
+    def __init__(self, pool, checkout_timeout=5.0):
+        self._pool = pool
+        self.checkout_timeout = checkout_timeout
+        self._checkouts = 0
+        self._timeouts = 0
+
+    async def _acquire(self):
+        try:
+            connection = await asyncio.wait_for(self._pool.acquire(), self.checkout_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise PoolTimeout(
+                f"no database connection available after {self.checkout_timeout:.1f}s "
+                f"({self._pool.size - self._pool.freesize}/{self._pool.maxsize} in use)"
+            )
+        self._checkouts += 1
+        return connection
+
+    async def fetch(self, sql, params=(), one=False):
+        """Rows as dicts (or the first row, or None, with one=True)."""
+        import aiomysql
+        connection = await self._acquire()
+        try:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                start = time.perf_counter()
+                await cursor.execute(sql, params)
+                rows = await cursor.fetchone() if one else await cursor.fetchall()
+                if METRICS_ENABLED:
+                    key = metrics.observe_query(sql, time.perf_counter() - start)
+                    metrics.add_rows(key, (rows is not None) if one else len(rows))
+                return rows
+        finally:
+            self._pool.release(connection)
+
+    async def stream(self, sql, params=(), chunk_rows=500):
+        # Unbuffered cursor; the connection stays checked out until the
+        # consumer has taken the last chunk (or stopped iterating)
+        import aiomysql
+        connection = await self._acquire()
+        try:
+            async with connection.cursor(aiomysql.SSDictCursor) as cursor:
+                await cursor.execute(sql, params)
+                while True:
+                    rows = await cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            self._pool.release(connection)
+
+    async def close(self):
+        self._pool.close()
+        await self._pool.wait_closed()
+
+    def stats(self):
+        return {
+            "maxSize": self._pool.maxsize,
+            "minSize": self._pool.minsize,
+            "inUse": self._pool.size - self._pool.freesize,
+            "idle": self._pool.freesize,
+            "checkouts": self._checkouts,
+            "timeouts": self._timeouts,
+        }
+
+
+class ThreadedPool:
+    """Stand-in for DB_BACKEND=sqlite: runs each query on a worker thread
+    against the sync pool, so the async routes can be exercised offline."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def _fetch(self, sql, params, one):
+        connection = self._pool.acquire()
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(sql, params)
+            rows = cursor.fetchone() if one else cursor.fetchall()
+            cursor.close()
+            return rows
+        finally:
+            connection.close()
+
+    async def fetch(self, sql, params=(), one=False):
+        return await asyncio.to_thread(self._fetch, sql, params, one)
+
+    async def stream(self, sql, params=(), chunk_rows=500):
+        rows = await self.fetch(sql, params)
+        for offset in range(0, len(rows), chunk_rows):
+            yield rows[offset:offset + chunk_rows]
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return self._pool.stats()
+
+
+def db_errors():
+    """Exception types a query failure surfaces as on the configured backend."""
+    if os.environ.get("DB_BACKEND", "mysql") == "sqlite":
+        return (sqlite3.Error,)
+    import pymysql
+    return (pymysql.MySQLError,)
+
+
+async def create_async_pool():
+    if os.environ.get("DB_BACKEND", "mysql") == "sqlite":
+        return ThreadedPool(get_pool())
+
+    import aiomysql
+    pool = await aiomysql.create_pool(
+        host=DB_CONFIG["host"],
+        port=DB_CONFIG["port"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        db=DB_CONFIG["database"],
+        minsize=int(os.environ.get("DB_POOL_MIN_SIZE", "0")),
+        maxsize=int(os.environ.get("DB_POOL_SIZE", "10")),
+        pool_recycle=int(float(os.environ.get("DB_POOL_MAX_LIFETIME", "3600"))),
+        # Read-only queries; autocommit keeps each one on a fresh snapshot
+        autocommit=True,
+    )
+    return AsyncPool(pool, checkout_timeout=float(os.environ.get("DB_POOL_TIMEOUT", "5")))
+
+
+async def timed_fetch(pool, sql, params=(), one=False):
+    # (rows, query time in ms) for Server-Timing
+    start = time.perf_counter()
+    rows = await pool.fetch(sql, params, one)
+    return rows, (time.perf_counter() - start) * 1000
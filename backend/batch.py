@@ -0,0 +1,230 @@
+"""Runs a list of profile and comparison requests with shared queries.
+
+Each item looks like the body of the matching single-item route plus a
+"type" ("country_data", "state_data", "compare_data_aggregated" or
+"compare_states") and an optional "id". Items of the same type are answered
+together: all profiles with one CountryName/StateName IN (...) query per
+stage, and comparisons with identical filters with one query over the union
+of their countries or states. A failing item, or a failing shared query, only
+fails the items that depend on it.
+"""
+import os
+
+from compare_stats import (compare_country_stats, compare_state_stats, fill_missing,
+                           resolve_indicators, UnknownIndicator)
+from country_profile import assemble_country_profiles
+from db_pool import PoolTimeout
+from state_profile import BATCH_PROFILE_QUERIES as STATE_PROFILE_QUERIES
+
+
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "50"))
+
+class ItemError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _ok(data):
+    return {"status": 200, "data": data}
+
+
+def _error(err):
+    return {"status": getattr(err, "status", 500), "error": str(err)}
+
+
+def _required(item, *fields):
+    if not all(item.get(field) for field in fields):
+        raise ItemError("Missing required parameters")
+
+
+def _name(item, field):
+    if not isinstance(item[field], str):
+        raise ItemError(f"{field} must be a name")
+
+
+def _names(item, *fields):
+    # A string would otherwise be iterated as a list of one-letter names
+    for field in fields:
+        value = item[field]
+        if not isinstance(value, list) or not value or not all(isinstance(name, str) for name in value):
+            raise ItemError(f"{field} must be a non-empty list of names")
+
+
+def _years(item):
+    try:
+        int(item["startYear"]), int(item["endYear"])
+    except (TypeError, ValueError):
+        raise ItemError("startYear and endYear must be numbers")
+
+
+def _check_country_profile(item):
+    _required(item, "country")
+    _name(item, "country")
+
+
+def _check_state_profile(item):
+    _required(item, "state")
+    _name(item, "state")
+
+
+def _check_country_comparison(item):
+    _required(item, "countries", "indicators", "startYear", "endYear", "disasterTypes")
+    _names(item, "countries", "indicators", "disasterTypes")
+    _years(item)
+    try:
+        resolve_indicators(item["indicators"])
+    except UnknownIndicator as err:
+        raise ItemError(str(err))
+
+
+def _check_state_comparison(item):
+    _required(item, "states", "startYear", "endYear")
+    _names(item, "states")
+    _years(item)
+
+
+def _country_profiles(items, get_connection):
+    profiles, _ = assemble_country_profiles([item["country"] for item in items.values()], get_connection)
+    return {
+        item_id: _ok(profiles[item["country"]]) if profiles[item["country"]] is not None
+        else _error(ItemError(f"Unknown country: {item['country']}", 404))
+        for item_id, item in items.items()
+    }
+
+
+def _state_profiles(items, get_connection):
+    names = list(dict.fromkeys(item["state"] for item in items.values()))
+    placeholders = ", ".join(["%s"] * len(names))
+    connection = get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        by_section = {}
+        for section, sql in STATE_PROFILE_QUERIES.items():
+            cursor.execute(sql.format(states=placeholders), tuple(names))
+            split = {}
+            for row in cursor.fetchall():
+                key = row.pop("BatchStateName", row.get("StateName")).lower()
+                split.setdefault(key, []).append(row)
+            by_section[section] = split
+        cursor.close()
+    finally:
+        connection.close()
+
+    results = {}
+    for item_id, item in items.items():
+        key = item["state"].lower()
+        if key not in by_section["overview"]:
+            results[item_id] = _error(ItemError(f"Unknown state: {item['state']}", 404))
+            continue
+        results[item_id] = _ok({
+            section: split[key][0] if section == "overview" else split.get(key, [])
+            for section, split in by_section.items()
+        })
+    return results
+
+
+def _country_comparisons(items, get_connection):
+    # Items with the same indicators, years and types share one query
+    groups = {}
+    for item_id, item in items.items():
+        aliases = resolve_indicators(item["indicators"])
+        key = (aliases, int(item["startYear"]), int(item["endYear"]), tuple(item["disasterTypes"]))
+        groups.setdefault(key, {})[item_id] = item
+
+    results = {}
+    for (aliases, start_year, end_year, disaster_types), group in groups.items():
+        countries = list(dict.fromkeys(c for item in group.values() for c in item["countries"]))
+        try:
+            connection = get_connection()
+            try:
+                rows = compare_country_stats(connection, countries, aliases, start_year, end_year,
+                                             list(disaster_types))
+            finally:
+                connection.close()
+        except PoolTimeout:
+            raise
+        except Exception as err:
+            results.update({item_id: _error(err) for item_id in group})
+            continue
+        for item_id, item in group.items():
+            wanted = {c.lower() for c in item["countries"]}
+            item_rows = [dict(row) for row in rows if row["CountryName"].lower() in wanted]
+            results[item_id] = _ok(fill_missing(item_rows, item["countries"], aliases))
+    return results
+
+
+def _state_comparisons(items, get_connection):
+    groups = {}
+    for item_id, item in items.items():
+        groups.setdefault((int(item["startYear"]), int(item["endYear"])), {})[item_id] = item
+
+    results = {}
+    for (start_year, end_year), group in groups.items():
+        states = list(dict.fromkeys(s for item in group.values() for s in item["states"]))
+        try:
+            connection = get_connection()
+            try:
+                by_state = compare_state_stats(connection, states, start_year, end_year)
+            finally:
+                connection.close()
+        except PoolTimeout:
+            raise
+        except Exception as err:
+            results.update({item_id: _error(err) for item_id in group})
+            continue
+        for item_id, item in group.items():
+            results[item_id] = _ok([by_state[s.lower()] for s in item["states"] if s.lower() in by_state])
+    return results
+
+
+# Item type -> (per-item validation, runner for all valid items of that type)
+HANDLERS = {
+    "country_data": (_check_country_profile, _country_profiles),
+    "state_data": (_check_state_profile, _state_profiles),
+    "compare_data_aggregated": (_check_country_comparison, _country_comparisons),
+    "compare_states": (_check_state_comparison, _state_comparisons),
+}
+
+
+def _run_group(check, run, items, get_connection):
+    results = {}
+    valid = {}
+    for item_id, item in items.items():
+        try:
+            check(item)
+            valid[item_id] = item
+        except ItemError as err:
+            results[item_id] = _error(err)
+    if not valid:
+        return results
+    try:
+        results.update(run(valid, get_connection))
+    except PoolTimeout:
+        raise
+    except Exception as err:
+        results.update({item_id: _error(err) for item_id in valid})
+    return results
+
+
+def run_batch(items, get_connection):
+    """{item id: {"status": 200, "data": ...} or {"status": 4xx/5xx, "error": ...}}."""
+    if not isinstance(items, list) or not items:
+        raise ItemError("requests must be a non-empty list")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ItemError(f"At most {BATCH_MAX_ITEMS} requests per batch")
+
+    results = {}
+    by_type = {}
+    for position, item in enumerate(items):
+        item_id = str(item.get("id", position)) if isinstance(item, dict) else str(position)
+        if item_id in results or any(item_id in group for group in by_type.values()):
+            results[item_id] = _error(ItemError(f"Duplicate id: {item_id}"))
+        elif not isinstance(item, dict) or item.get("type") not in HANDLERS:
+            results[item_id] = _error(ItemError(f"type must be one of {', '.join(HANDLERS)}"))
+        else:
+            by_type.setdefault(item["type"], {})[item_id] = item
+
+    for item_type, group in by_type.items():
+        results.update(_run_group(*HANDLERS[item_type], group, get_connection))
+    return results
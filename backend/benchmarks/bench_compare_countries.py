@@ -0,0 +1,136 @@
+"""Bound-parameter comparison query vs the CompareCountryStats procedure.
+
+Times /compare_data_aggregated's query for 2, 20 and 200 countries against
+the stored procedure and checks both return the same rows.
+
+Against MySQL (the default backend, configured through DB_* variables) the
+procedure from req.sql is called for real. With --sqlite a seeded throwaway
+database is used instead, and the procedure is emulated by interpolating the
+values into the SQL text with a FIND_IN_SET equivalent, as the procedure's
+CONCAT/PREPARE does.
+
+    python benchmarks/bench_compare_countries.py --sqlite
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_pool  # noqa: E402
+from compare_stats import compare_country_stats, resolve_indicators  # noqa: E402
+from indicators import select_expression  # noqa: E402
+from localdb import seed_sqlite, with_rtt  # noqa: E402
+
+SIZES = [2, 20, 200]
+INDICATORS = ["AvgGDP", "AvgCPI", "AvgServiceGrowth"]
+DISASTER_TYPES = ["Earthquake", "Tsunami", "Volcano"]
+
+
+def procedure_mysql(connection, countries, aliases, start_year, end_year, types):
+    cursor = connection.cursor(dictionary=True)
+    cursor.callproc("CompareCountryStats", (
+        ",".join(countries),
+        ", ".join(select_expression(alias) for alias in aliases),
+        start_year, end_year,
+        ",".join(types),
+    ))
+    rows = []
+    for result in cursor.stored_results():
+        rows.extend(dict(zip(result.column_names, row)) for row in result.fetchall())
+    cursor.close()
+    return rows
+
+
+def procedure_sqlite(connection, countries, aliases, start_year, end_year, types):
+    def find_in_set(column, values):
+        return f"instr(',' || '{','.join(values)}' || ',', ',' || {column} || ',') > 0"
+
+    indicator_sql = ", ".join(select_expression(alias) for alias in aliases)
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(f"""
+        SELECT ne.CountryName, {indicator_sql},
+            COUNT(DISTINCT nd.DisasterID) AS TotalDisasters,
+            SUM(dd.Deaths) AS TotalDeaths
+        FROM NationalEconomicImpact ne
+        JOIN SectoralEconomicImpact se ON ne.CountryName = se.CountryName AND ne.Year = se.Year
+        LEFT JOIN NaturalDisaster nd ON ne.CountryName = nd.CountryName AND ne.Year = nd.Year
+        LEFT JOIN DirectDamage dd ON nd.DisasterID = dd.DisasterID
+        WHERE {find_in_set('ne.CountryName', countries)}
+          AND ({find_in_set('nd.Type', types)} OR nd.Type IS NULL)
+          AND ne.Year BETWEEN {start_year} AND {end_year}
+        GROUP BY ne.CountryName
+        ORDER BY ne.CountryName
+    """)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def rounded(rows):
+    return [{k: round(float(v), 6) if k.startswith("Avg") and v is not None else v for k, v in row.items()}
+            for row in rows]
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sqlite", action="store_true", help="use a seeded local SQLite database")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated round trip per query (SQLite only)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.sqlite:
+        path = tempfile.mktemp(suffix=".db")
+        countries, _ = seed_sqlite(path, n_countries=max(SIZES))
+        pool = db_pool.ConnectionPool(with_rtt(db_pool.sqlite_connect(path), args.rtt_ms / 1000))
+        procedure = procedure_sqlite
+    else:
+        pool = db_pool.get_pool()
+        connection = pool.acquire()
+        cursor = connection.cursor()
+        cursor.execute("SELECT DISTINCT CountryName FROM NationalEconomicImpact ORDER BY CountryName")
+        countries = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        connection.close()
+        procedure = procedure_mysql
+
+    aliases = resolve_indicators(INDICATORS)
+    print(f"{'countries':>9} {'procedure ms':>13} {'bound ms':>9} {'speedup':>8}")
+    for n in SIZES:
+        subset = countries[:n]
+        connection = pool.acquire()
+        expected = procedure(connection, subset, aliases, 1980, 2020, DISASTER_TYPES)
+        actual = compare_country_stats(connection, subset, aliases, 1980, 2020, DISASTER_TYPES)
+        connection.close()
+        if rounded(expected) != rounded(actual):
+            sys.exit(f"result mismatch for {n} countries")
+
+        def run(fn):
+            def call():
+                conn = pool.acquire()
+                fn(conn, subset, aliases, 1980, 2020, DISASTER_TYPES)
+                conn.close()
+            return call
+
+        procedure_ms = median_ms(run(procedure), args.repeat)
+        bound_ms = median_ms(run(compare_country_stats), args.repeat)
+        print(f"{len(subset):>9} {procedure_ms:>13.2f} {bound_ms:>9.2f} {procedure_ms / bound_ms:>7.1f}x")
+
+    if args.sqlite:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Latency of /compare_states as the number of states grows from 1 to 50.
+
+Seeds a throwaway SQLite database with 50 synthetic states, then times the
+route (one grouped query) against the old per-state loop (two queries per
+state). --rtt-ms adds a simulated network round trip to every query so the
+difference shows up locally the way it does against the remote MySQL.
+
+    python benchmarks/bench_compare_states.py --rtt-ms 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_pool  # noqa: E402
+from localdb import seed_sqlite, with_rtt  # noqa: E402
+
+SIZES = [1, 2, 5, 10, 20, 35, 50]
+
+
+def legacy_compare_states(connection, states, start_year, end_year):
+    # The pre-rewrite implementation: two queries per state
+    cursor = connection.cursor(dictionary=True)
+    results = []
+    for state in states:
+        cursor.execute("""
+            SELECT
+                StateName,
+                AVG(GDPGrowth) as AvgGDPGrowth,
+                AVG(PersonalIncomeGrowth) as AvgPersonalIncomeGrowth,
+                MAX(GDP) as MaxGDP,
+                MAX(PersonalIncome) as MaxPersonalIncome
+            FROM StateEconomicTotals
+            WHERE StateName = %s AND Year BETWEEN %s AND %s
+            GROUP BY StateName
+        """, (state, start_year, end_year))
+        econ_totals = cursor.fetchone()
+        cursor.execute("""
+            SELECT COUNT(*) as DisasterCount
+            FROM StateDisasters sd
+            JOIN State s ON sd.StateCode = s.StateCode
+            WHERE s.StateName = %s AND sd.Year BETWEEN %s AND %s
+        """, (state, start_year, end_year))
+        disaster_count = cursor.fetchone()
+        if econ_totals:
+            state_data = econ_totals
+            if disaster_count:
+                state_data['DisasterCount'] = disaster_count['DisasterCount']
+            results.append(state_data)
+    cursor.close()
+    return results
+
+
+def rounded(rows):
+    return [{k: round(v, 6) if isinstance(v, float) else v for k, v in row.items()} for row in rows]
+
+
+def time_it(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated round trip per query")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = tempfile.mktemp(suffix=".db")
+    _, states = seed_sqlite(path)
+    os.environ["CACHE_ENABLED"] = "0"
+    pool = db_pool.ConnectionPool(with_rtt(db_pool.sqlite_connect(path), args.rtt_ms / 1000))
+    db_pool.configure_pool(pool)
+
+    import flask_app
+    client = flask_app.app.test_client()
+
+    print(f"{'states':>6} {'legacy ms':>10} {'grouped ms':>11} {'speedup':>8}")
+    for n in SIZES:
+        subset = states[:n]
+        body = {"states": subset, "startYear": 2000, "endYear": 2020}
+
+        connection = pool.acquire()
+        expected = legacy_compare_states(connection, subset, 2000, 2020)
+        connection.close()
+        actual = client.post("/compare_states", json=body).get_json()
+        if rounded(expected) != rounded(actual):
+            sys.exit(f"result mismatch for {n} states")
+
+        def legacy():
+            conn = pool.acquire()
+            legacy_compare_states(conn, subset, 2000, 2020)
+            conn.close()
+
+        legacy_ms = time_it(legacy, args.repeat)
+        grouped_ms = time_it(lambda: client.post("/compare_states", json=body), args.repeat)
+        print(f"{n:>6} {legacy_ms:>10.2f} {grouped_ms:>11.2f} {legacy_ms / grouped_ms:>7.1f}x")
+
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Size and serialization time of the largest country profiles per encoding.
+
+For the --top countries with the most disasters, builds the /country_data
+profile once, then times serializing it with Flask's default provider and
+with the orjson provider, row-oriented and columnar. It also reports the
+gzip/brotli size and compression time of each body.
+
+    python benchmarks/bench_encoding.py                 # synthetic database
+    python benchmarks/bench_encoding.py --db bench.db   # e.g. one seeded by run_benchmarks.py --db
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_pool  # noqa: E402
+from localdb import seed_sqlite  # noqa: E402
+
+
+def timed(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="existing SQLite database (default: seed a synthetic one)")
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = args.db
+    if path is None:
+        path = tempfile.mktemp(suffix=".db")
+        seed_sqlite(path, n_disasters=50000)
+    db_pool.configure_pool(db_pool.ConnectionPool(db_pool.sqlite_connect(path)))
+
+    import encoding
+    import flask_app
+    from country_profile import assemble_country_profile
+    from flask.json.provider import DefaultJSONProvider
+
+    app = flask_app.app
+    providers = {"flask": DefaultJSONProvider(app), "orjson": encoding.FastJSONProvider(app)}
+    connection = flask_app.get_db_connection()
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT CountryName FROM NaturalDisaster
+        GROUP BY CountryName ORDER BY COUNT(*) DESC LIMIT %s
+    """, (args.top,))
+    countries = [row[0] for row in cursor.fetchall()]
+    connection.close()
+
+    print(f"{'country':<22} {'encoder':<7} {'shape':<9} {'bytes':>9} {'ser ms':>8} "
+          f"{'gzip':>8} {'gz ms':>7} {'br':>8} {'br ms':>7}")
+    with app.app_context():
+        for country in countries:
+            profile, _ = assemble_country_profile(country, flask_app.get_db_connection)
+            for shape in ("rows", "columnar"):
+                for name, provider in providers.items():
+                    def serialize():
+                        value = encoding.columnar(profile) if shape == "columnar" else profile
+                        return provider.response(value).get_data()
+                    body, ser_ms = timed(args.repeat, serialize)
+                    gz, gz_ms = timed(args.repeat, lambda: encoding.compress(body, "gzip"))
+                    br, br_ms = (timed(args.repeat, lambda: encoding.compress(body, "br"))
+                                 if encoding.brotli is not None else (b"", float("nan")))
+                    print(f"{country[:22]:<22} {name:<7} {shape:<9} {len(body):>9} {ser_ms:>8.2f} "
+                          f"{len(gz):>8} {gz_ms:>7.2f} {len(br) or '-':>8} {br_ms:>7.2f}")
+    if args.db is None:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
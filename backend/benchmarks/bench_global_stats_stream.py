@@ -0,0 +1,65 @@
+"""Peak memory and time-to-first-byte of buffered vs streamed /global_stats.
+
+Seeds SQLite databases of growing size and requests every disaster with
+aggregateBy = "Individual Disasters", once as a normal JSON response and
+once with {"stream": "ndjson"}. Peak memory is Python heap (tracemalloc)
+while the response is produced and read.
+
+    python benchmarks/bench_global_stats_stream.py
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_pool  # noqa: E402
+from localdb import seed_sqlite  # noqa: E402
+
+SIZES = [5000, 20000, 80000]
+BODY = {
+    "startYear": 1900, "endYear": 2023, "disasterTypes": [],
+    "indicators": ["AvgGDP", "AvgCPI", "AvgUnemployment"],
+    "aggregateBy": "Individual Disasters", "sortOption": "Year (Ascending)",
+}
+
+
+def measure(client, body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.post("/global_stats", json=body, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks, b"")
+    ttfb = (time.perf_counter() - start) * 1000
+    size = len(first)
+    for chunk in chunks:
+        size += len(chunk)
+    total = (time.perf_counter() - start) * 1000
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb, total, peak / 1024 / 1024, size / 1024 / 1024
+
+
+def main():
+    os.environ["CACHE_ENABLED"] = "0"
+    import flask_app
+    client = flask_app.app.test_client()
+
+    print(f"{'rows':>7} {'mode':>9} {'ttfb ms':>8} {'total ms':>9} {'peak MiB':>9} {'body MiB':>9}")
+    for n in SIZES:
+        path = tempfile.mktemp(suffix=".db")
+        seed_sqlite(path, n_disasters=n)
+        old = db_pool.configure_pool(db_pool.ConnectionPool(db_pool.sqlite_connect(path)))
+        if old is not None:
+            old.close()
+        for mode, body in (("buffered", BODY), ("ndjson", {**BODY, "stream": "ndjson"})):
+            ttfb, total, peak, size = measure(client, body)
+            print(f"{n:>7} {mode:>9} {ttfb:>8.1f} {total:>9.1f} {peak:>9.2f} {size:>9.2f}")
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
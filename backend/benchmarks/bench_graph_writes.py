@@ -0,0 +1,98 @@
+"""Throughput and latency of saved-graph writes, one commit per write vs batched.
+
+Each client thread saves a graph, renames it and deletes it, --rounds
+times, through a GraphWriter. "per-write" uses a batch size of 1, so every
+mutation and its Logs row get their own transaction as they did with the
+triggers; "batched" uses GRAPH_WRITE_BATCH_SIZE / GRAPH_WRITE_DELAY_MS.
+The database is an on-disk SQLite file, so every commit pays for a real
+fsync.
+
+    python benchmarks/bench_graph_writes.py --concurrency 1 8 32
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_pool  # noqa: E402
+from graph_writes import GraphWriter, graph_writer_from_env  # noqa: E402
+from localdb import sqlite_tables, with_rtt  # noqa: E402
+
+PROJ_TABLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "sql", "proj_tables.sql")
+
+
+def run(writer, concurrency, rounds):
+    latencies = []
+    lock = threading.Lock()
+
+    def timed(pending_write):
+        start = time.perf_counter()
+        result = pending_write().result()
+        return result, (time.perf_counter() - start) * 1000
+
+    def client(n):
+        username = f"user{n}"
+        local = []
+        for i in range(rounds):
+            graph_id, ms = timed(lambda: writer.insert(
+                username, f"Graph {i}", {"countries": ["Japan"], "startYear": 1990}, "global"))
+            local.append(ms)
+            local.append(timed(lambda: writer.update(graph_id, username, GraphTitle=f"Renamed {i}"))[1])
+            local.append(timed(lambda: writer.delete(graph_id, username))[1])
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100)
+    return len(latencies) / elapsed, cuts[49], cuts[94]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=20, help="save/rename/delete cycles per client")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated network round trip per query")
+    args = parser.parse_args()
+
+    path = tempfile.mktemp(suffix=".db")
+    conn = sqlite3.connect(path)
+    with open(PROJ_TABLES) as f:
+        conn.executescript(sqlite_tables(f.read()))
+    conn.close()
+    connect = db_pool.sqlite_connect(path)
+    if args.rtt_ms:
+        connect = with_rtt(connect, args.rtt_ms / 1000)
+    pool = db_pool.ConnectionPool(connect, max_size=max(args.concurrency))
+    batched = graph_writer_from_env(pool.acquire)
+
+    print(f"{'clients':>7}  {'mode':<9} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'avg batch':>9}")
+    for concurrency in args.concurrency:
+        for mode in ("per-write", "batched"):
+            writer = GraphWriter(pool.acquire, batch_size=1, delay=0) if mode == "per-write" else batched
+            before = writer.stats()
+            rate, p50, p95 = run(writer, concurrency, args.rounds)
+            after = writer.stats()
+            batches = after["batches"] - before["batches"]
+            avg = (after["writes"] - before["writes"]) / batches if batches else 0
+            print(f"{concurrency:>7}  {mode:<9} {rate:>9.0f} {p50:>8.2f} {p95:>8.2f} {avg:>9.1f}")
+            if writer is not batched:
+                writer.close()
+    batched.close()
+    pool.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Parity and timing of the columnar /global_stats engine against the SQL path.
+
+Runs every aggregateBy/sortOption combination over a few indicator and
+disaster-type selections on a seeded SQLite database. It fails if the two
+engines disagree, and prints the median time of each.
+
+    python benchmarks/check_global_stats_parity.py
+"""
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_pool  # noqa: E402
+from localdb import seed_sqlite  # noqa: E402
+from query_catalog import AGGREGATIONS, SORTS  # noqa: E402
+
+INDICATOR_SETS = [
+    ["AvgGDP"],
+    ["AvgCPI", "AvgUnemployment"],
+    ["AvgServiceGrowth", "AvgGDP", "AvgAgrictultureGrowth", "AvgImportGrowth"],
+]
+TYPE_SETS = [[], ["Earthquake"], ["Tsunami", "Volcano"]]
+YEAR_RANGES = [(1960, 2023), (1995, 2005)]
+
+
+def normalized(rows):
+    return sorted(
+        (tuple((k, round(v, 6) if isinstance(v, float) else v) for k, v in sorted(row.items())) for row in rows),
+        key=repr,
+    )
+
+
+def sort_key_sequence(rows, body):
+    key = "Year" if body["sortOption"].startswith("Year") else body["indicators"][0]
+    return [None if row[key] is None else round(row[key], 6) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = tempfile.mktemp(suffix=".db")
+    seed_sqlite(path)
+    os.environ["CACHE_ENABLED"] = "0"
+    os.environ["GLOBAL_STATS_ENGINE"] = "sql"
+    db_pool.configure_pool(db_pool.ConnectionPool(db_pool.sqlite_connect(path)))
+
+    import flask_app
+    from columnar_stats import ColumnarStats
+    client = flask_app.app.test_client()
+    engine = ColumnarStats(flask_app.get_db_connection)
+
+    start = time.perf_counter()
+    rows = engine.load()
+    print(f"columnar load: {rows} joined rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    sql_times, columnar_times = [], []
+    cases = itertools.product(AGGREGATIONS, SORTS, INDICATOR_SETS, TYPE_SETS, YEAR_RANGES)
+    for count, (aggregate_by, sort_option, indicators, types, (lo, hi)) in enumerate(cases, 1):
+        body = {"startYear": lo, "endYear": hi, "disasterTypes": types, "indicators": indicators,
+                "aggregateBy": aggregate_by, "sortOption": sort_option}
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = client.post("/global_stats", json=body).get_json()
+        sql_times.append((time.perf_counter() - start) * 1000 / args.repeat)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            actual = engine.query(lo, hi, types, indicators, aggregate_by, sort_option)
+        columnar_times.append((time.perf_counter() - start) * 1000 / args.repeat)
+
+        if normalized(expected) != normalized(actual) or \
+                sort_key_sequence(expected, body) != sort_key_sequence(actual, body):
+            sys.exit(f"mismatch for {body}")
+
+    print(f"{count} combinations match")
+    print(f"sql      median {statistics.median(sql_times):8.2f} ms")
+    print(f"columnar median {statistics.median(columnar_times):8.2f} ms")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
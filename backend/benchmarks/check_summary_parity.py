@@ -0,0 +1,122 @@
+"""Parity and timing of the summary-table queries against the raw-table ones.
+
+Covers the country profile timeline, /global_stats in "Disaster Types" mode
+and the country comparison, on a seeded SQLite database. It fails if the two
+paths disagree, and prints the median time of each.
+
+    python benchmarks/check_summary_parity.py
+"""
+import argparse
+import decimal
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_pool  # noqa: E402
+from localdb import seed_sqlite  # noqa: E402
+from query_catalog import SORTS  # noqa: E402
+
+INDICATOR_SETS = [
+    ["AvgGDP"],
+    ["AvgCPI", "AvgUnemployment"],
+    ["AvgServiceGrowth", "AvgGDP", "AvgAgrictultureGrowth", "AvgImportGrowth"],
+]
+TYPE_SETS = [["Earthquake"], ["Tsunami", "Volcano"], ["Earthquake", "Tsunami", "Volcano"]]
+YEAR_RANGES = [(1960, 2023), (1995, 2005)]
+
+
+def normalized(rows):
+    # Types count too: a count that comes back as a Decimal is serialized as a string
+    return sorted(
+        (tuple((k, type(v).__name__, round(float(v), 6) if isinstance(v, (int, float, decimal.Decimal)) else v)
+               for k, v in sorted(row.items())) for row in rows),
+        key=repr,
+    )
+
+
+def timed(times, repeat, fn):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    times.append((time.perf_counter() - start) * 1000 / repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--disasters", type=int, default=50000)
+    args = parser.parse_args()
+
+    path = tempfile.mktemp(suffix=".db")
+    countries, _ = seed_sqlite(path, n_disasters=args.disasters)
+    os.environ["CACHE_ENABLED"] = "0"
+    db_pool.configure_pool(db_pool.ConnectionPool(db_pool.sqlite_connect(path)))
+
+    import compare_stats
+    import country_profile
+    import flask_app
+    import summaries
+
+    def rows(sql, params):
+        connection = flask_app.get_db_connection()
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            connection.close()
+
+    def compare(use_summaries, *query):
+        compare_stats.SUMMARY_TABLES = use_summaries
+        connection = flask_app.get_db_connection()
+        try:
+            return compare_stats.compare_country_stats(connection, *query)
+        finally:
+            connection.close()
+
+    def global_stats(use_summaries, *query):
+        flask_app.SUMMARY_TABLES = use_summaries
+        return rows(*flask_app.build_global_stats_query(*query))
+
+    times = {name: ([], []) for name in ("timeline", "global_stats", "compare")}
+    count = 0
+
+    for country in countries[:20]:
+        raw = timed(times["timeline"][0], args.repeat,
+                    lambda: rows(country_profile.PROFILE_QUERIES["timeline"][1], (country,)))
+        summary = timed(times["timeline"][1], args.repeat, lambda: rows(summaries.TIMELINE_SQL, (country,)))
+        if normalized(raw) != normalized(summary):
+            sys.exit(f"timeline mismatch for {country}")
+        count += 1
+
+    for sort_option, indicators, types, (lo, hi) in itertools.product(SORTS, INDICATOR_SETS, TYPE_SETS, YEAR_RANGES):
+        query = (lo, hi, types, indicators, "Disaster Types", sort_option)
+        raw = timed(times["global_stats"][0], args.repeat, lambda: global_stats(False, *query))
+        summary = timed(times["global_stats"][1], args.repeat, lambda: global_stats(True, *query))
+        if normalized(raw) != normalized(summary):
+            sys.exit(f"global_stats mismatch for {query}")
+        count += 1
+
+    for n, indicators, types, (lo, hi) in itertools.product([1, 5, 20], INDICATOR_SETS, TYPE_SETS, YEAR_RANGES):
+        query = (countries[:n], tuple(indicators), lo, hi, types)
+        raw = timed(times["compare"][0], args.repeat, lambda: compare(False, *query))
+        summary = timed(times["compare"][1], args.repeat, lambda: compare(True, *query))
+        if normalized(raw) != normalized(summary):
+            sys.exit(f"compare mismatch for {query}")
+        count += 1
+
+    print(f"{count} queries match")
+    for name, (raw, summary) in times.items():
+        print(f"{name:<13} raw median {statistics.median(raw):8.2f} ms   "
+              f"summary median {statistics.median(summary):8.2f} ms")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""EXPLAIN every query shape the backend issues and propose composite indexes.
+
+The shapes come from the same modules the routes use: the country and state
+profiles (single and batched), both comparisons, /global_stats for each
+aggregation and sort (raw and summary tables), the saved-graph reads and
+login. Each one is EXPLAINed on a seeded database. The report lists full
+table scans, sorts that need a temporary B-tree/filesort, temporary tables
+for GROUP BY, and (SQLite) automatic indexes built per query.
+
+For each flagged table, candidate indexes are derived from the shape's
+predicates, in the usual order: equality and IN columns (including join
+columns), then the ORDER BY / GROUP BY columns or the first range column.
+Candidates already covered by the prefix of an existing index are dropped.
+Every remaining candidate is created, the shapes that suggested it are
+EXPLAINed and timed again, and the index is dropped. A candidate passes if
+it speeds its shapes up by more than --min-gain, or removes a finding
+without slowing them down. The passing candidates are then added one at a
+time, biggest saving first, with the ones already accepted left in place.
+Each is measured against that state and kept only if it still passes, so a
+candidate whose work an accepted index already does is dropped. The kept
+ones are printed as CREATE INDEX statements (and written to --sql).
+
+    python benchmarks/index_advisor.py                    # seeds a SQLite database like run_benchmarks.py
+    python benchmarks/index_advisor.py --db bench.db --sql indexes.sql
+    python benchmarks/index_advisor.py --mysql            # plans against the DB_* database, no DDL
+    python benchmarks/index_advisor.py --mysql --measure  # also try candidates there (creates and drops indexes)
+
+SQLite and MySQL plan differently, so re-check SQLite results with --mysql
+before applying them to the course database.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_pool  # noqa: E402
+from compare_stats import comparison_sql, state_comparison_query  # noqa: E402
+from country_profile import BATCH_PROFILE_QUERIES, PROFILE_QUERIES  # noqa: E402
+from indicators import INDICATORS  # noqa: E402
+from query_catalog import AGGREGATIONS, global_stats_query  # noqa: E402
+from state_profile import (BATCH_PROFILE_QUERIES as STATE_BATCH_QUERIES,  # noqa: E402
+                           PROFILE_QUERIES as STATE_PROFILE_QUERIES)
+from summaries import (BATCH_TIMELINE_SQL, TIMELINE_SQL, comparison_summary_sql,  # noqa: E402
+                       global_stats_summary_query)
+
+Shape = namedtuple("Shape", "name sql params")
+Finding = namedtuple("Finding", "table issue detail")
+
+YEARS = (1960, 2023)
+DISASTER_TYPES = ["Earthquake", "Tsunami", "Volcano"]
+SAMPLE_COUNTRIES = 8
+SAMPLE_STATES = 10
+
+_KEYWORDS = {"ON", "WHERE", "LEFT", "RIGHT", "INNER", "JOIN", "GROUP", "ORDER", "USING", "AS", "LIMIT"}
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def shapes(country, countries, state, states, username):
+    """Every statement shape the routes issue, with sample parameters."""
+    aliases = tuple(INDICATORS)
+    found = []
+    for name, (_, sql) in PROFILE_QUERIES.items():
+        found.append(Shape(f"country_data.{name}", sql, (country,)))
+    found.append(Shape("country_data.timeline[summary]", TIMELINE_SQL, (country,)))
+    for name, (_, sql) in BATCH_PROFILE_QUERIES.items():
+        found.append(Shape(f"batch.country.{name}", sql.format(countries=_placeholders(countries)), countries))
+    found.append(Shape("batch.country.timeline[summary]",
+                       BATCH_TIMELINE_SQL.format(countries=_placeholders(countries)), countries))
+
+    for name, (_, sql) in STATE_PROFILE_QUERIES.items():
+        found.append(Shape(f"state_data.{name}", sql, (state,)))
+    for name, sql in STATE_BATCH_QUERIES.items():
+        found.append(Shape(f"batch.state.{name}", sql.format(states=_placeholders(states)), states))
+    found.append(Shape("compare_states", *state_comparison_query(states, *YEARS)))
+
+    found.append(Shape("compare_data_aggregated",
+                       comparison_sql(aliases, len(countries), len(DISASTER_TYPES)),
+                       (*countries, *DISASTER_TYPES, *YEARS)))
+    found.append(Shape("compare_data_aggregated[summary]",
+                       comparison_summary_sql(aliases, len(countries), len(DISASTER_TYPES)),
+                       (*DISASTER_TYPES, *countries, *YEARS, *countries, *YEARS)))
+
+    for aggregate_by in AGGREGATIONS:
+        for sort_option in ("Year (Ascending)", "Indicator (Descending)"):
+            sql, params = global_stats_query(*YEARS, DISASTER_TYPES[:2], aliases[:3], aggregate_by, sort_option)
+            found.append(Shape(f"global_stats[{aggregate_by}, {sort_option}]", sql, params))
+    sql, params = global_stats_summary_query(*YEARS, DISASTER_TYPES[:2], aliases[:3], "Year (Ascending)")
+    found.append(Shape("global_stats[summary]", sql, params))
+
+    # Inline in flask_app.saved_graphs / saved_graph / login
+    found.append(Shape("saved_graphs", """
+        SELECT GraphID AS GraphId, GraphTitle, Page, Filters
+        FROM SavedGraphs
+        WHERE Username = %s
+        ORDER BY GraphID
+    """, (username,)))
+    found.append(Shape("saved_graphs[page]", """
+        SELECT GraphID AS GraphId, GraphTitle, Page, Filters
+        FROM SavedGraphs
+        WHERE Username = %s AND GraphID > %s
+        ORDER BY GraphID
+        LIMIT %s
+    """, (username, 0, 21)))
+    found.append(Shape("saved_graph", """
+        SELECT GraphID AS GraphId, GraphTitle, Page, Filters
+        FROM SavedGraphs
+        WHERE Username = %s AND GraphID = %s
+    """, (username, 1)))
+    found.append(Shape("login", "SELECT * FROM Users WHERE Email = %s", ("bench@example.com",)))
+    return found
+
+
+def table_aliases(sql):
+    """alias (or bare table name) -> table for every FROM/JOIN in `sql`."""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in _KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+# Plans
+
+class SQLiteDialect:
+    name = "sqlite"
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def explain(self, sql, params):
+        cursor = self.connection.cursor()
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        plan = [row[3] for row in cursor.fetchall()]
+        cursor.close()
+        return plan
+
+    def findings(self, plan, aliases):
+        found = []
+        for detail in plan:
+            scan = re.match(r"SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)", detail)
+            if scan and "INDEX" not in scan.group(3) and scan.group(1) in aliases:
+                found.append(Finding(aliases[scan.group(1)], "full scan", detail))
+            elif "AUTOMATIC" in detail and "INDEX" in detail:
+                table = re.search(r"(?:SEARCH|SCAN) (?:TABLE )?(\w+)", detail)
+                found.append(Finding(aliases.get(table.group(1), table.group(1)) if table else None,
+                                     "automatic index", detail))
+            elif "TEMP B-TREE FOR" in detail and "ORDER BY" in detail:
+                found.append(Finding(None, "filesort", detail))
+            elif "TEMP B-TREE FOR" in detail:
+                found.append(Finding(None, "temporary", detail))
+        return found
+
+    def analyze(self, table):
+        # Without sqlite_stat1 the planner guesses selectivities and can pick
+        # a new index even where it is much slower; MySQL always has statistics
+        cursor = self.connection.cursor()
+        cursor.execute(f"ANALYZE {table}")
+        cursor.close()
+
+    def indexes(self, table):
+        cursor = self.connection.cursor()
+        cursor.execute(f"PRAGMA index_list({table})")
+        names = [row[1] for row in cursor.fetchall()]
+        found = []
+        for name in names:
+            cursor.execute(f"PRAGMA index_info({name})")
+            found.append([row[2] for row in sorted(cursor.fetchall())])
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = cursor.fetchall()
+        primary = [row[1] for row in sorted((r for r in columns if r[5]), key=lambda r: r[5])]
+        if primary:
+            found.append(primary)
+        cursor.close()
+        return found
+
+    def columns(self, table):
+        cursor = self.connection.cursor()
+        cursor.execute(f"PRAGMA table_info({table})")
+        names = {row[1] for row in cursor.fetchall()}
+        cursor.close()
+        return names
+
+
+class MySQLDialect:
+    name = "mysql"
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def explain(self, sql, params):
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute("EXPLAIN " + sql, params)
+        plan = cursor.fetchall()
+        cursor.close()
+        return plan
+
+    def findings(self, plan, aliases):
+        found = []
+        for row in plan:
+            table = aliases.get(row.get("table"))
+            extra = row.get("Extra") or ""
+            if row.get("type") == "ALL" and table is not None:
+                found.append(Finding(table, "full scan", f"{row['table']}: type=ALL rows={row.get('rows')}"))
+            if "Using filesort" in extra:
+                found.append(Finding(table, "filesort", f"{row['table']}: {extra}"))
+            if "Using temporary" in extra:
+                found.append(Finding(table, "temporary", f"{row['table']}: {extra}"))
+        return found
+
+    def analyze(self, table):
+        cursor = self.connection.cursor()
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+        cursor.close()
+
+    def indexes(self, table):
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(f"SHOW INDEX FROM {table}")
+        found = {}
+        for row in cursor.fetchall():
+            found.setdefault(row["Key_name"], []).append((row["Seq_in_index"], row["Column_name"]))
+        cursor.close()
+        return [[column for _, column in sorted(columns)] for columns in found.values()]
+
+    def columns(self, table):
+        cursor = self.connection.cursor()
+        cursor.execute(f"SHOW COLUMNS FROM {table}")
+        names = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+        return names
+
+
+# Candidates
+
+def _column_lists(sql, keyword):
+    # Column lists following GROUP BY / ORDER BY, up to the next clause
+    pattern = rf"\b{keyword}\s+(.+?)(?=\bORDER BY\b|\bLIMIT\b|\bHAVING\b|\)|$)"
+    return [part.strip() for match in re.findall(pattern, sql, re.IGNORECASE | re.DOTALL)
+            for part in match.split(",")]
+
+
+def candidates(sql, table, aliases, columns):
+    """Candidate column lists for an index on `table` serving `sql`."""
+    names = [name for name, target in aliases.items() if target == table]
+    single = len(set(aliases.values())) == 1
+    # A column of this table: alias-qualified, or bare when the statement reads only this table
+    qualified = r"\b(?:" + "|".join(map(re.escape, names)) + r")\."
+    bare = r"(?<![.\w])" if single else r"(?!)"
+    ref = rf"(?:{qualified}|{bare})(\w+)"
+
+    def unique(cols):
+        return [c for c in dict.fromkeys(cols) if c in columns]
+
+    equality = unique(re.findall(ref + r"\s*(?:=\s*%s|IN\s*\()", sql, re.IGNORECASE))
+    ranges = unique(re.findall(ref + r"\s*(?:BETWEEN|>=?|<=?)\s*", sql, re.IGNORECASE))
+    ordering = []
+    for keyword in ("GROUP BY", "ORDER BY"):
+        for part in _column_lists(sql, keyword):
+            match = re.fullmatch(ref + r"(?:\s+(?:ASC|DESC))?", part, re.IGNORECASE)
+            if match:
+                ordering.append(match.group(1))
+    # Join conditions, per joined table: the columns this table is looked up by
+    joins = {}
+    for left, right in re.findall(r"(\w+\.\w+)\s*=\s*(\w+\.\w+)", sql):
+        for mine, other in ((left, right), (right, left)):
+            alias, column = mine.split(".")
+            partner = other.split(".")[0]
+            if aliases.get(alias) == table and aliases.get(partner) != table:
+                joins.setdefault(partner, []).append(column)
+
+    found = []
+    tails = (unique(ordering), ranges[:1])
+    lookups = [join + [c for c in tail if c not in join] for join in joins.values() for tail in ([], ranges[:1])]
+    for cols in [equality + [c for c in tail if c not in equality] for tail in tails] + lookups:
+        cols = tuple(unique(cols))
+        if cols and cols not in found:
+            found.append(cols)
+    return found
+
+
+def covered(cols, existing):
+    return any(list(cols) == index[:len(cols)] for index in existing)
+
+
+# Measurement
+
+def timed(connection, shape, repeat):
+    times = []
+    for _ in range(repeat):
+        cursor = connection.cursor()
+        start = time.perf_counter()
+        cursor.execute(shape.sql, shape.params)
+        cursor.fetchall()
+        times.append((time.perf_counter() - start) * 1000)
+        cursor.close()
+    return statistics.median(times)
+
+
+def analyse(dialect, connection, shape, repeat):
+    aliases = table_aliases(shape.sql)
+    plan = dialect.explain(shape.sql, shape.params)
+    return dialect.findings(plan, aliases), timed(connection, shape, repeat)
+
+
+def helps(before, after, min_gain):
+    """Whether `after` ({shape: (findings, ms)}) is enough better than `before`."""
+    before_ms = sum(ms for _, ms in before.values())
+    after_ms = sum(ms for _, ms in after.values())
+    gain = 1 - after_ms / before_ms if before_ms else 0.0
+    fewer_findings = sum(len(f) for f, _ in after.values()) < sum(len(f) for f, _ in before.values())
+    return gain > min_gain or (fewer_findings and gain >= 0)
+
+
+def create_index(dialect, connection, table, cols):
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE INDEX {index_name(table, cols)} ON {table} ({', '.join(cols)})")
+    cursor.close()
+    dialect.analyze(table)
+
+
+def drop_index(dialect, connection, table, cols):
+    cursor = connection.cursor()
+    cursor.execute(f"DROP INDEX {index_name(table, cols)}" + ("" if dialect.name == "sqlite" else f" ON {table}"))
+    cursor.close()
+    dialect.analyze(table)
+
+
+def _line(before, after):
+    return (f"{sum(ms for _, ms in before.values()):>10.2f} {sum(ms for _, ms in after.values()):>10.2f} "
+            f"{sum(len(f) for f, _ in before.values()):>4} → {sum(len(f) for f, _ in after.values()):<3}")
+
+
+def index_name(table, cols):
+    return f"idx_{table.lower()}_{'_'.join(c.lower() for c in cols)}"
+
+
+def _sample(connection):
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT CountryName FROM NaturalDisaster
+        GROUP BY CountryName ORDER BY COUNT(*) DESC, CountryName LIMIT %s
+    """, (SAMPLE_COUNTRIES,))
+    countries = tuple(row[0] for row in cursor.fetchall())
+    cursor.execute("SELECT StateName FROM State ORDER BY StateCode LIMIT %s", (SAMPLE_STATES,))
+    states = tuple(row[0] for row in cursor.fetchall())
+    cursor.execute("SELECT Username FROM SavedGraphs GROUP BY Username ORDER BY COUNT(*) DESC LIMIT 1")
+    user = cursor.fetchone()
+    cursor.close()
+    return countries, states, user[0] if user else "bench"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="SQLite file to use (seeded like run_benchmarks.py if missing)")
+    parser.add_argument("--mysql", action="store_true", help="use the MySQL database from the DB_* settings")
+    parser.add_argument("--measure", action="store_true", help="with --mysql, create and drop candidate indexes")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per shape (median is reported)")
+    parser.add_argument("--min-gain", type=float, default=0.10, help="speed-up needed to recommend an index")
+    parser.add_argument("--sql", help="write the recommended CREATE INDEX statements here")
+    args = parser.parse_args()
+
+    path = None
+    if args.mysql:
+        connection = db_pool.mysql_connect()
+        dialect = MySQLDialect(connection)
+    else:
+        from run_benchmarks import seed
+        path = args.db or tempfile.mktemp(suffix=".db")
+        if not os.path.exists(path):
+            seed(path)
+        connection = db_pool.sqlite_connect(path)()
+        dialect = SQLiteDialect(connection)
+    measure = args.measure or not args.mysql
+
+    if dialect.name == "sqlite":
+        cursor = connection.cursor()
+        cursor.execute("ANALYZE")
+        cursor.close()
+    countries, states, username = _sample(connection)
+    all_shapes = shapes(countries[0], countries, states[0], states, username)
+
+    print(f"{'shape':<48} {'ms':>8}  findings")
+    baseline = {}
+    wanted = {}
+    for shape in all_shapes:
+        findings, ms = analyse(dialect, connection, shape, args.repeat)
+        baseline[shape.name] = (findings, ms)
+        print(f"{shape.name:<48} {ms:>8.2f}  " + ("; ".join(f"{f.issue} ({f.detail})" for f in findings) or "-"))
+        if not findings:
+            continue
+        # Sorts and temporary tables are not tied to one table; consider every table then
+        aliases = table_aliases(shape.sql)
+        for table in {f.table for f in findings if f.table is not None} or set(aliases.values()):
+            existing = dialect.indexes(table)
+            for cols in candidates(shape.sql, table, aliases, dialect.columns(table)):
+                if not covered(cols, existing):
+                    wanted.setdefault((table, cols), []).append(shape)
+
+    if not wanted:
+        print("\nno candidate indexes")
+        return
+    print(f"\n{'candidate':<62} {'before ms':>10} {'after ms':>10} {'findings':>9}  shapes")
+    passing = []
+    for (table, cols), motivated in sorted(wanted.items()):
+        label = f"{table} ({', '.join(cols)})"
+        if not measure:
+            print(f"{label:<62} {'':>10} {'':>10} {'':>9}  {', '.join(s.name for s in motivated)}")
+            passing.append((0.0, table, cols, motivated))
+            continue
+        before = {s.name: baseline[s.name] for s in motivated}
+        create_index(dialect, connection, table, cols)
+        try:
+            after = {s.name: analyse(dialect, connection, s, args.repeat) for s in motivated}
+        finally:
+            drop_index(dialect, connection, table, cols)
+        keep = helps(before, after, args.min_gain)
+        if keep:
+            saved = sum(ms for _, ms in before.values()) - sum(ms for _, ms in after.values())
+            passing.append((saved, table, cols, motivated))
+        print(f"{label:<62} {_line(before, after)}  {', '.join(s.name for s in motivated)}"
+              + ("   passes" if keep else ""))
+
+    recommended = [(table, cols) for _, table, cols, _ in passing]
+    if measure and passing:
+        # Add the passing candidates one by one, biggest saving first, keeping
+        # each only if it still helps with the ones accepted so far in place
+        print(f"\nwith the accepted indexes in place:")
+        recommended = []
+        try:
+            for _, table, cols, motivated in sorted(passing, key=lambda p: -p[0]):
+                before = {s.name: analyse(dialect, connection, s, args.repeat) for s in motivated}
+                create_index(dialect, connection, table, cols)
+                after = {s.name: analyse(dialect, connection, s, args.repeat) for s in motivated}
+                keep = helps(before, after, args.min_gain)
+                if keep:
+                    recommended.append((table, cols))
+                else:
+                    drop_index(dialect, connection, table, cols)
+                print(f"{table + ' (' + ', '.join(cols) + ')':<62} {_line(before, after)}"
+                      + ("   RECOMMENDED" if keep else "   redundant"))
+        finally:
+            for table, cols in recommended:
+                drop_index(dialect, connection, table, cols)
+
+    # An index that is a prefix of another recommended one on the same table is redundant
+    recommended = [(table, cols) for table, cols in recommended
+                   if not any(t == table and other != cols and other[:len(cols)] == cols for t, other in recommended)]
+    statements = [f"CREATE INDEX {index_name(table, cols)} ON {table} ({', '.join(cols)});"
+                  for table, cols in recommended]
+    print("\n" + ("\n".join(statements) if statements else "no index met --min-gain"))
+    if args.sql and statements:
+        with open(args.sql, "w") as f:
+            f.write("\n".join(statements) + "\n")
+    connection.close()
+    if path is not None and not args.db:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
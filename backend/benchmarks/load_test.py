@@ -0,0 +1,119 @@
+"""Closed-loop load test of the read-only routes against running servers.
+
+Each of --concurrency client threads sends requests back to back for
+--duration seconds, cycling through a mix of profile, comparison and
+global-stats bodies. Every URL given is tested at every concurrency level,
+so the sync and ASGI servers can be compared side by side:
+
+    CACHE_ENABLED=0 python flask_app.py                                   # :5000
+    CACHE_ENABLED=0 hypercorn asgi_app:app --bind 127.0.0.1:8000
+    python benchmarks/load_test.py http://127.0.0.1:5000 http://127.0.0.1:8000
+
+Run the servers with CACHE_ENABLED=0, otherwise the result cache answers
+everything after the first pass and the database never sees the load.
+"""
+import argparse
+import itertools
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+COUNTRIES = ["United States", "Japan", "Indonesia", "Chile", "Turkey", "Italy", "Mexico", "Philippines"]
+STATES = ["California", "Texas", "Florida", "New York", "Oklahoma", "Louisiana"]
+
+
+def request_mix(countries, states):
+    mix = []
+    for country in countries:
+        mix.append(("/country_data", {"country": country}))
+    for state in states:
+        mix.append(("/state_data", {"state": state}))
+    mix.append(("/compare_data_aggregated", {
+        "countries": countries[:4], "indicators": ["AvgGDP", "AvgCPI"],
+        "startYear": 1990, "endYear": 2020, "disasterTypes": ["Earthquake", "Tsunami"],
+    }))
+    mix.append(("/compare_states", {"states": states, "startYear": 2000, "endYear": 2020}))
+    mix.append(("/global_stats", {
+        "startYear": 1990, "endYear": 2020, "disasterTypes": ["Earthquake"],
+        "indicators": ["AvgGDP"], "aggregateBy": "Disaster Types",
+    }))
+    return mix
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run(base_url, mix, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        bodies = itertools.islice(itertools.cycle(mix), offset, None)
+        local, failed = [], 0
+        for path, body in bodies:
+            if time.perf_counter() >= deadline:
+                break
+            req = urllib.request.Request(
+                base_url + path, data=json.dumps(body).encode(),
+                headers={"Content-Type": "application/json"}, method="POST",
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=30) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError):
+                failed += 1
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", nargs="+", help="base URLs of the servers to compare")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--countries", nargs="+", default=COUNTRIES)
+    parser.add_argument("--states", nargs="+", default=STATES)
+    args = parser.parse_args()
+
+    mix = request_mix(args.countries, args.states)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    print(f"{'server':<28} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for level in levels:
+        for url in args.urls:
+            result = run(url.rstrip("/"), mix, level, args.duration)
+            print(f"{url:<28} {level:>7} {result['rps']:>9.1f} {result['p50']:>9.1f} "
+                  f"{result['p95']:>9.1f} {result['p99']:>9.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
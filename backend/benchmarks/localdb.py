@@ -0,0 +1,217 @@
+"""Synthetic SQLite copy of the course database for offline benchmarks.
+
+The shapes match the tables the backend reads; the values are random but
+reproducible for a given seed.
+"""
+import random
+import re
+import sqlite3
+import time
+
+from db_pool import SQLiteConnection
+from summaries import refresh_summaries
+
+SCHEMA = """
+CREATE TABLE Country (
+    CountryName TEXT PRIMARY KEY, IncomeGroup TEXT, CountryCode TEXT, Region TEXT
+);
+CREATE TABLE NaturalDisaster (
+    DisasterID INTEGER PRIMARY KEY, CountryName TEXT, Type TEXT, Year INT, Intensity REAL,
+    Latitude REAL, Longitude REAL
+);
+CREATE TABLE DirectDamage (
+    DamageID INTEGER PRIMARY KEY, DisasterID INT, CountryName TEXT,
+    TotalDamage INT, TotalDamageScale INT, HousesDestroyed INT, HousesDestroyedScale INT,
+    Injuries INT, Deaths INT
+);
+CREATE TABLE NationalEconomicImpact (
+    CountryName TEXT, Year INT, GDPAnnualPercentGrowth REAL, CPI_2010_100 REAL,
+    ExportsAnnualPercentGrowth REAL, ImportAnnualPercentGrowth REAL, UnemploymentPercent REAL,
+    PRIMARY KEY (CountryName, Year)
+);
+CREATE TABLE SectoralEconomicImpact (
+    CountryName TEXT, Year INT, AgricultureAnnualPercentGrowth REAL, IndustryAnnualPercentGrowth REAL,
+    ManufacturingAnnualPercentGrowth REAL, ServiceAnnualPercentGrowth REAL,
+    PRIMARY KEY (CountryName, Year)
+);
+CREATE TABLE DisasterSummary (
+    CountryName TEXT, Year INT, Type TEXT, DisasterCount INT, Deaths INT, Injuries INT,
+    TotalDamage INT, HousesDestroyed INT, PRIMARY KEY (CountryName, Year, Type)
+);
+CREATE TABLE EconomicSnapshot (
+    CountryName TEXT, Year INT, GDPAnnualPercentGrowth REAL, CPI_2010_100 REAL,
+    ExportsAnnualPercentGrowth REAL, ImportAnnualPercentGrowth REAL, UnemploymentPercent REAL,
+    AgricultureAnnualPercentGrowth REAL, IndustryAnnualPercentGrowth REAL,
+    ManufacturingAnnualPercentGrowth REAL, ServiceAnnualPercentGrowth REAL,
+    HasNational INT, HasSectoral INT, PRIMARY KEY (CountryName, Year)
+);
+CREATE TABLE State (StateCode TEXT PRIMARY KEY, StateName TEXT);
+CREATE TABLE StateEconomicTotals (
+    StateName TEXT, Year INT, GDP REAL, GDPGrowth REAL, PersonalIncome REAL, PersonalIncomeGrowth REAL,
+    PRIMARY KEY (StateName, Year)
+);
+CREATE TABLE StateIndustryGrowth (
+    StateName TEXT, Year INT, AgriculturePercentGrowth REAL, ManufacturingPercentGrowth REAL,
+    RealEstatePercentGrowth REAL, PRIMARY KEY (StateName, Year)
+);
+CREATE TABLE StateDisasters (DisasterID INTEGER PRIMARY KEY, StateCode TEXT, Year INT, DisasterType TEXT);
+CREATE INDEX idx_nd_country_year ON NaturalDisaster (CountryName, Year);
+CREATE INDEX idx_dd_disaster ON DirectDamage (DisasterID);
+CREATE INDEX idx_sd_code_year ON StateDisasters (StateCode, Year);
+CREATE INDEX idx_ds_year_type ON DisasterSummary (Year, Type);
+"""
+
+DISASTER_TYPES = ["Earthquake", "Tsunami", "Volcano"]
+STATE_DISASTER_TYPES = ["Flood", "Fire", "Tornado", "Severe Storm", "Drought", "Snowstorm"]
+
+
+def seed_sqlite(path, n_countries=60, n_disasters=10000, n_states=50, seed=411):
+    """Create and fill every table; returns (country names, state names)."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+
+    countries = [f"Country {i:03d}" for i in range(n_countries)]
+    conn.executemany(
+        "INSERT INTO Country VALUES (?, ?, ?, ?)",
+        [(name, rng.choice(["Low income", "High income"]), f"C{i:02d}", "Region")
+         for i, name in enumerate(countries)],
+    )
+    national, sectoral = [], []
+    for name in countries:
+        for year in range(1960, 2024):
+            # Leave gaps so NULL handling is exercised
+            if rng.random() < 0.9:
+                national.append((name, year, rng.uniform(-5, 9), rng.uniform(5, 200), rng.uniform(-8, 12),
+                                 rng.uniform(-8, 12), rng.choice([None, rng.uniform(1, 20)])))
+            if rng.random() < 0.8:
+                sectoral.append((name, year, rng.uniform(-5, 9), rng.uniform(-5, 9),
+                                 rng.uniform(-5, 9), rng.uniform(-5, 9)))
+    conn.executemany("INSERT INTO NationalEconomicImpact VALUES (?, ?, ?, ?, ?, ?, ?)", national)
+    conn.executemany("INSERT INTO SectoralEconomicImpact VALUES (?, ?, ?, ?, ?, ?)", sectoral)
+
+    disasters, damage = [], []
+    for disaster_id in range(n_disasters):
+        name = rng.choice(countries)
+        disasters.append((disaster_id, name, rng.choice(DISASTER_TYPES), rng.randint(1900, 2023), rng.uniform(0, 9),
+                          rng.uniform(-60, 70), rng.uniform(-180, 180)))
+        damage.append((disaster_id, disaster_id, name, rng.randint(0, 500), rng.randint(0, 4), rng.randint(0, 1000),
+                       rng.randint(0, 4), rng.randint(0, 300), rng.randint(0, 800)))
+    conn.executemany("INSERT INTO NaturalDisaster VALUES (?, ?, ?, ?, ?, ?, ?)", disasters)
+    conn.executemany("INSERT INTO DirectDamage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", damage)
+
+    states = seed_states(conn, rng, n_states)
+
+    conn.commit()
+    conn.close()
+    connection = SQLiteConnection(path)
+    refresh_summaries(connection)
+    connection.close()
+    return countries, states
+
+
+def seed_states(conn, rng, n_states=50):
+    """Fill State and the three state tables (there is no CSV source for them); returns the names."""
+    states = [f"State {i:02d}" for i in range(n_states)]
+    totals, growth, state_disasters = [], [], []
+    for i, name in enumerate(states):
+        code = f"S{i:02d}"
+        conn.execute("INSERT INTO State VALUES (?, ?)", (code, name))
+        for year in range(1997, 2024):
+            totals.append((name, year, rng.uniform(1e4, 3e6), rng.uniform(-3, 7), rng.uniform(1e4, 2e6), rng.uniform(-3, 7)))
+            growth.append((name, year, rng.uniform(-5, 9), rng.uniform(-5, 9), rng.uniform(-5, 9)))
+            for _ in range(rng.randint(0, 6)):
+                state_disasters.append((code, year, rng.choice(STATE_DISASTER_TYPES)))
+    conn.executemany("INSERT INTO StateEconomicTotals VALUES (?, ?, ?, ?, ?, ?)", totals)
+    conn.executemany("INSERT INTO StateIndustryGrowth VALUES (?, ?, ?, ?, ?)", growth)
+    conn.executemany("INSERT INTO StateDisasters (StateCode, Year, DisasterType) VALUES (?, ?, ?)", state_disasters)
+    return states
+
+
+
+# MySQL -> SQLite translation of the checked-in DDL (sql/proj_tables.sql, backend/req.sql)
+
+_TRIGGER = re.compile(
+    r"CREATE TRIGGER\s+(\w+)\s+(BEFORE|AFTER)\s+(INSERT|UPDATE|DELETE)\s+ON\s+(\w+)"
+    r"\s+FOR EACH ROW\s+BEGIN(.*?)\bEND\b", re.S | re.I)
+_PROCEDURE = re.compile(r"CREATE PROCEDURE\s+(\w+)", re.I)
+
+
+def sqlite_tables(ddl):
+    """sql/proj_tables.sql as SQLite DDL; only the auto-increment keys need rewriting."""
+    return re.sub(r"INT PRIMARY KEY AUTO_INCREMENT", "INTEGER PRIMARY KEY AUTOINCREMENT", ddl, flags=re.I)
+
+
+def _split_args(text):
+    # Top-level comma split that leaves quoted strings and nested calls alone
+    args, depth, quote, current = [], 0, None, ""
+    for ch in text:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(current.strip())
+            current = ""
+            continue
+        current += ch
+    args.append(current.strip())
+    return args
+
+
+def _concat_to_pipes(sql):
+    while True:
+        start = sql.upper().find("CONCAT(")
+        if start < 0:
+            return sql
+        depth, quote, end = 0, None, start + len("CONCAT")
+        for end in range(start + len("CONCAT"), len(sql)):
+            ch = sql[end]
+            if quote:
+                quote = None if ch == quote else quote
+            elif ch in "'\"":
+                quote = ch
+            elif ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+                if depth == 0:
+                    break
+        inner = sql[start + len("CONCAT("):end]
+        sql = sql[:start] + "(" + " || ".join(_split_args(inner)) + ")" + sql[end + 1:]
+
+
+def sqlite_routines(sql):
+    """Triggers from backend/req.sql as SQLite statements, plus the names of what could not be translated.
+
+    NOW() and CONCAT() get their SQLite spellings; stored procedures have no
+    SQLite equivalent and are skipped.
+    """
+    statements = []
+    for name, timing, event, table, body in _TRIGGER.findall(sql):
+        body = _concat_to_pipes(body.replace("NOW()", "CURRENT_TIMESTAMP")).strip().rstrip(";")
+        statements.append(f"CREATE TRIGGER {name} {timing} {event} ON {table} FOR EACH ROW BEGIN {body}; END;")
+    return statements, _PROCEDURE.findall(sql)
+
+def with_rtt(connect, rtt):
+    # Sleep before every execute to stand in for the network round trip
+    def wrapped():
+        conn = connect()
+        cursor_factory = conn.cursor
+
+        def cursor(*args, **kwargs):
+            cur = cursor_factory(*args, **kwargs)
+            execute = cur.execute
+
+            def delayed(*a, **kw):
+                time.sleep(rtt)
+                return execute(*a, **kw)
+            cur.execute = delayed
+            return cur
+        conn.cursor = cursor
+        return conn
+    return wrapped
@@ -0,0 +1,287 @@
+"""Route benchmarks on a reproducibly seeded local database, with baseline comparison.
+
+The database is SQLite built from the checked-in schema: sql/proj_tables.sql
+plus any triggers in backend/req.sql (the CompareCountryStats procedure has
+no SQLite form and is skipped). The country, economic and disaster tables
+are loaded from the CSVs through the ETL (python -m etl). The state tables
+have no CSV source, so they and a benchmark user's saved graphs are filled
+from a fixed random seed.
+
+Each route is then driven through the Flask test client, cycling through a
+fixed set of request bodies. p50/p95/p99 latency and throughput per route
+are written as JSON. With --baseline the run is compared against a stored
+result, and the script exits with status 1 if any route's p50 or p95 got
+worse by more than --tolerance.
+
+    python benchmarks/run_benchmarks.py --out results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+
+The result cache is off unless --cache is given, so every request reaches
+the database. Feature switches such as SUMMARY_TABLES or
+GLOBAL_STATS_ENGINE are taken from the environment and recorded in the
+output.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+
+import db_pool  # noqa: E402
+from etl.loader import TABLES, load  # noqa: E402
+from localdb import seed_states, sqlite_routines, sqlite_tables, with_rtt  # noqa: E402
+
+PROJ_TABLES = os.path.join(BACKEND, "..", "sql", "proj_tables.sql")
+REQ_SQL = os.path.join(BACKEND, "req.sql")
+
+BENCH_USER = "bench"
+RECORDED_ENV = ["SUMMARY_TABLES", "GLOBAL_STATS_ENGINE", "CACHE_ENABLED", "METRICS_ENABLED", "DB_POOL_SIZE",
+                "PROFILE_WORKERS"]
+
+
+def seed(path, saved_graphs=200, seed_value=411):
+    """Build the benchmark database at `path`; returns a description for the report."""
+    with open(PROJ_TABLES) as f:
+        tables_ddl = f.read()
+    with open(REQ_SQL) as f:
+        routines, skipped = sqlite_routines(f.read())
+
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(path)
+    conn.executescript(sqlite_tables(tables_ddl))
+    for statement in routines:
+        conn.execute(statement)
+    states = seed_states(conn, rng)
+    conn.executemany(
+        "INSERT INTO SavedGraphs (Username, GraphTitle, Filters, Page) VALUES (?, ?, ?, ?)",
+        [(BENCH_USER, f"Graph {i}", json.dumps({"countries": [f"C{rng.randint(0, 99)}"], "startYear": 1990}),
+          rng.choice(["global", "compare", "state"])) for i in range(saved_graphs)],
+    )
+    conn.commit()
+    conn.close()
+
+    pool = db_pool.ConnectionPool(db_pool.sqlite_connect(path))
+    connection = pool.acquire()
+    try:
+        reports, _ = load(connection, TABLES, "sqlite")
+    finally:
+        connection.close()
+        pool.close()
+    return {
+        "states": states,
+        "skippedRoutines": skipped,
+        "rows": {report.table: report.rows for report in reports if report.table in TABLES},
+    }
+
+
+def request_sets(path, states):
+    """Route name -> list of (method, url, json body or None) cycled through during the run."""
+    conn = sqlite3.connect(path)
+    countries = [row[0] for row in conn.execute("""
+        SELECT CountryName FROM NaturalDisaster
+        GROUP BY CountryName ORDER BY COUNT(*) DESC, CountryName LIMIT 8
+    """)]
+    conn.close()
+
+    types = ["Earthquake", "Tsunami", "Volcano"]
+    global_stats = [
+        {"startYear": lo, "endYear": hi, "disasterTypes": types[:n], "indicators": indicators,
+         "aggregateBy": aggregate, "sortOption": sort}
+        for lo, hi in ((1960, 2023), (1995, 2005))
+        for n, indicators in ((1, ["AvgGDP"]), (3, ["AvgCPI", "AvgUnemployment", "AvgServiceGrowth"]))
+        for aggregate, sort in (("Disaster Types", "Year (Ascending)"), ("Individual Disasters", "Indicator (Descending)"))
+    ]
+    return {
+        "country_data": [("POST", "/country_data", {"country": c}) for c in countries],
+        "state_data": [("POST", "/state_data", {"state": s}) for s in states[:8]],
+        "compare_states": [
+            ("POST", "/compare_states", {"states": states[:n], "startYear": 2000, "endYear": 2020})
+            for n in (2, 10, 50)
+        ],
+        "compare_data_aggregated": [
+            ("POST", "/compare_data_aggregated", {
+                "countries": countries[:n], "indicators": indicators, "startYear": 1990, "endYear": 2020,
+                "disasterTypes": types,
+            })
+            for n in (2, 8) for indicators in (["AvgGDP"], ["AvgCPI", "AvgImportGrowth", "AvgIndustryGrowth"])
+        ],
+        "global_stats": [("POST", "/global_stats", body) for body in global_stats],
+        "saved_graphs": [
+            ("GET", "/saved_graphs", None),
+            ("GET", "/saved_graphs?limit=20", None),
+            ("GET", "/saved_graphs?limit=50&fields=summary", None),
+        ],
+    }
+
+
+def _send(client, method, url, body):
+    headers = {"Authorization": "Bearer benchmark", "Username": BENCH_USER}
+    if method == "GET":
+        response = client.get(url, headers=headers)
+    else:
+        response = client.post(url, json=body, headers=headers)
+    response.get_data()
+    return response.status_code
+
+
+def measure(app, requests, iterations, warmup, concurrency):
+    for method, url, body in requests * warmup:
+        _send(app.test_client(), method, url, body)
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(offset, count):
+        client = app.test_client()
+        local, failed = [], 0
+        for i in range(offset, offset + count):
+            method, url, body = requests[i % len(requests)]
+            start = time.perf_counter()
+            status = _send(client, method, url, body)
+            local.append((time.perf_counter() - start) * 1000)
+            failed += status != 200
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    per_thread = max(1, iterations // concurrency)
+    threads = [threading.Thread(target=worker, args=(i * per_thread, per_thread)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Print a per-route comparison; returns the routes whose p50 or p95 regressed beyond tolerance."""
+    regressions = []
+    print(f"\n{'route':<25} {'p50 ms':>17} {'p95 ms':>17} {'req/s':>15}")
+    for route, now in current["routes"].items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            print(f"{route:<25} (not in baseline)")
+            continue
+        flags = []
+        for metric in ("p50_ms", "p95_ms"):
+            if before[metric] and now[metric] / before[metric] > 1 + tolerance:
+                flags.append(metric)
+        if flags:
+            regressions.append(route)
+        print(f"{route:<25} {before['p50_ms']:>7.2f} → {now['p50_ms']:>7.2f} "
+              f"{before['p95_ms']:>7.2f} → {now['p95_ms']:>7.2f} "
+              f"{before['throughput_rps']:>6.0f} → {now['throughput_rps']:>6.0f}"
+              + ("   REGRESSED (" + ", ".join(flags) + ")" if flags else ""))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="reuse this seeded SQLite file (seeded first if missing)")
+    parser.add_argument("--iterations", type=int, default=200, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed passes over each route's requests")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads per route")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated network round trip per query")
+    parser.add_argument("--routes", nargs="+", help="only these routes")
+    parser.add_argument("--cache", action="store_true", help="leave the result cache on")
+    parser.add_argument("--out", help="write the results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50/p95 slowdown (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results JSON as the new baseline")
+    args = parser.parse_args()
+
+    path = args.db or tempfile.mktemp(suffix=".db")
+    start = time.perf_counter()
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+        states = [row[0] for row in conn.execute("SELECT StateName FROM State ORDER BY StateCode")]
+        conn.close()
+        seeded = {"states": states, "reused": True}
+    else:
+        seeded = seed(path)
+        print(f"seeded {path} in {time.perf_counter() - start:.1f}s: {seeded['rows']}", file=sys.stderr)
+
+    if not args.cache:
+        os.environ["CACHE_ENABLED"] = "0"
+    connect = db_pool.sqlite_connect(path)
+    if args.rtt_ms:
+        connect = with_rtt(connect, args.rtt_ms / 1000)
+    db_pool.configure_pool(db_pool.ConnectionPool(connect))
+
+    import flask_app
+    if flask_app.columnar_stats is not None:
+        flask_app.columnar_stats.load()
+
+    routes = {}
+    for route, requests in request_sets(path, seeded["states"]).items():
+        if args.routes and route not in args.routes:
+            continue
+        routes[route] = measure(flask_app.app, requests, args.iterations, args.warmup, args.concurrency)
+        r = routes[route]
+        print(f"{route:<25} p50 {r['p50_ms']:8.2f}  p95 {r['p95_ms']:8.2f}  p99 {r['p99_ms']:8.2f} ms  "
+              f"{r['throughput_rps']:8.1f} req/s" + (f"  {r['errors']} errors" if r["errors"] else ""))
+
+    result = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "rttMs": args.rtt_ms,
+            "cache": args.cache,
+            "env": {key: os.environ[key] for key in RECORDED_ENV if key in os.environ},
+            "rows": seeded.get("rows"),
+            "skippedRoutines": seeded.get("skippedRoutines"),
+        },
+        "routes": routes,
+    }
+    for target in filter(None, (args.out, args.save_baseline)):
+        with open(target, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+    if not args.db:
+        os.remove(path)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"\nregressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
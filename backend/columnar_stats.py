@@ -0,0 +1,116 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATORS
+from query_catalog import AGGREGATIONS, OUTPUT_NAMES, sort_column
+
+
+# Indicator alias -> (table, column) as used by the SQL path in global_stats
+INDICATOR_COLUMNS = {alias: (table, column) for alias, (_, table, column) in INDICATORS.items()}
+
+TABLES = ("NaturalDisaster", "DirectDamage", "NationalEconomicImpact", "SectoralEconomicImpact")
+
+
+def _read_frame(connection, sql):
+    cursor = connection.cursor()
+    cursor.execute(sql)
+    rows = cursor.fetchall()
+    columns = [d[0] for d in cursor.description]
+    cursor.close()
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _columns_for(table):
+    return [column for t, column in INDICATOR_COLUMNS.values() if t == table]
+
+
+class ColumnarStats:
+    """In-memory, pre-joined copy of the global_stats tables.
+
+    NaturalDisaster is joined to DirectDamage and both economic tables on
+    (CountryName, Year) once, at load time, with the same LEFT JOIN row
+    multiplicity as the SQL query. Requests are then a mask plus a group-by.
+    """
+
+    def __init__(self, get_connection):
+        self._get_connection = get_connection
+        self._lock = threading.Lock()
+        self._joined = None
+
+    def load(self):
+        national_cols = ", ".join(["CountryName", "Year"] + _columns_for("NationalEconomicImpact"))
+        sectoral_cols = ", ".join(["CountryName", "Year"] + _columns_for("SectoralEconomicImpact"))
+        connection = self._get_connection()
+        try:
+            disasters = _read_frame(connection, "SELECT DisasterID, CountryName, Type, Year FROM NaturalDisaster")
+            damage = _read_frame(connection, "SELECT DisasterID FROM DirectDamage")
+            national = _read_frame(connection, f"SELECT {national_cols} FROM NationalEconomicImpact")
+            sectoral = _read_frame(connection, f"SELECT {sectoral_cols} FROM SectoralEconomicImpact")
+        finally:
+            connection.close()
+
+        joined = disasters.merge(damage, on="DisasterID", how="left")
+        joined = joined.merge(national, on=["CountryName", "Year"], how="left")
+        joined = joined.merge(sectoral, on=["CountryName", "Year"], how="left")
+        for _, column in INDICATOR_COLUMNS.values():
+            joined[column] = pd.to_numeric(joined[column], errors="coerce").astype(np.float64)
+        joined["Year"] = joined["Year"].astype(np.int64)
+        joined["Type"] = joined["Type"].astype("category")
+        joined = joined.drop(columns=["CountryName"]).sort_values("Year", kind="stable").reset_index(drop=True)
+
+        with self._lock:
+            self._joined = joined
+        return len(joined)
+
+    def reset(self):
+        # Forget the loaded copy; the next query reloads it
+        with self._lock:
+            self._joined = None
+
+    def _frame(self):
+        with self._lock:
+            joined = self._joined
+        if joined is None:
+            self.load()
+            with self._lock:
+                joined = self._joined
+        return joined
+
+    def query(self, start_year, end_year, disaster_types, indicators, aggregate_by, sort_option):
+        joined = self._frame()
+        known = [ind for ind in dict.fromkeys(indicators) if ind in INDICATOR_COLUMNS]
+        if not known:
+            return []
+
+        years = joined["Year"].to_numpy()
+        lo = np.searchsorted(years, int(start_year), side="left")
+        hi = np.searchsorted(years, int(end_year), side="right")
+        frame = joined.iloc[lo:hi]
+        if disaster_types:
+            frame = frame[frame["Type"].isin(disaster_types).to_numpy()]
+
+        keys = list(AGGREGATIONS[aggregate_by])
+        columns = [INDICATOR_COLUMNS[ind][1] for ind in known]
+
+        grouped = frame.groupby(keys, sort=True, observed=True)[columns].mean()
+        grouped.columns = known
+        grouped = grouped.reset_index().rename(columns=OUTPUT_NAMES)
+        grouped["DisasterType"] = grouped["DisasterType"].astype(object)
+        grouped = grouped[grouped[known].notna().any(axis=1).to_numpy()]
+
+        order = sort_column(sort_option, known)
+        if order is not None:
+            # MySQL puts NULLs first ascending and last descending
+            column, descending = order
+            grouped = grouped.sort_values(column, ascending=not descending, kind="stable",
+                                          na_position="last" if descending else "first")
+
+        # Build the records from plain lists; NaN (x != x) becomes JSON null
+        names = list(grouped.columns)
+        values = [grouped[name].tolist() for name in names]
+        for i, name in enumerate(names):
+            if name in known:
+                values[i] = [None if v != v else v for v in values[i]]
+        return [dict(zip(names, row)) for row in zip(*values)]
@@ -0,0 +1,143 @@
+from functools import lru_cache
+
+from indicators import UnknownIndicator, resolve_indicators, select_expression
+from summaries import SUMMARY_TABLES, comparison_summary_sql
+
+
+# Prepared statements kept per physical connection
+MAX_PREPARED_PER_CONNECTION = 32
+
+
+def _bucket(n):
+    # Round IN-list lengths up to a power of two so only a handful of
+    # statement shapes exist and each one gets prepared once per connection
+    size = 1
+    while size < n:
+        size *= 2
+    return size
+
+
+def _padded(values):
+    values = list(values)
+    return values + [values[-1]] * (_bucket(len(values)) - len(values))
+
+
+@lru_cache(maxsize=256)
+def comparison_sql(aliases, n_countries, n_types):
+    indicator_sql = "".join(f"{select_expression(alias)},\n            " for alias in aliases)
+    return f"""
+        SELECT
+            ne.CountryName,
+            {indicator_sql}COUNT(DISTINCT nd.DisasterID) AS TotalDisasters,
+            SUM(dd.Deaths) AS TotalDeaths
+        FROM NationalEconomicImpact ne
+        JOIN SectoralEconomicImpact se
+            ON ne.CountryName = se.CountryName AND ne.Year = se.Year
+        LEFT JOIN NaturalDisaster nd
+            ON ne.CountryName = nd.CountryName AND ne.Year = nd.Year
+        LEFT JOIN DirectDamage dd
+            ON nd.DisasterID = dd.DisasterID
+        WHERE ne.CountryName IN ({', '.join(['%s'] * n_countries)})
+          AND (nd.Type IN ({', '.join(['%s'] * n_types)}) OR nd.Type IS NULL)
+          AND ne.Year BETWEEN %s AND %s
+        GROUP BY ne.CountryName
+        ORDER BY ne.CountryName
+    """
+
+
+def _prepared_cursor(connection, sql):
+    statements = getattr(connection, "statement_cache", None)
+    if statements is None:
+        return connection.cursor(prepared=True), False
+    cursor = statements.pop(sql, None)
+    if cursor is None:
+        cursor = connection.cursor(prepared=True)
+        if len(statements) >= MAX_PREPARED_PER_CONNECTION:
+            oldest = next(iter(statements))
+            statements.pop(oldest).close()
+    # Re-insert so the dict stays in least-recently-used order
+    statements[sql] = cursor
+    return cursor, True
+
+
+def comparison_query(countries, aliases, start_year, end_year, disaster_types):
+    """(sql, params) for a country comparison; IN lists are padded to a few fixed lengths."""
+    years = [int(start_year), int(end_year)]
+    if SUMMARY_TABLES:
+        sql = comparison_summary_sql(aliases, _bucket(len(countries)), _bucket(len(disaster_types)))
+        return sql, _padded(disaster_types) + (_padded(countries) + years) * 2
+    sql = comparison_sql(aliases, _bucket(len(countries)), _bucket(len(disaster_types)))
+    return sql, _padded(countries) + _padded(disaster_types) + years
+
+
+def compare_country_stats(connection, countries, aliases, start_year, end_year, disaster_types):
+    """Server-side replacement for the CompareCountryStats procedure.
+
+    `aliases` must come from resolve_indicators(); values are only ever bound
+    as parameters. With SUMMARY_TABLES=1 it reads the summary tables instead.
+    """
+    sql, params = comparison_query(countries, aliases, start_year, end_year, disaster_types)
+
+    cursor, cached = _prepared_cursor(connection, sql)
+    try:
+        cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except Exception:
+        if cached:
+            connection.statement_cache.pop(sql, None)
+        cursor.close()
+        raise
+    if not cached:
+        cursor.close()
+    return rows
+
+
+def fill_missing(results, countries, aliases):
+    """Append an all-"N/A" row for every requested country the query returned nothing for."""
+    fetched_countries = {row['CountryName'] for row in results}
+    for c in countries:
+        if c not in fetched_countries:
+            na_row = {"CountryName": c}
+            for alias in aliases:
+                na_row[alias] = "N/A"
+            na_row["TotalDisasters"] = "N/A"
+            na_row["TotalDeaths"] = "N/A"
+            results.append(na_row)
+    return results
+
+
+def state_comparison_query(states, start_year, end_year):
+    """(sql, params) for averages, maxima and disaster counts per state in one grouped query."""
+    # Disaster counts are joined in rather than queried per state
+    placeholders = ','.join(['%s'] * len(states))
+    sql = f"""
+        SELECT 
+            t.StateName,
+            AVG(t.GDPGrowth) as AvgGDPGrowth,
+            AVG(t.PersonalIncomeGrowth) as AvgPersonalIncomeGrowth,
+            MAX(t.GDP) as MaxGDP,
+            MAX(t.PersonalIncome) as MaxPersonalIncome,
+            COALESCE(MAX(dc.DisasterCount), 0) as DisasterCount
+        FROM StateEconomicTotals t
+        LEFT JOIN (
+            SELECT s.StateName, COUNT(*) as DisasterCount
+            FROM StateDisasters sd
+            JOIN State s ON sd.StateCode = s.StateCode
+            WHERE s.StateName IN ({placeholders}) AND sd.Year BETWEEN %s AND %s
+            GROUP BY s.StateName
+        ) dc ON dc.StateName = t.StateName
+        WHERE t.StateName IN ({placeholders}) AND t.Year BETWEEN %s AND %s
+        GROUP BY t.StateName
+    """
+    return sql, (*states, start_year, end_year, *states, start_year, end_year)
+
+
+def compare_state_stats(connection, states, start_year, end_year):
+    """Per-state comparison rows as {lower-cased StateName: row}; states without economic data are absent."""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(*state_comparison_query(states, start_year, end_year))
+        return {row['StateName'].lower(): row for row in cursor.fetchall()}
+    finally:
+        cursor.close()
@@ -0,0 +1,184 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from summaries import SUMMARY_TABLES, TIMELINE_SQL, BATCH_TIMELINE_SQL
+
+
+# Each stage is independent, so they run side by side on pooled connections.
+# The timeline is pivoted in SQL (one row per year, one column per type).
+PROFILE_QUERIES = {
+    "overview": ("one", "SELECT * FROM Country WHERE CountryName = %s"),
+    "sectoral": ("all", """
+        SELECT * FROM SectoralEconomicImpact
+        WHERE CountryName = %s
+        ORDER BY Year
+    """),
+    "national": ("all", """
+        SELECT * FROM NationalEconomicImpact
+        WHERE CountryName = %s
+        ORDER BY Year
+    """),
+    "disasters": ("all", """
+        SELECT
+            nd.Type, nd.Year, nd.Intensity,
+            dd.TotalDamage, dd.TotalDamageScale,
+            dd.Injuries, dd.Deaths
+        FROM NaturalDisaster nd
+        JOIN DirectDamage dd ON nd.DisasterID = dd.DisasterID
+        WHERE nd.CountryName = %s
+        ORDER BY nd.Year DESC
+    """),
+    "timeline": ("all", """
+        SELECT
+            Year,
+            COUNT(CASE WHEN Type = 'Earthquake' THEN 1 END) AS Earthquake,
+            COUNT(CASE WHEN Type = 'Tsunami' THEN 1 END) AS Tsunami,
+            COUNT(CASE WHEN Type = 'Volcano' THEN 1 END) AS Volcano
+        FROM NaturalDisaster
+        WHERE CountryName = %s AND Year >= 1960
+        GROUP BY Year
+        ORDER BY Year ASC
+    """),
+}
+
+# The same stages for several countries at once; rows are split by CountryName
+# afterwards, and stages that only select it for that drop it again.
+BATCH_PROFILE_QUERIES = {
+    "overview": ("one", "SELECT * FROM Country WHERE CountryName IN ({countries})"),
+    "sectoral": ("all", """
+        SELECT * FROM SectoralEconomicImpact
+        WHERE CountryName IN ({countries})
+        ORDER BY Year
+    """),
+    "national": ("all", """
+        SELECT * FROM NationalEconomicImpact
+        WHERE CountryName IN ({countries})
+        ORDER BY Year
+    """),
+    "disasters": ("all", """
+        SELECT
+            nd.CountryName,
+            nd.Type, nd.Year, nd.Intensity,
+            dd.TotalDamage, dd.TotalDamageScale,
+            dd.Injuries, dd.Deaths
+        FROM NaturalDisaster nd
+        JOIN DirectDamage dd ON nd.DisasterID = dd.DisasterID
+        WHERE nd.CountryName IN ({countries})
+        ORDER BY nd.Year DESC
+    """),
+    "timeline": ("all", """
+        SELECT
+            CountryName,
+            Year,
+            COUNT(CASE WHEN Type = 'Earthquake' THEN 1 END) AS Earthquake,
+            COUNT(CASE WHEN Type = 'Tsunami' THEN 1 END) AS Tsunami,
+            COUNT(CASE WHEN Type = 'Volcano' THEN 1 END) AS Volcano
+        FROM NaturalDisaster
+        WHERE CountryName IN ({countries}) AND Year >= 1960
+        GROUP BY CountryName, Year
+        ORDER BY Year ASC
+    """),
+}
+_SPLIT_ONLY = {"disasters", "timeline"}
+
+if SUMMARY_TABLES:
+    PROFILE_QUERIES["timeline"] = ("all", TIMELINE_SQL)
+    BATCH_PROFILE_QUERIES["timeline"] = ("all", BATCH_TIMELINE_SQL)
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PROFILE_WORKERS", "8")),
+    thread_name_prefix="profile",
+)
+
+
+def _run_stage(get_connection, fetch, sql, params):
+    start = time.perf_counter()
+    connection = get_connection()
+    checked_out = time.perf_counter()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        rows = cursor.fetchone() if fetch == "one" else cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    end = time.perf_counter()
+    return rows, (checked_out - start) * 1000, (end - checked_out) * 1000
+
+
+def assemble_country_profile(country, get_connection, reference=None):
+    """Fetch every section of a country profile concurrently.
+
+    Returns (profile, timings) where timings maps each stage to its query
+    time in ms, plus pool checkout time and the wall-clock total. With a
+    ReferenceData, the overview is its Country row instead of a query.
+    """
+    start = time.perf_counter()
+    futures = {
+        name: _executor.submit(_run_stage, get_connection, fetch, sql, (country,))
+        for name, (fetch, sql) in PROFILE_QUERIES.items()
+        if not (name == "overview" and reference is not None)
+    }
+
+    profile = {}
+    timings = {}
+    checkout = 0.0
+    if reference is not None:
+        profile["overview"] = reference.country(country)
+    for name, future in futures.items():
+        rows, wait_ms, query_ms = future.result()
+        profile[name] = rows
+        timings[name] = query_ms
+        checkout = max(checkout, wait_ms)
+    timings["checkout"] = checkout
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return profile, timings
+
+
+def assemble_country_profiles(countries, get_connection):
+    """Profiles for several countries with one query per stage.
+
+    Returns ({requested name: profile or None}, timings); a country with no
+    Country row maps to None. Names match case-insensitively, as in MySQL.
+    """
+    start = time.perf_counter()
+    names = list(dict.fromkeys(countries))
+    placeholders = ", ".join(["%s"] * len(names))
+    futures = {
+        stage: _executor.submit(_run_stage, get_connection, "all", sql.format(countries=placeholders), tuple(names))
+        for stage, (_, sql) in BATCH_PROFILE_QUERIES.items()
+    }
+
+    by_stage = {}
+    timings = {}
+    checkout = 0.0
+    for stage, future in futures.items():
+        rows, wait_ms, query_ms = future.result()
+        split = {}
+        for row in rows:
+            key = row["CountryName"].lower()
+            if stage in _SPLIT_ONLY:
+                row = {k: v for k, v in row.items() if k != "CountryName"}
+            split.setdefault(key, []).append(row)
+        by_stage[stage] = split
+        timings[stage] = query_ms
+        checkout = max(checkout, wait_ms)
+
+    profiles = {}
+    for name in names:
+        key = name.lower()
+        if key not in by_stage["overview"]:
+            profiles[name] = None
+            continue
+        profiles[name] = {
+            stage: (split[key][0] if BATCH_PROFILE_QUERIES[stage][0] == "one" else split.get(key, []))
+            for stage, split in by_stage.items()
+        }
+    timings["checkout"] = checkout
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return profiles, timings
+
+
+def server_timing_header(timings):
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in timings.items())
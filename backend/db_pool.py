@@ -0,0 +1,411 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from instrumentation import METRICS_ENABLED, TimedCursor
+
+
+# Connection settings; the defaults are the shared course database
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "34.133.249.35"),
+    "port": int(os.environ.get("DB_PORT", "3306")),
+    "user": os.environ.get("DB_USER", "aaruldhawan"),
+    "password": os.environ.get("DB_PASSWORD", "scarjoe"),
+    "database": os.environ.get("DB_NAME", "test_databoose"),
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the checkout timeout."""
+
+
+class PooledConnection:
+    """Wraps a raw connection so that close() hands it back to the pool.
+
+    Routes keep their usual `finally: connection.close()` cleanup and the
+    socket stays open for the next request.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def is_connected(self):
+        return not self._released
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        return TimedCursor(cursor) if METRICS_ENABLED else cursor
+
+    @property
+    def statement_cache(self):
+        # Lives on the physical connection, so prepared statements outlast a single checkout
+        cache = getattr(self._raw, "_statement_cache", None)
+        if cache is None:
+            cache = {}
+            self._raw._statement_cache = cache
+        return cache
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw)
+
+    def discard(self):
+        # Drop a connection that is known to be broken instead of recycling it
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, connect, max_size=10, min_size=0, checkout_timeout=5.0,
+                 max_idle=300.0, max_lifetime=3600.0, health_check_interval=5.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.min_size = min_size
+        self.checkout_timeout = checkout_timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        # Idle entries are [raw, created_at, last_used]; most recently used on the right
+        self._idle = deque()
+        self._born = {}
+        self._in_use = 0
+        self._closed = False
+
+        self._created = 0
+        self._recycled = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        for _ in range(min_size):
+            raw = self._open()
+            self._idle.append([raw, self._born[id(raw)], time.monotonic()])
+
+    def _open(self):
+        raw = self._connect()
+        with self._cond:
+            self._born[id(raw)] = time.monotonic()
+            self._created += 1
+        return raw
+
+    def _forget(self, raw):
+        # Called with the lock held; the socket is closed later by _disconnect
+        self._born.pop(id(raw), None)
+        self._recycled += 1
+        return raw
+
+    @staticmethod
+    def _disconnect(raws):
+        # Called without the lock: closing can block on the network
+        for raw in raws:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def _expired(self, entry, now):
+        raw, created_at, last_used = entry
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return True
+        return bool(self.max_idle) and now - last_used > self.max_idle
+
+    def _healthy(self, entry, now):
+        raw, _, last_used = entry
+        if now - last_used < self.health_check_interval:
+            return True
+        try:
+            return _ping(raw)
+        except Exception:
+            return False
+
+    def evict_idle(self):
+        """Close idle connections past max_idle/max_lifetime, keeping min_size around."""
+        with self._cond:
+            evicted = self._evict_expired(time.monotonic())
+        self._disconnect(evicted)
+        return len(evicted)
+
+    def _evict_expired(self, now):
+        # Called with the lock held, on every checkout and return; returns the
+        # connections to _disconnect. Checkouts take the most recently used
+        # connection, so under light load the rest of the idle list goes
+        # unused until it ages out here.
+        evicted = []
+        keep = deque()
+        for entry in self._idle:
+            if len(keep) + self._in_use >= self.min_size and self._expired(entry, now):
+                evicted.append(self._forget(entry[0]))
+            else:
+                keep.append(entry)
+        self._idle = keep
+        if evicted:
+            self._cond.notify_all()
+        return evicted
+
+    def acquire(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+
+                now = time.monotonic()
+                doomed = self._evict_expired(now)
+                entry = None
+                while self._idle and entry is None:
+                    entry = self._idle.pop()
+                    if self._expired(entry, now):
+                        doomed.append(self._forget(entry[0]))
+                        entry = None
+
+                # Reserve the slot; the health check or the dial happens without the lock
+                reserved = entry is not None or self._in_use + len(self._idle) < self.max_size
+                if reserved:
+                    self._in_use += 1
+                elif not doomed:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"no database connection available after {timeout:.1f}s "
+                            f"({self._in_use}/{self.max_size} in use)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            self._disconnect(doomed)
+            if not reserved:
+                continue
+
+            try:
+                if entry is None:
+                    raw = self._open()
+                else:
+                    raw = entry[0] if self._healthy(entry, now) else None
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                if raw is None:
+                    # Failed its health check; give the slot back and look again
+                    self._in_use -= 1
+                    self._forget(entry[0])
+                    self._cond.notify()
+                else:
+                    self._checkouts += 1
+                    if waited:
+                        wait = time.monotonic() - start
+                        self._waits += 1
+                        self._wait_total += wait
+                        self._wait_max = max(self._wait_max, wait)
+            if raw is None:
+                self._disconnect([entry[0]])
+                continue
+            return PooledConnection(self, raw)
+
+    def release(self, raw, discard=False):
+        # End any open transaction so the next borrower does not inherit a stale
+        # snapshot; connections that report no transaction skip the round trip
+        if not discard and getattr(raw, "in_transaction", True):
+            try:
+                raw.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                doomed = [self._forget(raw)]
+            else:
+                self._idle.append([raw, self._born.get(id(raw), time.monotonic()), time.monotonic()])
+                doomed = []
+            doomed += self._evict_expired(time.monotonic())
+            self._cond.notify()
+        self._disconnect(doomed)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            doomed = [self._forget(entry[0]) for entry in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        self._disconnect(doomed)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "maxSize": self.max_size,
+                "minSize": self.min_size,
+                "inUse": self._in_use,
+                "idle": len(self._idle),
+                "created": self._created,
+                "recycled": self._recycled,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "waits": self._waits,
+                "waitTimeTotalMs": round(self._wait_total * 1000, 3),
+                "waitTimeMaxMs": round(self._wait_max * 1000, 3),
+                "waitTimeAvgMs": round(self._wait_total * 1000 / self._waits, 3) if self._waits else 0.0,
+            }
+
+
+def _ping(raw):
+    if hasattr(raw, "is_connected"):
+        return raw.is_connected()
+    cursor = raw.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    return True
+
+
+# SQLite stand-in so the pool and routes can run offline (tests, benchmarks)
+
+_PLACEHOLDER = re.compile(r"%s")
+
+
+class SQLiteCursor:
+    def __init__(self, conn, dictionary=False):
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self._cursor.execute(_PLACEHOLDER.sub("?", query), tuple(params or ()))
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(_PLACEHOLDER.sub("?", query), [tuple(p) for p in seq_params])
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([d[0] for d in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def nextset(self):
+        return None
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._conn, dictionary=dictionary)
+
+    def is_connected(self):
+        try:
+            self._conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def commit(self):
+        self._conn.commit()
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def mysql_connect():
+    import mysql.connector
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+def sqlite_connect(path):
+    return lambda: SQLiteConnection(path)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pool_from_env():
+    if os.environ.get("DB_BACKEND", "mysql") == "sqlite":
+        connect = sqlite_connect(os.environ.get("DB_SQLITE_PATH", "local.db"))
+    else:
+        connect = mysql_connect
+    return ConnectionPool(
+        connect,
+        max_size=int(os.environ.get("DB_POOL_SIZE", "10")),
+        min_size=int(os.environ.get("DB_POOL_MIN_SIZE", "0")),
+        checkout_timeout=float(os.environ.get("DB_POOL_TIMEOUT", "5")),
+        max_idle=float(os.environ.get("DB_POOL_MAX_IDLE", "300")),
+        max_lifetime=float(os.environ.get("DB_POOL_MAX_LIFETIME", "3600")),
+        health_check_interval=float(os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL", "5")),
+    )
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _pool_from_env()
+    return _pool
+
+
+def configure_pool(pool):
+    """Swap in a different pool (e.g. a SQLite-backed one); returns the old one."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, pool
+    return old
@@ -0,0 +1,192 @@
+"""Response encoding: a faster JSON provider, the columnar format and compression.
+
+orjson and brotli are optional. Without orjson Flask's own provider is kept;
+without brotli only gzip is offered.
+"""
+import dataclasses
+import decimal
+import os
+import re
+import uuid
+import zlib
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESS_RESPONSES = os.environ.get("COMPRESS_RESPONSES", "1") != "0"
+# Bodies smaller than this are sent as they are
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE = {"application/json", "application/x-ndjson"}
+
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+
+
+def _default(o):
+    # Same conversions as Flask's provider
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _escape(match):
+    # json.dumps(ensure_ascii=True) spelling: \uXXXX, astral characters as surrogate pairs
+    n = ord(match.group())
+    if n < 0x10000:
+        return f"\\u{n:04x}"
+    n -= 0x10000
+    return f"\\u{0xd800 | (n >> 10):04x}\\u{0xdc00 | (n & 0x3ff):04x}"
+
+
+def _ascii_json(text):
+    """orjson output with non-ASCII escaped, as Flask's ensure_ascii does. orjson
+    writes non-ASCII only inside strings, where the escape means the same."""
+    return text if text.isascii() else _NON_ASCII.sub(_escape, text)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """orjson-backed provider close to the default provider's output.
+
+    Keys are sorted, Decimal/UUID become strings, dates HTTP dates and
+    non-ASCII is escaped while ensure_ascii is set, so responses are
+    byte-for-byte those of Flask outside debug mode, with two exceptions:
+    NaN and infinities become null (Flask writes NaN, which is not JSON),
+    and dumps() is always compact where json.dumps puts a space after
+    separators.
+    """
+
+    if orjson is not None:
+        OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                   | orjson.OPT_SERIALIZE_NUMPY)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        text = orjson.dumps(obj, default=_default, option=self.OPTIONS).decode()
+        return _ascii_json(text) if self.ensure_ascii else text
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self.OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        if self.ensure_ascii and not body.isascii():
+            body = _ascii_json(body.decode()).encode()
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def wants_columnar(data):
+    """Body or query field {"format": "columnar"}."""
+    return isinstance(data, dict) and data.get("format") == "columnar"
+
+
+def shaped(result, data):
+    # The route's result in the format the request asked for
+    return columnar(result) if wants_columnar(data) else result
+
+
+def columnar(value):
+    """Every list of row dicts, at any depth, as {"columns": [names], "values": [[column], ...]}.
+
+    Column names are sorted; a row missing a column has null there.
+    """
+    if isinstance(value, dict):
+        return {key: columnar(item) for key, item in value.items()}
+    if isinstance(value, list) and all(isinstance(row, dict) for row in value):
+        names = sorted({name for row in value for name in row})
+        return {"columns": names, "values": [[row.get(name) for row in value] for name in names]}
+    return value
+
+
+def choose_encoding(accept_encodings):
+    """"br" or "gzip" per the request's Accept-Encoding (a werkzeug Accept), or None."""
+    offers = (["br"] if brotli is not None else []) + ["gzip"]
+    return accept_encodings.best_match(offers, default=None)
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return zlib.compress(body, GZIP_LEVEL, wbits=31)
+
+
+def compressed(cache, response, body, encoding):
+    key = getattr(response, "cache_key", None)
+    if key is None:
+        return compress(body, encoding)
+    return cache.encoded(key, encoding, body, lambda data: compress(data, encoding))
+
+
+def _compressed_chunks(chunks, encoding, response):
+    # Each chunk is flushed so streamed rows still reach the client as they are
+    # produced; the uncompressed bytes are tallied on the response as they pass
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            chunk = _bytes(chunk)
+            response.serialized_length += len(chunk)
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            chunk = _bytes(chunk)
+            response.serialized_length += len(chunk)
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+def _bytes(chunk):
+    return chunk.encode() if isinstance(chunk, str) else chunk
+
+
+def install_compression(app):
+    """Compress JSON and NDJSON responses with the best encoding the client accepts.
+
+    A response served from or stored in the result cache is compressed once
+    per encoding; the compressed body is kept with the cache entry. The
+    uncompressed size is left in response.serialized_length for the
+    response-size metric, whose hook runs after this one.
+    """
+    from flask import request
+    from result_cache import cache
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.mimetype not in COMPRESSIBLE
+                or "Content-Encoding" in response.headers or response.direct_passthrough):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.serialized_length = 0
+            response.response = _compressed_chunks(response.response, encoding, response)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < COMPRESS_MIN_BYTES:
+                return response
+            response.serialized_length = len(body)
+            response.set_data(compressed(cache, response, body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,2 @@
+"""Loads the World Bank and NOAA files under datasets/ and national_data/ into
+the tables from sql/proj_tables.sql. Run it from backend/ with `python -m etl`."""
@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+import time
+import urllib.request
+
+from db_pool import ConnectionPool, get_pool, sqlite_connect
+from etl.incremental import STATE_PATH, TIMELINE_TABLES, reload_timelines
+from etl.loader import DEFAULT_BATCH_SIZE, TABLES, load
+
+
+def notify_api(api_url, tables, cells=None):
+    # Drop cached API results that read the reloaded tables (only the changed cells, if given)
+    payload = {"tables": tables}
+    if cells is not None:
+        payload["cells"] = cells
+    request = urllib.request.Request(
+        api_url.rstrip("/") + "/cache/invalidate",
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m etl", description="Load the datasets into the database.")
+    parser.add_argument("--tables", nargs="+", choices=TABLES, default=TABLES)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--sqlite", metavar="PATH", help="load into a SQLite file instead of the configured MySQL")
+    parser.add_argument("--api-url", help="invalidate the running API's cache afterwards, e.g. http://127.0.0.1:5000")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only write changed timeline cells (NationalEconomicImpact, SectoralEconomicImpact)")
+    parser.add_argument("--state", default=STATE_PATH, help="fingerprint file used by --incremental")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        pool, dialect = ConnectionPool(sqlite_connect(args.sqlite)), "sqlite"
+    else:
+        pool, dialect = get_pool(), "mysql"
+
+    start = time.perf_counter()
+    connection = pool.acquire()
+    try:
+        if args.incremental:
+            tables = [t for t in args.tables if t in TIMELINE_TABLES] if args.tables != TABLES else list(TIMELINE_TABLES)
+            reports, changed = reload_timelines(connection, tables, dialect, args.batch_size, args.state)
+            unmatched = {}
+        else:
+            reports, unmatched = load(connection, args.tables, dialect, args.batch_size)
+    finally:
+        connection.close()
+
+    for report in reports:
+        print(report)
+    print(f"total {time.perf_counter() - start:.2f}s")
+    if unmatched:
+        skipped = sum(unmatched.values())
+        worst = ", ".join(f"{name} ({n})" for name, n in sorted(unmatched.items(), key=lambda x: -x[1])[:10])
+        print(f"skipped {skipped} disaster rows with no matching country, e.g. {worst}", file=sys.stderr)
+
+    if args.api_url and args.incremental:
+        if changed:
+            cells = sorted({tuple(cell) for table_cells in changed.values() for cell in table_cells})
+            print(notify_api(args.api_url, list(changed), cells))
+    elif args.api_url:
+        print(notify_api(args.api_url, [r.table for r in reports]))
+
+
+if __name__ == "__main__":
+    main()
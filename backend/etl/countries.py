@@ -0,0 +1,146 @@
+import re
+import unicodedata
+
+
+# NOAA spellings -> World Bank names (as used for Country.CountryName)
+ALIASES = {
+    "usa": "United States",
+    "usa territory": "United States",
+    "uk": "United Kingdom",
+    "uk territory": "United Kingdom",
+    "scotland": "United Kingdom",
+    "turkey": "Turkiye",
+    "iran": "Iran, Islamic Rep.",
+    "russia": "Russian Federation",
+    "syria": "Syrian Arab Republic",
+    "syrian coasts": "Syrian Arab Republic",
+    "myanmar (burma)": "Myanmar",
+    "south korea": "Korea, Rep.",
+    "korea": "Korea, Rep.",
+    "north korea": "Korea, Dem. People's Rep.",
+    "egypt": "Egypt, Arab Rep.",
+    "kyrgyzstan": "Kyrgyz Republic",
+    "vietnam": "Viet Nam",
+    "yemen": "Yemen, Rep.",
+    "venezuela": "Venezuela, RB",
+    "congo": "Congo, Rep.",
+    "congo, drc": "Congo, Dem. Rep.",
+    "micronesia, fed. states of": "Micronesia, Fed. Sts.",
+    "marshall islands, rep. of": "Marshall Islands",
+    "solomon is.": "Solomon Islands",
+    "virgin islands": "Virgin Islands (U.S.)",
+    "saint vincent and the grenadines": "St. Vincent and the Grenadines",
+    "st. vincent & the grenadines": "St. Vincent and the Grenadines",
+    "st. kitts & nevis": "St. Kitts and Nevis",
+    "saint lucia": "St. Lucia",
+    "cape verde": "Cabo Verde",
+    "cote d'ivoire": "Cote d'Ivoire",
+    "holland": "Netherlands",
+    "the netherlands": "Netherlands",
+    "slovakia": "Slovak Republic",
+    "laos": "Lao PDR",
+    "trinidad": "Trinidad and Tobago",
+    "vanuatu islands": "Vanuatu",
+    "tonga islands": "Tonga",
+    "tonga trench": "Tonga",
+    "fiji islands": "Fiji",
+    "samoa islands": "Samoa",
+    "kermadec islands": "New Zealand",
+    "azores": "Portugal",
+    "canary islands": "Spain",
+    "martinique": "France",
+    "guadeloupe": "France",
+    "reunion": "France",
+    "wallis and futuna": "France",
+    "montserrat": "United Kingdom",
+    "balkans nw": "Bosnia and Herzegovina",
+    "instanbul (constantinople)": "Turkiye",
+    "marmara sea": "Turkiye",
+    "south coasts of asia minor": "Turkiye",
+    "sumatra": "Indonesia",
+    "java sea": "Indonesia",
+    "japan trench": "Japan",
+    "sea of japan": "Japan",
+    "british columbia": "Canada",
+}
+
+US_STATES = {
+    "alabama", "alaska", "arizona", "arkansas", "california", "colorado", "connecticut", "delaware",
+    "florida", "georgia", "hawaii", "idaho", "illinois", "indiana", "iowa", "kansas", "kentucky",
+    "louisiana", "maine", "maryland", "massachusetts", "michigan", "minnesota", "mississippi",
+    "missouri", "montana", "nebraska", "nevada", "new hampshire", "new jersey", "new mexico",
+    "new york", "north carolina", "north dakota", "ohio", "oklahoma", "oregon", "pennsylvania",
+    "rhode island", "south carolina", "south dakota", "tennessee", "texas", "utah", "vermont",
+    "virginia", "washington", "west virginia", "wisconsin", "wyoming",
+    "alaska peninsula", "hawaiian islands",
+}
+
+_DIRECTION = re.compile(r"^(?:[nsew]{1,2}\.|northern|southern|eastern|western)\s+")
+_PARENTHETICAL = re.compile(r"\s*\([^)]*\)\s*$")
+_ISLANDS = re.compile(r"\s+(?:islands?|is\.)$")
+
+
+def fold(name):
+    """Case-, accent- and whitespace-insensitive form of a place name."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class CountryResolver:
+    """Maps the free-text country names in the NOAA files to Country rows.
+
+    Tries, in order: exact (folded) name or ISO3 code, the alias table, US
+    states, then progressively looser forms ("SANRIKU, JAPAN" -> JAPAN,
+    "PERU-ECUADOR" -> PERU, "S. MEXICO" -> MEXICO). Oceans and seas stay
+    unmatched and are reported by the loader rather than guessed.
+    """
+
+    def __init__(self, countries):
+        # countries: iterable of (CountryName, CountryCode)
+        self._by_key = {}
+        for name, code in countries:
+            self._by_key[fold(name)] = name
+            if code:
+                self._by_key[fold(code)] = name
+        self._memo = {}
+        self.unmatched = {}
+
+    def _lookup(self, key):
+        if key in self._by_key:
+            return self._by_key[key]
+        if key in ALIASES and fold(ALIASES[key]) in self._by_key:
+            return self._by_key[fold(ALIASES[key])]
+        if key in US_STATES and "united states" in self._by_key:
+            return self._by_key["united states"]
+        return None
+
+    def _candidates(self, key):
+        yield key
+        stripped = _PARENTHETICAL.sub("", key)
+        yield stripped
+        if "," in stripped:
+            yield stripped.rsplit(",", 1)[1].strip()
+        if "-" in stripped:
+            yield stripped.split("-", 1)[0].strip()
+        undirected = _DIRECTION.sub("", stripped)
+        yield undirected
+        yield _ISLANDS.sub("", undirected)
+        if "," in undirected:
+            yield _ISLANDS.sub("", undirected.rsplit(",", 1)[1].strip())
+
+    def resolve(self, raw):
+        if raw is None or raw != raw:
+            return None
+        if raw in self._memo:
+            match = self._memo[raw]
+        else:
+            match = None
+            for candidate in self._candidates(fold(raw)):
+                match = self._lookup(candidate)
+                if match is not None:
+                    break
+            self._memo[raw] = match
+        if match is None:
+            self.unmatched[raw] = self.unmatched.get(raw, 0) + 1
+        return match
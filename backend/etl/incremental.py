@@ -0,0 +1,197 @@
+"""Incremental reload of the World Bank timelines.
+
+A fingerprint file records, per source file, its SHA-256, the year columns it
+had and a hash of each country row over those years. On the next run:
+
+- an unchanged file is skipped without parsing;
+- a row whose hash over the recorded years is unchanged only contributes the
+  newly appended year columns;
+- a changed or new row contributes all of its cells.
+
+Those candidate cells are then diffed against the values already in the
+table, and only cells that are new or different are upserted. With no
+fingerprint file every row is a candidate, so the first run costs one full
+diff but still writes nothing that is already loaded.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl import sources
+from etl.loader import DEFAULT_BATCH_SIZE, LoadReport, refresh, upsert_sql
+
+
+STATE_PATH = os.environ.get("ETL_STATE_PATH", os.path.join(sources.DATA_ROOT, ".timeline_state.json"))
+
+# Table -> {column: timeline file}
+TIMELINE_TABLES = {
+    "NationalEconomicImpact": sources.NATIONAL_SOURCES,
+    "SectoralEconomicImpact": sources.SECTORAL_SOURCES,
+}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_hashes(wide, years):
+    """Country Code -> hash of that row's values over `years` (as hex strings)."""
+    hashes = pd.util.hash_pandas_object(wide[years].astype("float64"), index=False)
+    return dict(zip(wide["Country Code"].tolist(), (f"{h:016x}" for h in hashes.tolist())))
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def read_wide(path):
+    skiprows = sources.header_row(path)
+    years, dtypes = sources.timeline_dtypes(path, skiprows)
+    wide = pd.read_csv(path, skiprows=skiprows, usecols=["Country Code"] + years,
+                       dtype=dtypes, encoding="utf-8-sig")
+    return wide.dropna(subset=["Country Code"]).drop_duplicates("Country Code"), years
+
+
+def candidate_cells(wide, years, previous):
+    """(CountryCode, Year, Value) for every cell that may differ from the last load.
+
+    Blank cells are kept (as NaN) so a value removed upstream is cleared too.
+    """
+    old_years = [y for y in (previous or {}).get("years", []) if y in years]
+    old_rows = (previous or {}).get("rows", {})
+    if old_years:
+        unchanged = row_hashes(wide, old_years)
+        same = np.array([old_rows.get(code) == h for code, h in unchanged.items()], dtype=bool)
+    else:
+        same = np.zeros(len(wide), dtype=bool)
+
+    new_years = np.array([y not in old_years for y in years], dtype=bool)
+    # A cell is a candidate if its row changed or its year column is new
+    mask = ~same[:, None] | new_years[None, :]
+    row, col = np.nonzero(mask)
+    values = wide[years].to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        "CountryCode": wide["Country Code"].to_numpy()[row],
+        "Year": np.asarray(years, dtype=np.int64)[col],
+        "Value": values[row, col],
+    })
+
+
+def loaded_values(connection, table, column, cells):
+    """Current (CountryName, Year, column) values for the candidate cells' countries and years."""
+    if cells.empty:
+        return pd.DataFrame(columns=["CountryName", "Year", "Loaded"])
+    countries = sorted(set(cells["CountryName"]))
+    years = sorted(set(cells["Year"].tolist()))
+    sql = (f"SELECT CountryName, Year, {column} FROM {table} "
+           f"WHERE CountryName IN ({', '.join(['%s'] * len(countries))}) "
+           f"AND Year IN ({', '.join(['%s'] * len(years))})")
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, countries + years)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    loaded = pd.DataFrame(rows, columns=["CountryName", "Year", "Loaded"])
+    loaded["Year"] = loaded["Year"].astype(np.int64)
+    loaded["Loaded"] = pd.to_numeric(loaded["Loaded"], errors="coerce").astype(np.float64)
+    return loaded
+
+
+def changed_cells(cells, loaded):
+    """Candidate cells whose value is new, different or cleared compared with `loaded`."""
+    merged = cells.merge(loaded, on=["CountryName", "Year"], how="left", indicator=True)
+    new, old = merged["Value"].to_numpy(), merged["Loaded"].to_numpy()
+    present = (merged["_merge"] == "both").to_numpy()
+    new_nan, old_nan = np.isnan(new), np.isnan(old)
+    differs = np.where(new_nan | old_nan, new_nan != old_nan, ~np.isclose(new, old, rtol=1e-9, atol=0))
+    # A blank cell with no row to clear is not a change
+    keep = np.where(present, differs, ~new_nan)
+    return merged.loc[keep, ["CountryName", "Year", "Value"]].reset_index(drop=True)
+
+
+def reload_table(connection, table, columns, names, state, dialect="mysql", batch_size=DEFAULT_BATCH_SIZE):
+    """Write only the changed cells of one table; returns (LoadReport, changed cells, new file states)."""
+    start = time.perf_counter()
+    changed = {}
+    file_states = {}
+    for column, relative in columns.items():
+        path = sources.data_path(relative)
+        digest = file_digest(path)
+        previous = state.get(relative)
+        if previous and previous.get("sha256") == digest:
+            continue
+        wide, years = read_wide(path)
+        cells = candidate_cells(wide, years, previous)
+        cells["CountryName"] = cells["CountryCode"].map(names)
+        cells = cells.dropna(subset=["CountryName"])
+        changed[column] = changed_cells(cells, loaded_values(connection, table, column, cells))
+        file_states[relative] = {"sha256": digest, "years": years, "rows": row_hashes(wide, years)}
+
+    cursor = connection.cursor()
+    written = 0
+    try:
+        for column, frame in changed.items():
+            sql = upsert_sql(table, ["CountryName", "Year", column], dialect)
+            values = frame["Value"].to_numpy()
+            rows = list(zip(frame["CountryName"].tolist(), frame["Year"].tolist(),
+                            np.where(np.isnan(values), None, values.astype(object)).tolist()))
+            for offset in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[offset:offset + batch_size])
+            written += len(rows)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    cells = set()
+    for frame in changed.values():
+        cells.update(zip(frame["CountryName"].tolist(), frame["Year"].tolist()))
+    return LoadReport(table, written, time.perf_counter() - start), cells, file_states
+
+
+def reload_timelines(connection, tables=tuple(TIMELINE_TABLES), dialect="mysql",
+                     batch_size=DEFAULT_BATCH_SIZE, state_path=STATE_PATH):
+    """Incrementally reload the timeline tables.
+
+    Returns (reports, {table: sorted [(country, year), ...]}) where the second
+    item lists the cells that were written, for targeted cache invalidation.
+    The fingerprint file is updated after each table commits, and the
+    summary tables are rebuilt for the countries that changed.
+    """
+    countries = sources.read_countries()
+    names = countries.set_index("CountryCode")["CountryName"]
+    state = load_state(state_path)
+    reports, cells = [], {}
+    for table in tables:
+        report, changed, file_states = reload_table(
+            connection, table, TIMELINE_TABLES[table], names, state, dialect, batch_size)
+        state.update(file_states)
+        save_state(state, state_path)
+        reports.append(report)
+        if changed:
+            cells[table] = sorted(changed)
+    if cells:
+        countries = {country for table_cells in cells.values() for country, _ in table_cells}
+        reports += refresh(connection, list(cells), countries)
+    return reports, cells
@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+
+from etl.countries import CountryResolver
+from etl import sources
+from summaries import refresh_summaries, summaries_for
+
+
+# Table -> primary key columns; every other column is updated on conflict
+KEYS = {
+    "Country": ["CountryName"],
+    "NationalEconomicImpact": ["CountryName", "Year"],
+    "SectoralEconomicImpact": ["CountryName", "Year"],
+    "NaturalDisaster": ["DisasterID"],
+    "DirectDamage": ["DamageID"],
+}
+
+# Load order respects the foreign keys in sql/proj_tables.sql
+TABLES = list(KEYS)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def upsert_sql(table, columns, dialect):
+    placeholders = ", ".join(["%s"] * len(columns))
+    updates = [c for c in columns if c not in KEYS[table]]
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    if dialect == "sqlite":
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in updates)
+        return f"{sql} ON CONFLICT ({', '.join(KEYS[table])}) DO UPDATE SET {assignments}"
+    assignments = ", ".join(f"{c} = VALUES({c})" for c in updates)
+    return f"{sql} ON DUPLICATE KEY UPDATE {assignments}"
+
+
+def frame_rows(frame):
+    """DataFrame -> list of tuples of plain Python values, NaN and NA as None."""
+    columns = []
+    for name in frame.columns:
+        values = frame[name].to_numpy()
+        if values.dtype.kind == "f":
+            values = np.where(np.isnan(values), None, values.astype(object))
+        elif frame[name].hasnans:
+            # Nullable columns (Int64, string)
+            values = frame[name].to_numpy(dtype=object, na_value=None)
+        columns.append(values.tolist())
+    return list(zip(*columns))
+
+
+class LoadReport:
+    def __init__(self, table, rows, seconds):
+        self.table = table
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float("inf")
+
+    def __str__(self):
+        return f"{self.table:<24} {self.rows:>8} rows {self.seconds:>8.2f}s {self.rows_per_second:>10.0f} rows/s"
+
+
+def bulk_upsert(connection, table, frame, dialect="mysql", batch_size=DEFAULT_BATCH_SIZE):
+    """Upsert `frame` into `table` in executemany batches inside one transaction."""
+    start = time.perf_counter()
+    sql = upsert_sql(table, list(frame.columns), dialect)
+    rows = frame_rows(frame)
+    cursor = connection.cursor()
+    try:
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[offset:offset + batch_size])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return LoadReport(table, len(rows), time.perf_counter() - start)
+
+
+def build_frames(tables=TABLES):
+    """Parse every source file needed for `tables`; returns ({table: frame}, resolver)."""
+    countries = sources.read_countries()
+    resolver = CountryResolver(zip(countries["CountryName"], countries["CountryCode"]))
+    frames = {"Country": countries}
+    if "NationalEconomicImpact" in tables:
+        frames["NationalEconomicImpact"] = sources.read_indicator_table(sources.NATIONAL_SOURCES, countries)
+    if "SectoralEconomicImpact" in tables:
+        frames["SectoralEconomicImpact"] = sources.read_indicator_table(sources.SECTORAL_SOURCES, countries)
+    if "NaturalDisaster" in tables or "DirectDamage" in tables:
+        frames["NaturalDisaster"], frames["DirectDamage"] = sources.read_disasters(resolver)
+    return {t: frames[t] for t in TABLES if t in tables}, resolver
+
+
+def refresh(connection, tables, countries=None):
+    """Rebuild the summary tables fed by `tables`; one LoadReport per summary."""
+    reports = []
+    for summary in summaries_for(tables):
+        start = time.perf_counter()
+        rows = refresh_summaries(connection, [summary], countries).get(summary, 0)
+        reports.append(LoadReport(summary, rows, time.perf_counter() - start))
+    return reports
+
+
+def load(connection, tables=TABLES, dialect="mysql", batch_size=DEFAULT_BATCH_SIZE):
+    """Parse the datasets and upsert them, then rebuild the summaries; safe to re-run.
+
+    Returns (a LoadReport per table, unmatched NOAA place names).
+    """
+    frames, resolver = build_frames(tables)
+    reports = [bulk_upsert(connection, table, frame, dialect, batch_size) for table, frame in frames.items()]
+    reports += refresh(connection, list(frames))
+    return reports, resolver.unmatched
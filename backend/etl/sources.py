@@ -0,0 +1,186 @@
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_ROOT = os.environ.get("DATA_ROOT", REPO_ROOT)
+
+ID_COLUMNS = ["Country Name", "Country Code", "Indicator Name", "Indicator Code"]
+
+# Target column -> World Bank timeline file, per table
+NATIONAL_SOURCES = {
+    "GDPAnnualPercentGrowth": "national_data/gdp growth/gdp_growth.csv",
+    "CPI_2010_100": "national_data/consumer price idx/cpi.csv",
+    "ExportsAnnualPercentGrowth": "national_data/export growth/export_growth.csv",
+    "ImportAnnualPercentGrowth": "national_data/import growth/import_growth.csv",
+    "UnemploymentPercent": "national_data/unemployment/unemployment.csv",
+}
+SECTORAL_SOURCES = {
+    "AgricultureAnnualPercentGrowth": "datasets/micro_datasets/agri_timeline.csv",
+    "IndustryAnnualPercentGrowth": "datasets/micro_datasets/industry_timeline.csv",
+    "ManufacturingAnnualPercentGrowth": "datasets/micro_datasets/manufacturing_timeline.csv",
+    "ServiceAnnualPercentGrowth": "datasets/micro_datasets/service_timeline.csv",
+}
+INCOME_GROUPS = "datasets/agriculture_datsets/income_groups.csv"
+
+# (Type, file, country column, intensity column), in the order DisasterIDs were first assigned
+DISASTER_SOURCES = [
+    ("Volcano", "datasets/natural_disaster_datasets/volcano-events.tsv", "Country", "VEI"),
+    ("Tsunami", "datasets/natural_disaster_datasets/tsunamis-event.tsv", "Country", "Tsunami Intensity"),
+    ("Earthquake", "datasets/natural_disaster_datasets/earthquakes-event.tsv", "Location Name", "Mag"),
+]
+DAMAGE_COLUMNS = {
+    "TotalDamage": "Total Damage ($Mil)",
+    "TotalDamageScale": "Total Damage Description",
+    "HousesDestroyed": "Houses Destroyed",
+    "HousesDestroyedScale": "Houses Destroyed Description",
+    "Injuries": "Injuries",
+    "Deaths": "Total Deaths",
+}
+
+
+# Wide rows per batch when streaming a timeline file
+TIMELINE_CHUNK_ROWS = 2000
+
+
+def data_path(relative):
+    return os.path.join(DATA_ROOT, relative)
+
+
+def header_row(path):
+    """Line index of the "Country Name" header; the national_data files have a metadata preamble."""
+    with open(path, encoding="utf-8-sig") as f:
+        for i, line in enumerate(f):
+            if line.startswith('"Country Name"'):
+                return i
+    raise ValueError(f"{path}: no World Bank header row")
+
+
+def timeline_dtypes(path, skiprows):
+    columns = pd.read_csv(path, skiprows=skiprows, nrows=0, encoding="utf-8-sig").columns
+    years = [c for c in columns if c.isdigit()]
+    dtypes = {c: "string" for c in ID_COLUMNS}
+    dtypes.update({c: "float64" for c in years})
+    return years, dtypes
+
+
+def iter_timeline(path, id_columns=("Country Code",), chunksize=TIMELINE_CHUNK_ROWS, value_dtype="float64"):
+    """Wide World Bank timeline -> long batches of (<id_columns>, Year, Value), non-null values only.
+
+    Reads `chunksize` wide rows at a time, so memory stays proportional to
+    the chunk rather than the file. Id columns are categorical, rows come
+    out in file order then year order.
+    """
+    skiprows = header_row(path)
+    years, _ = timeline_dtypes(path, skiprows)
+    year_values = np.asarray(years, dtype=np.int64)
+    dtypes = {c: "category" for c in id_columns}
+    dtypes.update({y: value_dtype for y in years})
+    reader = pd.read_csv(path, skiprows=skiprows, usecols=list(id_columns) + years, dtype=dtypes,
+                         chunksize=chunksize, encoding="utf-8-sig")
+    for chunk in reader:
+        values = chunk[years].to_numpy(dtype=value_dtype)
+        # melt + dropna without building the NaN cells first
+        row, col = np.nonzero(~np.isnan(values))
+        batch = {
+            c: pd.Categorical.from_codes(chunk[c].cat.codes.to_numpy()[row], chunk[c].cat.categories)
+            for c in id_columns
+        }
+        batch["Year"] = year_values[col]
+        batch["Value"] = values[row, col]
+        yield pd.DataFrame(batch)
+
+
+def concat_timeline(batches):
+    """pd.concat for iter_timeline batches that keeps the id columns categorical.
+
+    Each batch has its own categories, which plain pd.concat would turn
+    into object columns; they are unioned instead.
+    """
+    batches = list(batches)
+    frame = pd.concat(batches, ignore_index=True)
+    for column in batches[0].columns:
+        if isinstance(batches[0][column].dtype, pd.CategoricalDtype):
+            frame[column] = union_categoricals([b[column] for b in batches])
+    return frame
+
+
+def read_timeline(path):
+    """Wide World Bank timeline -> long frame of (CountryCode, Year, Value), non-null values only."""
+    return concat_timeline(iter_timeline(path)).rename(columns={"Country Code": "CountryCode"})
+
+
+def read_countries():
+    """Country rows from the income-group file; aggregates (no region) are dropped.
+
+    IncomeGroup stays null where the file leaves it blank (Venezuela).
+    """
+    df = pd.read_csv(
+        data_path(INCOME_GROUPS),
+        usecols=["Country Code", "Region", "IncomeGroup", "TableName"],
+        dtype="string", encoding="utf-8-sig",
+    )
+    df = df.dropna(subset=["Region"])
+    return pd.DataFrame({
+        "CountryName": df["TableName"].str.strip(),
+        "IncomeGroup": df["IncomeGroup"],
+        "CountryCode": df["Country Code"].str.strip(),
+        "Region": df["Region"],
+    }).drop_duplicates("CountryName").reset_index(drop=True)
+
+
+def read_indicator_table(sources, countries):
+    """Outer-join one timeline per column into (CountryName, Year, <columns>...).
+
+    Rows are keyed by country code so World Bank spelling changes cannot
+    orphan a row; codes that are not in Country (regional aggregates) drop out.
+    """
+    names = countries.set_index("CountryCode")["CountryName"]
+    table = None
+    for column, relative in sources.items():
+        long = read_timeline(data_path(relative)).rename(columns={"Value": column})
+        table = long if table is None else table.merge(long, on=["CountryCode", "Year"], how="outer")
+    table["CountryName"] = table["CountryCode"].map(names).astype(names.dtype)
+    table = table.dropna(subset=["CountryName"])
+    table = table.sort_values(["CountryName", "Year"]).reset_index(drop=True)
+    return table[["CountryName", "Year"] + list(sources)]
+
+
+def read_disasters(resolver):
+    """NaturalDisaster and DirectDamage frames from the NOAA event files.
+
+    IDs are assigned across all three files in DISASTER_SOURCES order before
+    country matching, so they stay stable from one load to the next.
+    """
+    frames = []
+    for disaster_type, relative, country_col, intensity_col in DISASTER_SOURCES:
+        usecols = ["Year", country_col, intensity_col, "Latitude", "Longitude"] + list(DAMAGE_COLUMNS.values())
+        df = pd.read_csv(data_path(relative), sep="\t", usecols=usecols, dtype={country_col: "string"})
+        df = df.dropna(subset=[country_col, "Year"])
+        place = df[country_col]
+        if country_col == "Location Name":
+            place = place.str.split(":").str[0].str.split(";").str[0]
+        frames.append(pd.DataFrame({
+            "Type": disaster_type,
+            "Place": place.str.strip().to_numpy(),
+            "Year": df["Year"].astype(np.int64).to_numpy(),
+            "Intensity": pd.to_numeric(df[intensity_col], errors="coerce").to_numpy(),
+            "Latitude": pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(),
+            "Longitude": pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(),
+            # Unknown figures stay null rather than counting as 0 in SUM/AVG
+            **{target: pd.to_numeric(df[source], errors="coerce").round().astype("Int64").array
+               for target, source in DAMAGE_COLUMNS.items()},
+        }))
+
+    events = pd.concat(frames, ignore_index=True)
+    events["DisasterID"] = np.arange(len(events), dtype=np.int64)
+    events["CountryName"] = [resolver.resolve(p) for p in events["Place"]]
+    events = events.dropna(subset=["CountryName"])
+
+    disasters = events[["DisasterID", "CountryName", "Type", "Year", "Intensity", "Latitude", "Longitude"]]
+    damage = events[["DisasterID", "CountryName"] + list(DAMAGE_COLUMNS)].copy()
+    damage.insert(0, "DamageID", damage["DisasterID"])
+    return disasters.reset_index(drop=True), damage.reset_index(drop=True)
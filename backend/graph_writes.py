@@ -0,0 +1,296 @@
+"""Batched writes to SavedGraphs, with the audit log written alongside.
+
+Saves, title updates and deletes are queued and applied by a single writer
+thread, one transaction per batch. A batch is flushed as soon as
+GRAPH_WRITE_BATCH_SIZE writes are queued, or GRAPH_WRITE_DELAY_MS after the
+first of them, whichever comes first. The writer waits for at most as many
+writes as the previous batch held, so a lone writer is not delayed. The batch's Logs rows are appended
+in the same transaction with one executemany. An update logs only the
+fields it changed, and for Filters only the keys that changed, rather than
+the old and new blobs.
+
+This replaces the after_saved_graph_* triggers, which are dropped in
+backend/req.sql.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# "commit": a route answers once its write is committed. "queued": title
+# updates and deletes answer 202 once queued; reads by the same user still
+# wait for them first.
+GRAPH_WRITE_ACK = os.environ.get("GRAPH_WRITE_ACK", "commit")
+
+UPDATABLE = ("GraphTitle", "Filters", "Page")
+
+
+class PendingWrite:
+    """One queued mutation; result() blocks until its batch has committed."""
+
+    def __init__(self, op, username, args):
+        self.op = op
+        self.username = username
+        self.args = args
+        self.queued = time.monotonic()
+        # Logged as the time of the request, not of the flush
+        self.timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+
+    def _resolve(self, result=None, error=None):
+        self._result = result
+        self._error = error
+        self._done.set()
+
+    def result(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class GraphWriter:
+    def __init__(self, get_connection, batch_size=64, delay=0.005):
+        self._get_connection = get_connection
+        self.batch_size = batch_size
+        self.delay = delay
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._unsettled = Counter()
+        self._thread = None
+        self._closed = False
+        self._last_batch = 0
+        self.batches = 0
+        self.writes = 0
+        self.failed_batches = 0
+        self.batch_max = 0
+        self.flush_total = 0.0
+        self.flush_max = 0.0
+
+    def insert(self, username, title, filters, page):
+        """Result: the new GraphID."""
+        return self._submit(PendingWrite("insert", username, (title, filters, page)))
+
+    def update(self, graph_id, username, **fields):
+        """Result: whether the user owns a graph with that id."""
+        unknown = set(fields) - set(UPDATABLE)
+        if unknown:
+            raise ValueError(f"cannot update {', '.join(sorted(unknown))}")
+        return self._submit(PendingWrite("update", username, (graph_id, fields)))
+
+    def delete(self, graph_id, username):
+        """Result: the number of rows deleted (0 or 1)."""
+        return self._submit(PendingWrite("delete", username, (graph_id,)))
+
+    def _submit(self, write):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("graph writer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="graph-writer", daemon=True)
+                self._thread.start()
+            self._queue.append(write)
+            self._unsettled[write.username] += 1
+            self._cond.notify_all()
+        return write
+
+    def settle(self, username):
+        """Block until every write queued for `username` has been committed (or has failed)."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._unsettled[username])
+
+    def close(self):
+        # Flush whatever is still queued and stop the writer thread
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                # Linger only until as many writes are queued as went out last
+                # time: a lone writer is never held back, and concurrent ones
+                # are not kept waiting for a batch that will not fill up
+                target = min(self.batch_size, self._last_batch)
+                deadline = self._queue[0].queued + self.delay
+                while len(self._queue) < target and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._last_batch = len(batch)
+
+            self._flush(batch)
+            with self._cond:
+                for write in batch:
+                    self._unsettled[write.username] -= 1
+                    if not self._unsettled[write.username]:
+                        del self._unsettled[write.username]
+                self._cond.notify_all()
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            connection = self._get_connection()
+        except Exception as err:
+            for write in batch:
+                write._resolve(error=err)
+            return
+        try:
+            results = self._apply(connection, batch)
+        except Exception as err:
+            self.failed_batches += 1
+            connection.close()
+            if len(batch) == 1:
+                batch[0]._resolve(error=err)
+                return
+            # One bad write must not fail the rest: redo each on its own
+            for write in batch:
+                self._flush([write])
+            return
+        connection.close()
+
+        elapsed = time.perf_counter() - start
+        self.batches += 1
+        self.writes += len(batch)
+        self.batch_max = max(self.batch_max, len(batch))
+        self.flush_total += elapsed
+        self.flush_max = max(self.flush_max, elapsed)
+        for write, result in zip(batch, results):
+            write._resolve(result)
+
+    def _apply(self, connection, batch):
+        cursor = connection.cursor()
+        try:
+            current = _current_rows(cursor, [w.args[0] for w in batch if w.op == "update"])
+            results = []
+            logs = []
+            for write in batch:
+                if write.op == "insert":
+                    title, filters, page = write.args
+                    cursor.execute('''
+                        INSERT INTO SavedGraphs (Username, GraphTitle, Filters, Page)
+                        VALUES (%s, %s, %s, %s)
+                    ''', (write.username, title, json.dumps(filters), page))
+                    graph_id = cursor.lastrowid
+                    current[graph_id] = {"Username": write.username, "GraphTitle": title,
+                                         "Filters": filters, "Page": page}
+                    logs.append(("INSERT", graph_id, write.username, write.timestamp, "Graph inserted"))
+                    results.append(graph_id)
+
+                elif write.op == "update":
+                    graph_id, fields = write.args
+                    columns = sorted(fields)
+                    cursor.execute(f'''
+                        UPDATE SavedGraphs
+                        SET {", ".join(f"{column} = %s" for column in columns)}
+                        WHERE GraphID = %s AND Username = %s
+                    ''', [json.dumps(fields[c]) if c == "Filters" else fields[c] for c in columns]
+                        + [graph_id, write.username])
+                    row = current.get(graph_id)
+                    owned = row is not None and row["Username"] == write.username
+                    if owned:
+                        details = json.dumps(changes(row, fields), sort_keys=True)
+                        row.update(fields)
+                        logs.append(("UPDATE", graph_id, write.username, write.timestamp,
+                                     f"Graph updated. {details}"))
+                    results.append(owned)
+
+                else:
+                    graph_id, = write.args
+                    cursor.execute('''
+                        DELETE FROM SavedGraphs
+                        WHERE GraphID = %s AND Username = %s
+                    ''', (graph_id, write.username))
+                    deleted = cursor.rowcount
+                    if deleted:
+                        current.pop(graph_id, None)
+                        logs.append(("DELETE", graph_id, write.username, write.timestamp, "Graph deleted"))
+                    results.append(deleted)
+
+            if logs:
+                cursor.executemany('''
+                    INSERT INTO Logs (ActionType, GraphID, Username, Timestamp, Details)
+                    VALUES (%s, %s, %s, %s, %s)
+                ''', logs)
+            connection.commit()
+            return results
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def stats(self):
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            "ack": GRAPH_WRITE_ACK,
+            "batchSize": self.batch_size,
+            "delayMs": self.delay * 1000,
+            "queued": queued,
+            "batches": self.batches,
+            "writes": self.writes,
+            "failedBatches": self.failed_batches,
+            "avgBatch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+            "maxBatch": self.batch_max,
+            "flushAvgMs": round(self.flush_total * 1000 / self.batches, 3) if self.batches else 0.0,
+            "flushMaxMs": round(self.flush_max * 1000, 3),
+        }
+
+
+def _current_rows(cursor, graph_ids):
+    # Pre-update values of the graphs a batch updates, for the audit diffs
+    if not graph_ids:
+        return {}
+    ids = sorted(set(graph_ids))
+    cursor.execute(f'''
+        SELECT GraphID, Username, GraphTitle, Filters, Page
+        FROM SavedGraphs
+        WHERE GraphID IN ({", ".join(["%s"] * len(ids))})
+    ''', ids)
+    rows = {}
+    for graph_id, username, title, filters, page in cursor.fetchall():
+        if isinstance(filters, bytes):
+            filters = filters.decode()
+        if isinstance(filters, str):
+            filters = json.loads(filters)
+        rows[graph_id] = {"Username": username, "GraphTitle": title, "Filters": filters, "Page": page}
+    return rows
+
+
+def changes(old, new):
+    """Field -> [old, new] for each field in `new` that differs from `old`.
+
+    Filters objects are compared key by key, so a changed filter is logged
+    as {"Filters": {"startYear": [1990, 2000]}} rather than both blobs.
+    """
+    diff = {}
+    for field, value in new.items():
+        before = old.get(field)
+        if field == "Filters" and isinstance(before, dict) and isinstance(value, dict):
+            keys = sorted(set(before) | set(value))
+            filters = {key: [before.get(key), value.get(key)] for key in keys if before.get(key) != value.get(key)}
+            if filters:
+                diff[field] = filters
+        elif before != value:
+            diff[field] = [before, value]
+    return diff
+
+
+def graph_writer_from_env(get_connection):
+    return GraphWriter(
+        get_connection,
+        batch_size=int(os.environ.get("GRAPH_WRITE_BATCH_SIZE", "64")),
+        delay=float(os.environ.get("GRAPH_WRITE_DELAY_MS", "5")) / 1000,
+    )
@@ -0,0 +1,51 @@
+import re
+
+
+# Every economic indicator the API can aggregate: alias -> (table alias, table, column).
+# The alias is the name the frontend shows and the key in every response row.
+INDICATORS = {
+    "AvgGDP": ("ne", "NationalEconomicImpact", "GDPAnnualPercentGrowth"),
+    "AvgCPI": ("ne", "NationalEconomicImpact", "CPI_2010_100"),
+    "AvgExportGrowth": ("ne", "NationalEconomicImpact", "ExportsAnnualPercentGrowth"),
+    "AvgImportGrowth": ("ne", "NationalEconomicImpact", "ImportAnnualPercentGrowth"),
+    "AvgUnemployment": ("ne", "NationalEconomicImpact", "UnemploymentPercent"),
+    "AvgAgrictultureGrowth": ("se", "SectoralEconomicImpact", "AgricultureAnnualPercentGrowth"),
+    "AvgIndustryGrowth": ("se", "SectoralEconomicImpact", "IndustryAnnualPercentGrowth"),
+    "AvgManufacturingGrowth": ("se", "SectoralEconomicImpact", "ManufacturingAnnualPercentGrowth"),
+    "AvgServiceGrowth": ("se", "SectoralEconomicImpact", "ServiceAnnualPercentGrowth"),
+}
+
+
+def select_expression(alias):
+    table_alias, _, column = INDICATORS[alias]
+    return f"AVG({table_alias}.{column}) AS {alias}"
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text.strip()).lower()
+
+
+# The map/comparison pages send full expressions like "AVG(ne.CPI_2010_100) AS AvgCPI"
+_BY_EXPRESSION = {_normalize(select_expression(alias)): alias for alias in INDICATORS}
+
+
+def resolve(requested):
+    """Map a requested indicator (alias or known select expression) to its alias, or None."""
+    if requested in INDICATORS:
+        return requested
+    return _BY_EXPRESSION.get(_normalize(requested))
+
+
+class UnknownIndicator(ValueError):
+    pass
+
+
+def resolve_indicators(indicators):
+    aliases = []
+    for requested in indicators:
+        alias = resolve(requested)
+        if alias is None:
+            raise UnknownIndicator(f"Unknown indicator: {requested}")
+        if alias not in aliases:
+            aliases.append(alias)
+    return tuple(aliases)
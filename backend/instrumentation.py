@@ -0,0 +1,277 @@
+"""Request and query metrics in Prometheus text format, plus sampled profiling.
+
+- Every route gets a latency histogram (by route rule, method and status)
+  and a response-size histogram; see install().
+- Every statement run on a pooled connection is timed and its rows counted,
+  keyed on its normalized SQL (literals and placeholders folded to "?").
+- With PROFILE_SAMPLE_RATE > 0 that fraction of requests runs under
+  cProfile, and the ones slower than PROFILE_SLOW_MS are kept for
+  GET /debug/profiles (and written to PROFILE_DIR as .prof files if set).
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+# Distinct normalized statements tracked; the rest are counted under "other"
+METRICS_MAX_QUERIES = int(os.environ.get("METRICS_MAX_QUERIES", "200"))
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "500"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "20"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR")
+
+# Histogram upper bounds: seconds and bytes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """Statement text with literals, placeholders and IN lists folded, so one shape is one series."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("(?, ...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets + (None,), self.counts):
+            cumulative += n
+            le = "+Inf" if bound is None else repr(bound)
+            yield f'{name}_bucket{{{labels},le="{le}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class Metrics:
+    def __init__(self, max_queries=METRICS_MAX_QUERIES):
+        self._lock = threading.Lock()
+        self._max_queries = max_queries
+        self._requests = {}  # (route, method, status) -> latency Histogram
+        self._sizes = {}     # route -> size Histogram
+        self._queries = {}   # normalized sql -> [latency Histogram, rows]
+
+    def observe_request(self, route, method, status, seconds):
+        with self._lock:
+            key = (route, method, str(status))
+            if key not in self._requests:
+                self._requests[key] = Histogram(LATENCY_BUCKETS)
+            self._requests[key].observe(seconds)
+
+    def observe_size(self, route, nbytes):
+        with self._lock:
+            if route not in self._sizes:
+                self._sizes[route] = Histogram(SIZE_BUCKETS)
+            self._sizes[route].observe(nbytes)
+
+    def observe_query(self, sql, seconds):
+        """Record one execution; returns the key to pass to add_rows()."""
+        key = normalize_sql(sql)
+        with self._lock:
+            if key not in self._queries:
+                if len(self._queries) >= self._max_queries:
+                    key = "other"
+                self._queries.setdefault(key, [Histogram(LATENCY_BUCKETS), 0])
+            self._queries[key][0].observe(seconds)
+        return key
+
+    def add_rows(self, key, rows):
+        with self._lock:
+            self._queries[key][1] += rows
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._sizes.clear()
+            self._queries.clear()
+
+    def render(self, gauges=None):
+        """Prometheus text exposition; `gauges` adds {name: value} point-in-time values."""
+        with self._lock:
+            lines = [
+                "# HELP http_request_duration_seconds Time from request start to response headers.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (route, method, status), histogram in sorted(self._requests.items()):
+                labels = f'route="{_label(route)}",method="{method}",status="{status}"'
+                lines.extend(histogram.lines("http_request_duration_seconds", labels))
+
+            lines += [
+                "# HELP http_response_size_bytes Serialized response body size.",
+                "# TYPE http_response_size_bytes histogram",
+            ]
+            for route, histogram in sorted(self._sizes.items()):
+                lines.extend(histogram.lines("http_response_size_bytes", f'route="{_label(route)}"'))
+
+            lines += [
+                "# HELP db_query_duration_seconds Statement execution time by normalized SQL.",
+                "# TYPE db_query_duration_seconds histogram",
+            ]
+            for sql, (histogram, _) in sorted(self._queries.items()):
+                lines.extend(histogram.lines("db_query_duration_seconds", f'query="{_label(sql)}"'))
+
+            lines += [
+                "# HELP db_query_rows_total Rows fetched by normalized SQL.",
+                "# TYPE db_query_rows_total counter",
+            ]
+            for sql, (_, rows) in sorted(self._queries.items()):
+                lines.append(f'db_query_rows_total{{query="{_label(sql)}"}} {rows}')
+
+        for name, value in (gauges or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class TimedCursor:
+    """Cursor proxy that reports each statement's time and fetched rows to `metrics`."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._key = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, method, sql, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(sql, *args, **kwargs)
+        finally:
+            self._key = metrics.observe_query(sql, time.perf_counter() - start)
+
+    def execute(self, sql, *args, **kwargs):
+        return self._timed(self._cursor.execute, sql, *args, **kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._timed(self._cursor.executemany, sql, *args, **kwargs)
+
+    def _counted(self, rows):
+        if self._key is not None and rows:
+            metrics.add_rows(self._key, len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None and self._key is not None:
+            metrics.add_rows(self._key, 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._counted(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._counted(self._cursor.fetchall())
+
+
+# Slow sampled requests, newest last
+profiles = deque(maxlen=PROFILE_KEEP)
+
+
+def _keep_profile(profiler, route, method, elapsed_ms):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(25)
+    entry = {
+        "route": route,
+        "method": method,
+        "ms": round(elapsed_ms, 2),
+        "at": time.time(),
+        "stats": out.getvalue(),
+    }
+    if PROFILE_DIR:
+        path = os.path.join(PROFILE_DIR, f"{int(entry['at'] * 1000)}-{route.strip('/').replace('/', '_') or 'root'}.prof")
+        stats.dump_stats(path)
+        entry["file"] = path
+    profiles.append(entry)
+
+
+def _counting(chunks, route, response):
+    # Streamed bodies are measured as they are written out; a compressed stream
+    # reports its uncompressed size through response.serialized_length
+    total = 0
+    try:
+        for chunk in chunks:
+            total += len(chunk)
+            yield chunk
+    finally:
+        metrics.observe_size(route, getattr(response, "serialized_length", total))
+
+
+def install(app):
+    """Time every request of a Flask app, record its response size and sample profiles."""
+    from flask import g, request
+
+    def route_of():
+        return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def record_request(response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+        route = route_of()
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+        # Compression (encoding.install_compression) has already run by now
+        if response.is_streamed:
+            response.response = _counting(response.response, route, response)
+        else:
+            size = getattr(response, "serialized_length", None)
+            if size is None:
+                size = response.calculate_content_length() or 0
+            metrics.observe_size(route, size)
+        return response
+
+    @app.teardown_request
+    def finish_profile(exc):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.request_start) * 1000
+        if elapsed_ms >= PROFILE_SLOW_MS:
+            _keep_profile(profiler, route_of(), request.method, elapsed_ms)
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HashingBusy(Exception):
+    """All hashing workers and queue slots are taken."""
+
+
+class HashPool:
+    """Runs bcrypt on a small, bounded set of worker threads.
+
+    bcrypt releases the GIL while hashing, so threads are enough to keep a
+    burst of logins from pinning every request thread. At most
+    `workers + max_queue` hashes are admitted at once; anyone beyond that
+    waits up to `queue_timeout` seconds and then gets HashingBusy.
+    """
+
+    def __init__(self, bcrypt, workers=2, max_queue=8, queue_timeout=0.05, log_rounds=None):
+        self._bcrypt = bcrypt
+        # The work factor bcrypt was configured with, for stats() only
+        self.log_rounds = log_rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_total = 0.0
+        self.hash_max = 0.0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy("Too many sign-in requests, try again shortly")
+        with self._lock:
+            self._admitted += 1
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._admitted -= 1
+                    self.completed += 1
+                    self.wait_total += started - submitted
+                    self.wait_max = max(self.wait_max, started - submitted)
+                    self.hash_total += finished - started
+                    self.hash_max = max(self.hash_max, finished - started)
+                self._slots.release()
+
+        return self._executor.submit(task).result()
+
+    def generate_password_hash(self, password):
+        return self._run(self._bcrypt.generate_password_hash, password).decode('utf-8')
+
+    def check_password_hash(self, pw_hash, password):
+        return self._run(self._bcrypt.check_password_hash, pw_hash, password)
+
+    def stats(self):
+        with self._lock:
+            done = self.completed
+            return {
+                "workers": self.workers,
+                "maxQueue": self.max_queue,
+                "logRounds": self.log_rounds,
+                "inFlight": self._admitted,
+                "queued": max(0, self._admitted - self.workers),
+                "completed": done,
+                "rejected": self.rejected,
+                "hashTimeTotalMs": round(self.hash_total * 1000, 3),
+                "hashTimeAvgMs": round(self.hash_total * 1000 / done, 3) if done else 0.0,
+                "hashTimeMaxMs": round(self.hash_max * 1000, 3),
+                "queueWaitTotalMs": round(self.wait_total * 1000, 3),
+                "queueWaitAvgMs": round(self.wait_total * 1000 / done, 3) if done else 0.0,
+                "queueWaitMaxMs": round(self.wait_max * 1000, 3),
+            }
+
+
+def hash_pool_from_env(bcrypt, log_rounds=None):
+    return HashPool(
+        bcrypt,
+        workers=int(os.environ.get("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1)))),
+        max_queue=int(os.environ.get("BCRYPT_MAX_QUEUE", "16")),
+        queue_timeout=float(os.environ.get("BCRYPT_QUEUE_TIMEOUT", "0.05")),
+        log_rounds=log_rounds,
+    )
@@ -0,0 +1,138 @@
+"""The /global_stats options and the SQL compiled for each of them.
+
+Indicators come from indicators.INDICATORS; the aggregations and sort
+options are declared here. A request is validated against them and reduced
+to its shape: aggregation, indicator aliases (in catalog order), ORDER BY
+and the number of disaster types. Each shape's SQL is compiled on first
+use and kept in a bounded LRU cache. An indicator, aggregation or sort
+option is added by adding an entry; the SQL path, the summary tables, the
+columnar engine and /global_stats/catalog all read these tables.
+"""
+from functools import lru_cache
+
+from indicators import INDICATORS, resolve_indicators, select_expression
+
+
+class UnknownOption(ValueError):
+    pass
+
+
+# aggregateBy -> the NaturalDisaster columns rows are grouped by
+AGGREGATIONS = {
+    "Disaster Types": ("Type", "Year"),
+    "Individual Disasters": ("DisasterID", "Type", "Year"),
+}
+
+# Grouping columns that appear under another name in the response
+OUTPUT_NAMES = {"Type": "DisasterType"}
+
+# sortOption -> (column, descending); a None column sorts on the first requested indicator
+SORTS = {
+    "Year (Ascending)": ("Year", False),
+    "Year (Descending)": ("Year", True),
+    "Indicator (Ascending)": (None, False),
+    "Indicator (Descending)": (None, True),
+}
+
+_CATALOG_ORDER = {alias: i for i, alias in enumerate(INDICATORS)}
+
+
+def validate(indicators, aggregate_by, sort_option):
+    """Indicator aliases of a /global_stats request, in the order requested.
+
+    Raises UnknownIndicator or UnknownOption for anything not in the catalog.
+    """
+    if aggregate_by not in AGGREGATIONS:
+        raise UnknownOption(f"Unknown aggregateBy: {aggregate_by}")
+    if sort_option not in SORTS:
+        raise UnknownOption(f"Unknown sortOption: {sort_option}")
+    return resolve_indicators(indicators)
+
+
+def validate_years(start_year, end_year):
+    """startYear and endYear as ints; both engines need them, so neither may be missing."""
+    try:
+        return int(start_year), int(end_year)
+    except (TypeError, ValueError):
+        raise UnknownOption("startYear and endYear must be numbers")
+
+
+def sort_column(sort_option, aliases):
+    """(column, descending) to order by, or None when an indicator sort has no indicator."""
+    column, descending = SORTS[sort_option]
+    if column is None:
+        if not aliases:
+            return None
+        column = aliases[0]
+    return column, descending
+
+
+def order_clause(sort_option, aliases, table_alias):
+    order = sort_column(sort_option, aliases)
+    if order is None:
+        return ""
+    column, descending = order
+    if column == "Year":
+        column = f"{table_alias}.Year"
+    return f"ORDER BY {column} {'DESC' if descending else 'ASC'}"
+
+
+# Shapes kept compiled. n_types is the client's list length, so the cache
+# must be bounded; this holds everything precompile() builds with room to spare
+COMPILED_SHAPES = 1024
+
+
+@lru_cache(maxsize=COMPILED_SHAPES)
+def compiled_query(aggregate_by, aliases, order, n_types):
+    """SQL for one shape; `aliases` in catalog order, `order` from order_clause."""
+    grouping = AGGREGATIONS[aggregate_by]
+    selects = [f"nd.{c} AS {OUTPUT_NAMES[c]}" if c in OUTPUT_NAMES else f"nd.{c}" for c in grouping]
+    selects += [select_expression(alias) for alias in aliases]
+    types = f" AND nd.Type IN ({','.join(['%s'] * n_types)})" if n_types else ""
+    return f'''
+        SELECT {", ".join(selects)}
+        FROM NaturalDisaster nd
+        LEFT JOIN DirectDamage dd ON nd.DisasterID = dd.DisasterID
+        LEFT JOIN NationalEconomicImpact ne ON nd.CountryName = ne.CountryName AND nd.Year = ne.Year
+        LEFT JOIN SectoralEconomicImpact se ON nd.CountryName = se.CountryName AND nd.Year = se.Year
+        WHERE nd.Year BETWEEN %s AND %s{types}
+        GROUP BY {", ".join(f"nd.{c}" for c in grouping)} {order}
+    '''
+
+
+def global_stats_query(start_year, end_year, disaster_types, aliases, aggregate_by, sort_option):
+    """(sql, params) for validated options; the SQL comes from the compiled-shape cache."""
+    shape = (
+        aggregate_by,
+        tuple(sorted(aliases, key=_CATALOG_ORDER.__getitem__)),
+        order_clause(sort_option, aliases, "nd"),
+        len(disaster_types or ()),
+    )
+    return compiled_query(*shape), [start_year, end_year, *(disaster_types or ())]
+
+
+def precompile(max_types=3):
+    """Compile the common shapes up front: each aggregation and sort with each
+    single indicator and with all of them, for up to `max_types` disaster types."""
+    sets = [(alias,) for alias in INDICATORS] + [tuple(INDICATORS)]
+    for aggregate_by in AGGREGATIONS:
+        for sort_option in SORTS:
+            for aliases in sets:
+                for n_types in range(max_types + 1):
+                    global_stats_query(0, 0, [""] * n_types, aliases, aggregate_by, sort_option)
+    return compiled_query.cache_info().currsize
+
+
+def catalog():
+    """What /global_stats accepts, for clients to build their option lists from."""
+    return {
+        "indicators": [
+            {"name": alias, "table": table, "column": column, "expression": select_expression(alias)}
+            for alias, (_, table, column) in INDICATORS.items()
+        ],
+        "aggregations": [
+            {"name": name, "groupBy": [OUTPUT_NAMES.get(c, c) for c in columns]}
+            for name, columns in AGGREGATIONS.items()
+        ],
+        "sortOptions": list(SORTS),
+    }
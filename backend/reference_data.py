@@ -0,0 +1,121 @@
+import threading
+
+
+# Tables whose years are listed per dataset
+YEAR_TABLES = (
+    "NaturalDisaster",
+    "NationalEconomicImpact",
+    "SectoralEconomicImpact",
+    "StateDisasters",
+    "StateEconomicTotals",
+    "StateIndustryGrowth",
+)
+TABLES = ("Country", "State") + YEAR_TABLES
+
+# The State* tables have no country column: every row in them is a US state
+STATE_DATA_COUNTRY_CODE = "USA"
+
+
+class ReferenceData:
+    """In-memory copy of the lookup dimensions.
+
+    Holds every Country and State row, the years each dataset covers, the
+    disaster types and which countries have state-level data. Lookups by
+    name or code are case-insensitive, as they are in MySQL. Loaded once
+    (at startup by flask_app.warm_up, or on first use) and dropped again by
+    reset() when one of TABLES is reloaded.
+    """
+
+    def __init__(self, get_connection):
+        self._get_connection = get_connection
+        self._lock = threading.Lock()
+        self._data = None
+
+    def load(self):
+        connection = self._get_connection()
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM Country ORDER BY CountryName")
+            countries = cursor.fetchall()
+            cursor.execute("SELECT * FROM State ORDER BY StateName")
+            states = cursor.fetchall()
+            cursor.close()
+
+            cursor = connection.cursor()
+            years = {}
+            for table in YEAR_TABLES:
+                cursor.execute(f"SELECT DISTINCT Year FROM {table} WHERE Year IS NOT NULL ORDER BY Year")
+                years[table] = [int(year) for year, in cursor.fetchall()]
+            cursor.execute("SELECT DISTINCT Type FROM NaturalDisaster WHERE Type IS NOT NULL ORDER BY Type")
+            disaster_types = [disaster_type for disaster_type, in cursor.fetchall()]
+            cursor.close()
+        finally:
+            connection.close()
+
+        by_name = {row["CountryName"].lower(): row for row in countries}
+        by_code = {row["CountryCode"].lower(): row for row in countries if row.get("CountryCode")}
+        with_states = [row["CountryName"] for row in countries
+                       if states and (row.get("CountryCode") or "").upper() == STATE_DATA_COUNTRY_CODE]
+        data = {
+            "countries": countries,
+            "states": states,
+            "years": years,
+            "disasterTypes": disaster_types,
+            "stateDataCountries": with_states,
+            "country": by_name,
+            "countryCode": by_code,
+            "state": {row["StateName"].lower(): row for row in states},
+            "stateCode": {row["StateCode"].lower(): row for row in states},
+            "hasStates": {name.lower() for name in with_states},
+        }
+        with self._lock:
+            self._data = data
+        return len(countries) + len(states)
+
+    def reset(self):
+        # Forget the loaded copy; the next lookup reloads it
+        with self._lock:
+            self._data = None
+
+    def _snapshot(self):
+        with self._lock:
+            data = self._data
+        if data is None:
+            self.load()
+            with self._lock:
+                data = self._data
+        return data
+
+    def country(self, name):
+        """The Country row named `name`, or None."""
+        row = self._snapshot()["country"].get(str(name).lower())
+        return dict(row) if row is not None else None
+
+    def country_by_code(self, code):
+        row = self._snapshot()["countryCode"].get(str(code).lower())
+        return dict(row) if row is not None else None
+
+    def state(self, name):
+        """The State row named `name`, or None."""
+        row = self._snapshot()["state"].get(str(name).lower())
+        return dict(row) if row is not None else None
+
+    def state_by_code(self, code):
+        row = self._snapshot()["stateCode"].get(str(code).lower())
+        return dict(row) if row is not None else None
+
+    def has_state_data(self, country):
+        """Whether a country, by name or country code, has state-level data."""
+        row = self.country(country) or self.country_by_code(country)
+        return row is not None and row["CountryName"].lower() in self._snapshot()["hasStates"]
+
+    def snapshot(self):
+        """Everything, as served by /reference_data."""
+        data = self._snapshot()
+        return {
+            "countries": [dict(row) for row in data["countries"]],
+            "states": [dict(row) for row in data["states"]],
+            "years": {table: list(years) for table, years in data["years"].items()},
+            "disasterTypes": list(data["disasterTypes"]),
+            "stateDataCountries": list(data["stateDataCountries"]),
+        }
@@ -1,27 +1,12 @@
-CREATE TRIGGER after_saved_graph_insert
-AFTER INSERT ON SavedGraphs
-FOR EACH ROW
-BEGIN
-    INSERT INTO Logs (ActionType, GraphID, Username, Timestamp, Details)
-    VALUES ('INSERT', NEW.GraphID, NEW.Username, NOW(), 'Graph inserted');
-END
-
-CREATE TRIGGER after_saved_graph_update
-AFTER UPDATE ON SavedGraphs
-FOR EACH ROW
-BEGIN
-    INSERT INTO Logs (ActionType, GraphID, Username, Timestamp, Details)
-    VALUES ('UPDATE', NEW.GraphID, NEW.Username, NOW(), CONCAT('Graph updated. Old Filters: ', OLD.Filters, ', New Filters: ', NEW.Filters));
-END
-
-CREATE TRIGGER after_saved_graph_delete
-AFTER DELETE ON SavedGraphs
-FOR EACH ROW
-BEGIN
-    INSERT INTO Logs (ActionType, GraphID, Username, Timestamp, Details)
-    VALUES ('DELETE', OLD.GraphID, OLD.Username, NOW(), 'Graph deleted');
-END
+-- Logs rows are now written by backend/graph_writes.py, batched with the
+-- SavedGraphs changes and with only the changed fields in Details. Drop the
+-- old per-row triggers so nothing is logged twice.
+DROP TRIGGER IF EXISTS after_saved_graph_insert;
+DROP TRIGGER IF EXISTS after_saved_graph_update;
+DROP TRIGGER IF EXISTS after_saved_graph_delete;
 
+-- No longer called by the API (see backend/compare_stats.py); kept for
+-- benchmarks/bench_compare_countries.py
 CREATE PROCEDURE CompareCountryStats (
     IN countries TEXT,
     IN indicators TEXT,
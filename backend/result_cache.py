@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+
+
+# Identifies the loaded data in ETags. Defaults to a per-process token, so a
+# restart (which may follow a load) never revalidates an old ETag; set it to
+# the same value on every worker, e.g. the load date, to share validators.
+DATASET_VERSION = os.environ.get("DATASET_VERSION") or f"{os.getpid()}-{time.time_ns()}"
+# Cache-Control max-age on cacheable responses; clients revalidate with If-None-Match after that
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", "60"))
+
+
+class ResultCache:
+    """LRU cache of serialized responses, bounded by total bytes and a TTL.
+
+    Every entry is tagged with the tables it was computed from so a reload of
+    one table only drops the results that depend on it. An entry may also carry
+    a scope, (countries, (first_year, last_year)) with None meaning "all", so an
+    incremental reload of a few (country, year) cells can be narrower still.
+
+    Invalidation also bumps a per-table generation, which feeds the ETags
+    handed to clients, so a validator stays good until its tables reload.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=3600.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (body, tables, expires_at, scope, {content encoding: compressed body})
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Bumped by invalidate(): per table, and globally for "everything"
+        self._generation = 0
+        self._table_generations = {}
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry[0]) + sum(len(encoded) for encoded in entry[4].values())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, body, tables=(), scope=None):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (body, frozenset(tables), time.monotonic() + self.ttl, scope, {})
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def encoded(self, key, encoding, body, encode):
+        """encode(body) for the entry under `key`, computed once per content encoding
+        and kept with the entry. Bodies that are not that entry's are encoded as they are."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == body and encoding in entry[4]:
+                return entry[4][encoding]
+        data = encode(body)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == body and encoding not in entry[4]:
+                entry[4][encoding] = data
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    self._drop(next(iter(self._entries)))
+                    self.evictions += 1
+        return data
+
+    def invalidate(self, tables=None, keys=None, cells=None):
+        """Drop entries that read any of `tables` (or exactly `keys`); everything if neither is given.
+
+        With `cells`, an iterable of (country, year), only entries of those
+        tables whose scope covers at least one of the cells are dropped.
+        """
+        with self._lock:
+            if tables is None and keys is None:
+                doomed = list(self._entries)
+                self._generation += 1
+            else:
+                for table in tables or ():
+                    self._table_generations[table] = self._table_generations.get(table, 0) + 1
+                tables = set(tables or ())
+                keys = set(keys or ())
+                # Country names compare case-insensitively, as MySQL does
+                cells = None if cells is None else [(str(c).casefold(), int(y)) for c, y in cells]
+                doomed = [k for k, (_, deps, _, scope, _) in self._entries.items()
+                          if k in keys or (deps & tables and _covers(scope, cells))]
+            for key in doomed:
+                self._drop(key)
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def etag(self, tables, key):
+        """Opaque validator for `key` as computed from `tables` at their current generation."""
+        with self._lock:
+            generations = [self._generation] + [self._table_generations.get(t, 0) for t in sorted(tables)]
+        seed = f"{DATASET_VERSION}:{generations}:{key}"
+        return hashlib.sha1(seed.encode()).hexdigest()[:24]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def _covers(scope, cells):
+    if scope is None or cells is None:
+        return True
+    countries, years = scope
+    return any((countries is None or country in countries)
+               and (years is None or years[0] <= year <= years[1])
+               for country, year in cells)
+
+
+def body_scope(country=None, countries=None, years=False):
+    """Scope function for cached_response: which countries/years a request body reads.
+
+    `country` / `countries` name the body field holding one or several
+    countries (all countries if neither), casefolded like the cells they
+    are matched against; `years` reads startYear/endYear.
+    Anything unparseable falls back to "all", which only over-invalidates.
+    """
+    def scope(body):
+        body = body if isinstance(body, dict) else {}
+        names = None
+        if country is not None and isinstance(body.get(country), str):
+            names = frozenset([body[country].casefold()])
+        elif countries is not None and isinstance(body.get(countries), list):
+            names = frozenset(c.casefold() for c in body[countries] if isinstance(c, str))
+        span = None
+        if years:
+            try:
+                span = (int(body["startYear"]), int(body["endYear"]))
+            except (KeyError, TypeError, ValueError):
+                span = None
+        return names, span
+    return scope
+
+
+cache = ResultCache(
+    max_bytes=int(os.environ.get("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.environ.get("CACHE_TTL", "3600")),
+)
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "1") != "0"
+
+
+def request_key(path, body):
+    return path + "?" + json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+
+
+# How GET query strings map onto the JSON bodies of the POST routes
+LIST_PARAMS = {"countries", "states", "disasterTypes", "indicators", "hazards"}
+INT_PARAMS = {"startYear", "endYear"}
+
+
+def query_body(args):
+    """The POST body equivalent of a GET query string (a MultiDict).
+
+    List fields are repeated parameters (?disasterTypes=Earthquake&disasterTypes=Tsunami),
+    since names such as "Korea, Rep." contain commas. The result normalizes
+    to the same cache key and ETag as the matching POST body.
+    """
+    body = {}
+    for name in args:
+        values = args.getlist(name)
+        if name in LIST_PARAMS:
+            body[name] = values
+        elif name in INT_PARAMS:
+            try:
+                body[name] = int(values[-1])
+            except ValueError:
+                body[name] = values[-1]
+        elif name == "stream":
+            body[name] = True if values[-1] in ("1", "true") else values[-1]
+        else:
+            body[name] = values[-1]
+    return body
+
+
+def request_body():
+    """JSON body of a POST, or the same fields read from a GET query string."""
+    if request.method == "GET":
+        return query_body(request.args)
+    return request.get_json(silent=True)
+
+
+def add_validators(response, tag):
+    response.set_etag(tag, weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = HTTP_CACHE_MAX_AGE
+
+
+def mark_error(response):
+    """Flag a 200 response whose body reports an error, so it is not cached."""
+    response.is_error = True
+    return response
+
+
+def is_error(response):
+    # Decided without parsing the body: the status, or the view's mark_error flag
+    return response.status_code != 200 or getattr(response, "is_error", False)
+
+
+def cached_response(*tables, scope=None):
+    """Serve a read-only JSON route from the cache, keyed on path + normalized body.
+
+    Only successful, non-streamed responses the view has not flagged with
+    mark_error are stored. `scope` (see body_scope) tags the entry with the countries and
+    years it covers. Successful responses carry a weak ETag and
+    Cache-Control; a GET whose If-None-Match still matches gets a 304
+    without running the view, whether or not the cache is enabled.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            body = request_body()
+            key = request_key(request.path, body)
+            tag = cache.etag(tables, key)
+            if request.method == "GET" and request.if_none_match.contains_weak(tag):
+                response = Response(status=304)
+                add_validators(response, tag)
+                return response
+
+            if not CACHE_ENABLED:
+                response = view(*args, **kwargs)
+                if not isinstance(response, tuple) and (
+                        response.is_streamed or not is_error(response)):
+                    add_validators(response, tag)
+                return response
+
+            entry_scope = scope(body) if scope is not None else None
+            cached = cache.get(key)
+            if cached is not None:
+                response = Response(cached, mimetype="application/json")
+                response.headers["X-Cache"] = "HIT"
+                # Lets the compression hook reuse the entry's compressed copy
+                response.cache_key = key
+                add_validators(response, tag)
+                return response
+
+            response = view(*args, **kwargs)
+            if isinstance(response, tuple):
+                return response
+            if response.is_streamed:
+                add_validators(response, tag)
+                return response
+            if not is_error(response):
+                cache.put(key, response.get_data(), tables, entry_scope)
+                response.cache_key = key
+                add_validators(response, tag)
+            response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,209 @@
+import math
+import os
+import threading
+
+import numpy as np
+
+from query_catalog import UnknownOption
+
+
+TABLES = ("NaturalDisaster",)
+
+# Viewports with more matching events than this come back clustered
+MAX_POINTS = int(os.environ.get("SPATIAL_MAX_POINTS", "2000"))
+# Grid cell size of the index, in degrees
+CELL_DEGREES = float(os.environ.get("SPATIAL_CELL_DEGREES", "1.0"))
+# Cluster cells are this many screen pixels wide at 256-pixel map tiles
+CLUSTER_PIXELS = 60
+# Zoom levels outside 0..MAX_ZOOM are clamped to it
+MAX_ZOOM = 22
+
+EVENT_FIELDS = ("DisasterID", "Type", "Year", "Latitude", "Longitude", "Intensity", "CountryName")
+
+
+def viewport(body):
+    """query() keyword arguments from a /disaster_points body.
+
+    Raises UnknownOption unless bbox is four finite numbers, zoom and the
+    years are whole numbers (or absent) and disasterTypes a list of names.
+    """
+    bbox = body.get("bbox")
+    if not isinstance(bbox, list) or len(bbox) != 4:
+        raise UnknownOption("bbox must be [west, south, east, north]")
+    try:
+        bbox = [float(v) for v in bbox]
+        zoom, start_year, end_year = (None if body.get(field) is None else int(body[field])
+                                      for field in ("zoom", "startYear", "endYear"))
+    except (TypeError, ValueError, OverflowError):
+        raise UnknownOption("bbox, zoom and years must be numbers")
+    if not all(math.isfinite(v) for v in bbox):
+        raise UnknownOption("bbox, zoom and years must be numbers")
+    disaster_types = body.get("disasterTypes")
+    if disaster_types is not None and not (
+            isinstance(disaster_types, list) and all(isinstance(t, str) for t in disaster_types)):
+        raise UnknownOption("disasterTypes must be a list of names")
+    return {"bbox": bbox, "zoom": zoom, "start_year": start_year, "end_year": end_year,
+            "disaster_types": disaster_types}
+
+
+class SpatialIndex:
+    """In-memory grid index over NaturalDisaster coordinates.
+
+    Events are sorted by grid cell (CELL_DEGREES square, row-major from the
+    south-west corner) and each cell keeps an offset into the sorted arrays,
+    so a bounding box touches only the cells it overlaps. Small result sets
+    come back as events; larger ones are clustered on a grid whose cell size
+    halves with every zoom level.
+    """
+
+    def __init__(self, get_connection, cell_degrees=CELL_DEGREES):
+        self._get_connection = get_connection
+        self._cell = cell_degrees
+        self._rows = int(np.ceil(180 / cell_degrees))
+        self._cols = int(np.ceil(360 / cell_degrees))
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _cell_of(self, lat, lon):
+        row = np.clip(((lat + 90) // self._cell).astype(np.int64), 0, self._rows - 1)
+        col = np.clip(((lon + 180) // self._cell).astype(np.int64), 0, self._cols - 1)
+        return row * self._cols + col
+
+    def load(self):
+        connection = self._get_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f"""
+                SELECT {", ".join(EVENT_FIELDS)}
+                FROM NaturalDisaster
+                WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL
+            """)
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
+
+        columns = list(zip(*rows)) if rows else [()] * len(EVENT_FIELDS)
+        data = dict(zip(EVENT_FIELDS, columns))
+        lat = np.asarray(data["Latitude"], dtype=np.float64)
+        lon = np.asarray(data["Longitude"], dtype=np.float64)
+        cells = self._cell_of(lat, lon)
+        order = np.argsort(cells, kind="stable")
+
+        types, type_codes = np.unique(np.asarray(data["Type"], dtype=object).astype(str), return_inverse=True)
+        index = {
+            "lat": lat[order],
+            "lon": lon[order],
+            "year": np.asarray(data["Year"], dtype=np.int64)[order],
+            "type": type_codes[order],
+            "types": types.tolist(),
+            "id": np.asarray(data["DisasterID"], dtype=np.int64)[order],
+            "intensity": np.asarray(data["Intensity"], dtype=np.float64)[order],
+            "country": np.asarray(data["CountryName"], dtype=object)[order],
+            # offsets[c]:offsets[c + 1] are the events in cell c
+            "offsets": np.searchsorted(cells[order], np.arange(self._rows * self._cols + 1)),
+        }
+        with self._lock:
+            self._data = index
+        return len(order)
+
+    def reset(self):
+        # Forget the loaded copy; the next query reloads it
+        with self._lock:
+            self._data = None
+
+    def _index(self):
+        with self._lock:
+            data = self._data
+        if data is None:
+            self.load()
+            with self._lock:
+                data = self._data
+        return data
+
+    def _candidates(self, data, south, west, north, east):
+        """Positions of the events in every cell the box overlaps (a superset of the box)."""
+        first_row, last_row = ((np.array([south, north]) + 90) // self._cell).astype(int).clip(0, self._rows - 1)
+        first_col, last_col = ((np.array([west, east]) + 180) // self._cell).astype(int).clip(0, self._cols - 1)
+        offsets = data["offsets"]
+        # Cells of one grid row are contiguous, so each row is a single slice
+        row_starts = np.arange(first_row, last_row + 1) * self._cols
+        starts = offsets[row_starts + first_col]
+        ends = offsets[row_starts + last_col + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.empty(0, dtype=np.int64)
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def query(self, bbox, zoom=None, start_year=None, end_year=None, disaster_types=None, max_points=MAX_POINTS):
+        """Events or clusters inside bbox = (west, south, east, north).
+
+        A box with west > east crosses the antimeridian. Returns
+        {"mode": "events" | "clusters", "total": n, "events" | "clusters": [...]}.
+        Without a zoom there is nothing to cluster for, so at most max_points
+        events are returned and "truncated" says whether some were left out.
+        """
+        data = self._index()
+        west, south, east, north = (float(v) for v in bbox)
+        south, north = max(south, -90.0), min(north, 90.0)
+        boxes = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+
+        found = []
+        for box_west, box_east in boxes:
+            positions = self._candidates(data, south, box_west, north, box_east)
+            lat, lon = data["lat"][positions], data["lon"][positions]
+            mask = (lat >= south) & (lat <= north) & (lon >= box_west) & (lon <= box_east)
+            if start_year is not None:
+                mask &= data["year"][positions] >= int(start_year)
+            if end_year is not None:
+                mask &= data["year"][positions] <= int(end_year)
+            if disaster_types:
+                wanted = [data["types"].index(t) for t in disaster_types if t in data["types"]]
+                mask &= np.isin(data["type"][positions], wanted)
+            found.append(positions[mask])
+        positions = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+        if zoom is None:
+            return {"mode": "events", "total": len(positions), "truncated": len(positions) > max_points,
+                    "events": self._events(data, positions[:max_points])}
+        if len(positions) <= max_points:
+            return {"mode": "events", "total": len(positions), "events": self._events(data, positions)}
+        zoom = min(max(int(zoom), 0), MAX_ZOOM)
+        return {"mode": "clusters", "total": len(positions), "clusters": self._clusters(data, positions, zoom)}
+
+    def _events(self, data, positions):
+        types = np.asarray(data["types"], dtype=object)
+        columns = [
+            data["id"][positions].tolist(),
+            types[data["type"][positions]].tolist(),
+            data["year"][positions].tolist(),
+            data["lat"][positions].tolist(),
+            data["lon"][positions].tolist(),
+            [None if v != v else v for v in data["intensity"][positions].tolist()],
+            data["country"][positions].tolist(),
+        ]
+        return [dict(zip(EVENT_FIELDS, values)) for values in zip(*columns)]
+
+    def _clusters(self, data, positions, zoom):
+        size = 360.0 / (2 ** zoom) / 256 * CLUSTER_PIXELS
+        lat, lon = data["lat"][positions], data["lon"][positions]
+        rows = np.floor((lat + 90) / size).astype(np.int64)
+        cols = np.floor((lon + 180) / size).astype(np.int64)
+        keys = rows * (int(360 / size) + 1) + cols
+        cluster_keys, members = np.unique(keys, return_inverse=True)
+        n = len(cluster_keys)
+        counts = np.bincount(members, minlength=n)
+        mean_lat = np.bincount(members, weights=lat, minlength=n) / counts
+        mean_lon = np.bincount(members, weights=lon, minlength=n) / counts
+        type_counts = np.zeros((n, len(data["types"])), dtype=np.int64)
+        np.add.at(type_counts, (members, data["type"][positions]), 1)
+
+        return [
+            {
+                "Latitude": round(la, 4),
+                "Longitude": round(lo, 4),
+                "count": count,
+                "types": {t: c for t, c in zip(data["types"], by_type) if c},
+            }
+            for la, lo, count, by_type in zip(mean_lat.tolist(), mean_lon.tolist(), counts.tolist(), type_counts.tolist())
+        ]
@@ -0,0 +1,227 @@
+import csv
+import os
+import threading
+
+import numpy as np
+
+from query_catalog import UnknownOption
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATE_COSTS_CSV = os.environ.get("STATE_COSTS_CSV", os.path.join(REPO_ROOT, "datasets", "state-cost-data.csv"))
+
+TABLES = ("State", "StateEconomicTotals")
+
+# The row of the cost file that holds the national totals rather than a state
+NATIONAL_CODE = "US"
+
+ECONOMIC_COLUMNS = ("GDP", "GDPGrowth", "PersonalIncome", "PersonalIncomeGrowth")
+# normalize -> the StateEconomicTotals column costs are divided by
+NORMALIZATIONS = {"gdp": "GDP", "personalIncome": "PersonalIncome"}
+# Growth series costs are correlated with
+GROWTH_COLUMNS = ("GDPGrowth", "PersonalIncomeGrowth")
+# Fewer states than this leave a correlation undefined (null)
+MIN_CORRELATION_STATES = 3
+
+
+class UnknownHazard(ValueError):
+    pass
+
+
+class StateCosts:
+    """Per-state hazard costs from datasets/state-cost-data.csv, as NumPy arrays.
+
+    The cost file is a states x hazards matrix; it is read once, together
+    with StateEconomicTotals as a (column, state, year) array aligned to
+    the same state order. A request is then fancy indexing into the matrix,
+    a NaN-aware mean over a slice of years and a few reductions, with no
+    per-state Python loop until the rows are built.
+    """
+
+    def __init__(self, get_connection, path=STATE_COSTS_CSV):
+        self._get_connection = get_connection
+        self._path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def load(self):
+        with open(self._path, newline="") as f:
+            reader = csv.reader(f)
+            hazards = [name.strip() for name in next(reader)[1:]]
+            rows = [row for row in reader if row]
+        codes = [row[0].strip().upper() for row in rows]
+        matrix = np.array([[float(v) if v.strip() else np.nan for v in row[1:]] for row in rows], dtype=np.float64)
+
+        national = None
+        if NATIONAL_CODE in codes:
+            i = codes.index(NATIONAL_CODE)
+            national = matrix[i]
+            matrix = np.delete(matrix, i, axis=0)
+            del codes[i]
+
+        connection = self._get_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT StateCode, StateName FROM State")
+            names = {code.upper(): name for code, name in cursor.fetchall()}
+            cursor.execute(f"""
+                SELECT s.StateCode, se.Year, {", ".join(f"se.{c}" for c in ECONOMIC_COLUMNS)}
+                FROM StateEconomicTotals se
+                JOIN State s ON se.StateName = s.StateName
+            """)
+            economic_rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
+
+        position = {code: i for i, code in enumerate(codes)}
+        economic_rows = [row for row in economic_rows if row[0].upper() in position and row[1] is not None]
+        years = np.unique(np.array([int(row[1]) for row in economic_rows], dtype=np.int64))
+        economic = np.full((len(ECONOMIC_COLUMNS), len(codes), len(years)), np.nan)
+        if economic_rows:
+            state_at = np.array([position[row[0].upper()] for row in economic_rows])
+            year_at = np.searchsorted(years, [int(row[1]) for row in economic_rows])
+            values = np.array([[np.nan if v is None else float(v) for v in row[2:]] for row in economic_rows])
+            economic[:, state_at, year_at] = values.T
+
+        lookup = {code.lower(): i for i, code in enumerate(codes)}
+        lookup.update({name.lower(): position[code] for code, name in names.items() if code in position})
+        data = {
+            "hazards": hazards,
+            "hazardIndex": {name.lower(): i for i, name in enumerate(hazards)},
+            "codes": np.array(codes, dtype=object),
+            "names": np.array([names.get(code) for code in codes], dtype=object),
+            "lookup": lookup,
+            "costs": matrix,
+            "national": national,
+            "years": years,
+            "economic": economic,
+        }
+        with self._lock:
+            self._data = data
+        return matrix.shape
+
+    def reset(self):
+        # Forget the loaded arrays; the next query reloads them
+        with self._lock:
+            self._data = None
+
+    def _arrays(self):
+        with self._lock:
+            data = self._data
+        if data is None:
+            self.load()
+            with self._lock:
+                data = self._data
+        return data
+
+    def query(self, states=None, hazards=None, normalize=None, start_year=None, end_year=None):
+        """Rankings and correlations for a subset of states and hazards.
+
+        `states` are names or two-letter codes (all states when empty; ones
+        without cost data are left out, as in /compare_states), `hazards`
+        are column names of the cost file (all when empty). Economic figures
+        are means over start_year..end_year of StateEconomicTotals. With
+        `normalize` ("gdp" or "personalIncome") every cost is divided by that
+        mean. States are ranked by their total over the chosen hazards.
+        """
+        for field, value in (("states", states), ("hazards", hazards)):
+            if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+                raise UnknownOption(f"{field} must be a list of names")
+        try:
+            start_year = int(start_year) if start_year is not None else None
+            end_year = int(end_year) if end_year is not None else None
+        except (TypeError, ValueError):
+            raise UnknownOption("startYear and endYear must be numbers")
+        data = self._arrays()
+        if normalize is not None and normalize not in NORMALIZATIONS:
+            raise UnknownOption(f"Unknown normalize: {normalize}")
+        if hazards:
+            unknown = [h for h in hazards if h.lower() not in data["hazardIndex"]]
+            if unknown:
+                raise UnknownHazard(f"Unknown hazard: {', '.join(unknown)}")
+            columns = np.array(list(dict.fromkeys(data["hazardIndex"][h.lower()] for h in hazards)))
+        else:
+            columns = np.arange(len(data["hazards"]))
+        if states:
+            found = [data["lookup"].get(s.lower()) for s in states]
+            rows = np.array(list(dict.fromkeys(i for i in found if i is not None)), dtype=np.int64)
+        else:
+            rows = np.arange(len(data["codes"]))
+        names = [data["hazards"][i] for i in columns]
+
+        # Mean of each economic column over the requested years, per state
+        years = data["years"]
+        lo = np.searchsorted(years, start_year, side="left") if start_year is not None else 0
+        hi = np.searchsorted(years, end_year, side="right") if end_year is not None else len(years)
+        window = data["economic"][:, rows, lo:hi]
+        counts = np.isfinite(window).sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, np.nansum(window, axis=2) / counts, np.nan)
+
+        raw = data["costs"][np.ix_(rows, columns)]
+        raw_total = raw.sum(axis=1)
+        costs, total = raw, raw_total
+        if normalize is not None:
+            denominator = means[ECONOMIC_COLUMNS.index(NORMALIZATIONS[normalize])]
+            denominator = np.where(denominator > 0, denominator, np.nan)
+            costs = raw / denominator[:, None]
+            total = raw_total / denominator
+
+        # Highest total first; states without a total (no economic data to normalize by) last
+        order = np.lexsort((np.arange(len(rows)), -np.nan_to_num(total, nan=-np.inf)))
+        national = data["national"]
+        national_total = national[columns].sum() if national is not None else np.nan
+
+        columns_out = {
+            "StateCode": data["codes"][rows][order].tolist(),
+            "StateName": data["names"][rows][order].tolist(),
+            "Total": _floats(total[order]),
+        }
+        for j, name in enumerate(names):
+            columns_out[name] = _floats(costs[order, j])
+        if normalize is not None:
+            columns_out["RawTotal"] = _floats(raw_total[order])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            columns_out["ShareOfNational"] = _floats(raw_total[order] / national_total)
+        for k, column in enumerate(ECONOMIC_COLUMNS):
+            columns_out[column] = _floats(means[k][order])
+        ranking = [{"Rank": rank, **dict(zip(columns_out, values))}
+                   for rank, values in enumerate(zip(*columns_out.values()), start=1)]
+
+        return {
+            "hazards": names,
+            "normalize": normalize,
+            "years": [int(years[lo]), int(years[hi - 1])] if hi > lo else None,
+            "national": None if national is None else dict(
+                zip(names + ["Total"], _floats(np.append(national[columns], national_total)))),
+            "ranking": ranking,
+            "correlations": correlations(np.column_stack([costs, total]), names + ["Total"], means),
+        }
+
+
+def correlations(values, names, means):
+    """Pearson r of each column of `values` (states x n) against each growth series.
+
+    Only states with every value and the growth figure are used; a column
+    with no variance over them, or fewer than MIN_CORRELATION_STATES
+    states, has a null r.
+    """
+    result = {}
+    for column in GROWTH_COLUMNS:
+        growth = means[ECONOMIC_COLUMNS.index(column)]
+        keep = np.isfinite(growth) & np.isfinite(values).all(axis=1)
+        n = int(keep.sum())
+        r = np.full(values.shape[1], np.nan)
+        if n >= MIN_CORRELATION_STATES:
+            x = values[keep] - values[keep].mean(axis=0)
+            y = growth[keep] - growth[keep].mean()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                r = (x.T @ y) / np.sqrt((x * x).sum(axis=0) * (y @ y))
+        result[column] = dict(zip(names, _floats(r)), States=n)
+    return result
+
+
+def _floats(values):
+    # NaN (x != x) becomes JSON null
+    return [None if v != v else v for v in np.asarray(values, dtype=np.float64).tolist()]
@@ -0,0 +1,45 @@
+# Sections of a US state profile: name -> (fetch, sql). The sections are
+# independent, so async callers may run them concurrently.
+PROFILE_QUERIES = {
+    "overview": ("one", "SELECT * FROM State WHERE StateName = %s"),
+    "economicGrowth": ("all", """
+        SELECT * FROM StateIndustryGrowth 
+        WHERE StateName = %s 
+        ORDER BY Year
+    """),
+    "economicTotals": ("all", """
+        SELECT * FROM StateEconomicTotals 
+        WHERE StateName = %s 
+        ORDER BY Year
+    """),
+    "disasters": ("all", """
+        SELECT sd.* 
+        FROM StateDisasters sd
+        JOIN State s ON sd.StateCode = s.StateCode
+        WHERE s.StateName = %s
+        ORDER BY sd.Year DESC
+    """),
+}
+
+# The same sections for several states at once (see batch.py)
+BATCH_PROFILE_QUERIES = {
+    "overview": "SELECT * FROM State WHERE StateName IN ({states})",
+    "economicGrowth": """
+        SELECT * FROM StateIndustryGrowth
+        WHERE StateName IN ({states})
+        ORDER BY Year
+    """,
+    "economicTotals": """
+        SELECT * FROM StateEconomicTotals
+        WHERE StateName IN ({states})
+        ORDER BY Year
+    """,
+    # StateName is only selected to split the rows; it is dropped again
+    "disasters": """
+        SELECT s.StateName AS BatchStateName, sd.*
+        FROM StateDisasters sd
+        JOIN State s ON sd.StateCode = s.StateCode
+        WHERE s.StateName IN ({states})
+        ORDER BY sd.Year DESC
+    """,
+}
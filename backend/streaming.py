@@ -0,0 +1,71 @@
+import os
+
+from flask import Response
+
+
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", "500"))
+
+MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def stream_format(data):
+    """Streaming format requested in a JSON body: {"stream": "ndjson" | "json" | true}."""
+    requested = data.get('stream')
+    if requested is True:
+        return "ndjson"
+    return requested if requested in MIMETYPES else None
+
+
+def cursor_chunks(connection, cursor, chunk_rows=STREAM_CHUNK_ROWS):
+    # Pulls rows off an unbuffered cursor a chunk at a time; the connection
+    # stays checked out until the client has read everything (or went away)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            cursor.close()
+            connection.close()
+        except Exception:
+            # Unread rows left on an aborted stream; don't hand this socket back
+            if hasattr(connection, "discard"):
+                connection.discard()
+
+
+def list_chunks(rows, chunk_rows=STREAM_CHUNK_ROWS):
+    for start in range(0, len(rows), chunk_rows):
+        yield rows[start:start + chunk_rows]
+
+
+def encode_chunk(rows, fmt, dumps, first):
+    """One chunk of an NDJSON stream or of a JSON array (`first` chunk has no leading comma)."""
+    if fmt == "ndjson":
+        return "".join(dumps(row) + "\n" for row in rows)
+    body = ",".join(dumps(row) for row in rows)
+    return body if first else "," + body
+
+
+def encode_chunks(chunks, fmt, dumps, keep=None):
+    """Serialize row chunks as NDJSON lines or as one JSON array written piecemeal."""
+    first = True
+    if fmt == "json":
+        yield "["
+    for rows in chunks:
+        if keep is not None:
+            rows = [row for row in rows if keep(row)]
+        if not rows:
+            continue
+        yield encode_chunk(rows, fmt, dumps, first)
+        first = False
+    if fmt == "json":
+        yield "]"
+
+
+def streaming_response(chunks, fmt, dumps, keep=None):
+    return Response(encode_chunks(chunks, fmt, dumps, keep), mimetype=MIMETYPES[fmt])
@@ -0,0 +1,209 @@
+"""Materialized rollups of the disaster and economic tables.
+
+DisasterSummary holds one row per (CountryName, Year, Type) with the event
+count and summed damage. EconomicSnapshot holds one row per (CountryName, Year)
+with every national and sectoral indicator side by side. Both are keyed on
+their grouping columns, so the dashboard aggregates become primary-key range
+scans instead of NaturalDisaster JOIN DirectDamage + GROUP BY.
+
+The tables are rebuilt by the loader (python -m etl) after it writes the
+source tables, optionally for just the countries that changed. Set
+SUMMARY_TABLES=1 to have the API read from them.
+"""
+import os
+from functools import lru_cache
+
+from indicators import INDICATORS
+from query_catalog import order_clause
+
+
+SUMMARY_TABLES = os.environ.get("SUMMARY_TABLES", "0") == "1"
+
+NATIONAL_COLUMNS = [c for _, t, c in INDICATORS.values() if t == "NationalEconomicImpact"]
+SECTORAL_COLUMNS = [c for _, t, c in INDICATORS.values() if t == "SectoralEconomicImpact"]
+
+# Summary table -> the source tables it is built from
+SOURCES = {
+    "DisasterSummary": ("NaturalDisaster", "DirectDamage"),
+    "EconomicSnapshot": ("NationalEconomicImpact", "SectoralEconomicImpact"),
+}
+
+# Summary table -> INSERT ... SELECT; {country_filter} restricts it to some countries
+REFRESH_SQL = {
+    "DisasterSummary": """
+        INSERT INTO DisasterSummary
+            (CountryName, Year, Type, DisasterCount, Deaths, Injuries, TotalDamage, HousesDestroyed)
+        SELECT
+            nd.CountryName, nd.Year, nd.Type, COUNT(*),
+            SUM(dd.Deaths), SUM(dd.Injuries), SUM(dd.TotalDamage), SUM(dd.HousesDestroyed)
+        FROM NaturalDisaster nd
+        LEFT JOIN DirectDamage dd ON nd.DisasterID = dd.DisasterID
+        WHERE nd.CountryName IS NOT NULL AND nd.Year IS NOT NULL AND nd.Type IS NOT NULL {country_filter}
+        GROUP BY nd.CountryName, nd.Year, nd.Type
+    """,
+    "EconomicSnapshot": f"""
+        INSERT INTO EconomicSnapshot
+            (CountryName, Year, {", ".join(NATIONAL_COLUMNS + SECTORAL_COLUMNS)}, HasNational, HasSectoral)
+        SELECT
+            k.CountryName, k.Year,
+            {", ".join([f"ne.{c}" for c in NATIONAL_COLUMNS] + [f"se.{c}" for c in SECTORAL_COLUMNS])},
+            CASE WHEN ne.CountryName IS NULL THEN 0 ELSE 1 END,
+            CASE WHEN se.CountryName IS NULL THEN 0 ELSE 1 END
+        FROM (
+            SELECT CountryName, Year FROM NationalEconomicImpact WHERE 1 = 1 {{country_filter}}
+            UNION
+            SELECT CountryName, Year FROM SectoralEconomicImpact WHERE 1 = 1 {{country_filter}}
+        ) k
+        LEFT JOIN NationalEconomicImpact ne ON ne.CountryName = k.CountryName AND ne.Year = k.Year
+        LEFT JOIN SectoralEconomicImpact se ON se.CountryName = k.CountryName AND se.Year = k.Year
+    """,
+}
+
+
+# Summary table -> (column the country filter applies to, how many times the filter appears)
+COUNTRY_FILTER = {
+    "DisasterSummary": ("nd.CountryName", 1),
+    "EconomicSnapshot": ("CountryName", 2),
+}
+
+
+def summaries_for(tables):
+    """Summary tables that need a refresh after `tables` were written."""
+    return [summary for summary, sources in SOURCES.items() if set(sources) & set(tables)]
+
+
+def refresh_summaries(connection, summaries=tuple(SOURCES), countries=None):
+    """Rebuild `summaries`, for all countries or just `countries`, in one transaction.
+
+    Returns {summary table: rows written}.
+    """
+    countries = None if countries is None else sorted(set(countries))
+    if countries is not None and not countries:
+        return {}
+    counts = {}
+    cursor = connection.cursor()
+    try:
+        for summary in summaries:
+            if countries is None:
+                cursor.execute(f"DELETE FROM {summary}")
+                cursor.execute(REFRESH_SQL[summary].format(country_filter=""))
+            else:
+                placeholders = ", ".join(["%s"] * len(countries))
+                cursor.execute(f"DELETE FROM {summary} WHERE CountryName IN ({placeholders})", countries)
+                column, repeats = COUNTRY_FILTER[summary]
+                sql = REFRESH_SQL[summary].format(country_filter=f"AND {column} IN ({placeholders})")
+                cursor.execute(sql, countries * repeats)
+            counts[summary] = cursor.rowcount
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return counts
+
+
+def weighted_expression(alias, weight):
+    """AVG over disaster rows, computed from per-group counts.
+
+    Averaging an indicator over every joined disaster row is the same as
+    weighting each country-year's value by its number of disasters.
+    """
+    column = INDICATORS[alias][2]
+    return f"SUM({weight} * {column}) / SUM(CASE WHEN {column} IS NOT NULL THEN {weight} END) AS {alias}"
+
+
+def global_stats_summary_query(start_year, end_year, disaster_types, aliases, sort_option):
+    """/global_stats "Disaster Types" rows from DisasterSummary + EconomicSnapshot."""
+    selects = "".join(f", {weighted_expression(alias, 'ds.DisasterCount')}" for alias in aliases)
+    sql = f"""
+        SELECT ds.Type AS DisasterType, ds.Year{selects}
+        FROM DisasterSummary ds
+        LEFT JOIN EconomicSnapshot es ON ds.CountryName = es.CountryName AND ds.Year = es.Year
+        WHERE ds.Year BETWEEN %s AND %s
+    """
+    params = [start_year, end_year]
+    if disaster_types:
+        sql += f" AND ds.Type IN ({','.join(['%s'] * len(disaster_types))})"
+        params.extend(disaster_types)
+    sql += " GROUP BY ds.Type, ds.Year " + order_clause(sort_option, aliases, "ds")
+    return sql, params
+
+
+@lru_cache(maxsize=256)
+def comparison_summary_sql(aliases, n_countries, n_types):
+    """CompareCountryStats from the summaries; same rows as compare_stats.comparison_sql.
+
+    The original joins NationalEconomicImpact to SectoralEconomicImpact and
+    LEFT JOINs disasters of the selected types, keeping years with no
+    disasters at all. So a country-year weighs as many rows as it has
+    selected disasters, one row if it has none of any type, and zero rows if
+    it only has disasters of other types.
+
+    Parameters: types, countries, start, end, countries, start, end.
+    """
+    countries = ", ".join(["%s"] * n_countries)
+    types = ", ".join(["%s"] * n_types)
+    indicator_sql = "".join(f"{weighted_expression(alias, 'w')},\n            " for alias in aliases)
+    return f"""
+        SELECT
+            CountryName,
+            {indicator_sql}CAST(SUM(Selected) AS SIGNED) AS TotalDisasters,
+            SUM(SelectedDeaths) AS TotalDeaths
+        FROM (
+            SELECT
+                es.*,
+                COALESCE(ds.Selected, 0) AS Selected,
+                ds.SelectedDeaths,
+                CASE WHEN ds.Selected > 0 THEN ds.Selected WHEN ds.AllTypes IS NULL THEN 1 ELSE 0 END AS w
+            FROM EconomicSnapshot es
+            LEFT JOIN (
+                SELECT
+                    CountryName, Year,
+                    SUM(IsSelected * DisasterCount) AS Selected,
+                    SUM(DisasterCount) AS AllTypes,
+                    SUM(CASE WHEN IsSelected = 1 THEN Deaths END) AS SelectedDeaths
+                FROM (
+                    SELECT CountryName, Year, DisasterCount, Deaths,
+                           CASE WHEN Type IN ({types}) THEN 1 ELSE 0 END AS IsSelected
+                    FROM DisasterSummary
+                    WHERE CountryName IN ({countries}) AND Year BETWEEN %s AND %s
+                ) typed
+                GROUP BY CountryName, Year
+            ) ds ON ds.CountryName = es.CountryName AND ds.Year = es.Year
+            WHERE es.CountryName IN ({countries})
+              AND es.Year BETWEEN %s AND %s
+              AND es.HasNational = 1 AND es.HasSectoral = 1
+        ) weighted
+        GROUP BY CountryName
+        HAVING SUM(w) > 0
+        ORDER BY CountryName
+    """
+
+
+# SUM over an INT column is DECIMAL on MySQL (a string in JSON); CAST keeps the
+# counts integers, as COUNT(*) returns them on the raw tables
+TIMELINE_SQL = """
+    SELECT
+        Year,
+        CAST(SUM(CASE WHEN Type = 'Earthquake' THEN DisasterCount ELSE 0 END) AS SIGNED) AS Earthquake,
+        CAST(SUM(CASE WHEN Type = 'Tsunami' THEN DisasterCount ELSE 0 END) AS SIGNED) AS Tsunami,
+        CAST(SUM(CASE WHEN Type = 'Volcano' THEN DisasterCount ELSE 0 END) AS SIGNED) AS Volcano
+    FROM DisasterSummary
+    WHERE CountryName = %s AND Year >= 1960
+    GROUP BY Year
+    ORDER BY Year ASC
+"""
+
+BATCH_TIMELINE_SQL = """
+    SELECT
+        CountryName,
+        Year,
+        CAST(SUM(CASE WHEN Type = 'Earthquake' THEN DisasterCount ELSE 0 END) AS SIGNED) AS Earthquake,
+        CAST(SUM(CASE WHEN Type = 'Tsunami' THEN DisasterCount ELSE 0 END) AS SIGNED) AS Tsunami,
+        CAST(SUM(CASE WHEN Type = 'Volcano' THEN DisasterCount ELSE 0 END) AS SIGNED) AS Volcano
+    FROM DisasterSummary
+    WHERE CountryName IN ({countries}) AND Year >= 1960
+    GROUP BY CountryName, Year
+    ORDER BY Year ASC
+"""
@@ -1,6 +1,14 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from etl import sources  # noqa: E402
+
 # cols = ["Country Name", "Country Code", "Indicator Name", "Indicator Code"] + [str(year) for year in range(1960, 2024)]
+ID_COLS = ["Country Name", "Country Code", "Indicator Name", "Indicator Code"]
 
 def parse_tl_csv(filepath): # timeline csv
     df = pd.read_csv(filepath)
@@ -14,5 +22,17 @@ def parse_tl_csv(filepath): # timeline csv
 
     df_converted["Year"] = pd.to_numeric(df_converted["Year"], errors="coerce").astype("Int64")
     df_converted = df_converted.dropna(subset=["Value"])
-    
+
     return df_converted
+
+
+def iter_tl_csv(filepath, chunksize=2000, value_dtype="float32"):
+    """Streaming parse_tl_csv: yields long-format batches of at most chunksize wide rows.
+
+    Each batch has the same columns as parse_tl_csv (ID_COLS, Year, Value) with
+    categorical id columns and float32 values, and only non-null cells, ordered
+    by row then year. This is the loader's own reader (backend/etl/sources.py);
+    join the batches with sources.concat_timeline to keep the categories. Pass
+    value_dtype="float64" when the exact published values are needed.
+    """
+    return sources.iter_timeline(filepath, id_columns=ID_COLS, chunksize=chunksize, value_dtype=value_dtype)
@@ -5,4 +5,156 @@ CREATE TABLE Location (
     Name VARCHAR(255),
     Country VARCHAR(100),
     Region VARCHAR(100)
-);
\ No newline at end of file
+);
+
+CREATE TABLE Country (
+    CountryName VARCHAR(100) PRIMARY KEY,
+    IncomeGroup VARCHAR(255),
+    CountryCode VARCHAR(255),
+    Region VARCHAR(255)
+);
+
+CREATE TABLE NaturalDisaster (
+    DisasterID INT PRIMARY KEY,
+    CountryName VARCHAR(100),
+    Type VARCHAR(100),
+    Year INT,
+    Intensity FLOAT,
+    -- Event coordinates from the NOAA files, for the map's viewport queries.
+    -- Existing databases: ALTER TABLE NaturalDisaster ADD Latitude DOUBLE, ADD Longitude DOUBLE;
+    Latitude DOUBLE,
+    Longitude DOUBLE,
+    FOREIGN KEY (CountryName) REFERENCES Country(CountryName)
+);
+
+CREATE TABLE DirectDamage (
+    DamageID INT PRIMARY KEY,
+    DisasterID INT,
+    CountryName VARCHAR(100),
+    TotalDamage INT,
+    TotalDamageScale INT,
+    HousesDestroyed INT,
+    HousesDestroyedScale INT,
+    Injuries INT,
+    Deaths INT,
+    FOREIGN KEY (DisasterID) REFERENCES NaturalDisaster(DisasterID),
+    FOREIGN KEY (CountryName) REFERENCES Country(CountryName)
+);
+
+-- (CountryName, Year) keys are what the loader upserts on
+CREATE TABLE NationalEconomicImpact (
+    CountryName VARCHAR(100),
+    Year INT,
+    GDPAnnualPercentGrowth DOUBLE,
+    CPI_2010_100 DOUBLE,
+    ExportsAnnualPercentGrowth DOUBLE,
+    ImportAnnualPercentGrowth DOUBLE,
+    UnemploymentPercent DOUBLE,
+    PRIMARY KEY (CountryName, Year),
+    FOREIGN KEY (CountryName) REFERENCES Country(CountryName)
+);
+
+CREATE TABLE SectoralEconomicImpact (
+    CountryName VARCHAR(100),
+    Year INT,
+    AgricultureAnnualPercentGrowth DOUBLE,
+    IndustryAnnualPercentGrowth DOUBLE,
+    ManufacturingAnnualPercentGrowth DOUBLE,
+    ServiceAnnualPercentGrowth DOUBLE,
+    PRIMARY KEY (CountryName, Year),
+    FOREIGN KEY (CountryName) REFERENCES Country(CountryName)
+);
+
+-- Rollups maintained by the loader (backend/summaries.py); never written by the API
+CREATE TABLE DisasterSummary (
+    CountryName VARCHAR(100),
+    Year INT,
+    Type VARCHAR(100),
+    DisasterCount INT,
+    Deaths BIGINT,
+    Injuries BIGINT,
+    TotalDamage BIGINT,
+    HousesDestroyed BIGINT,
+    PRIMARY KEY (CountryName, Year, Type)
+);
+
+CREATE TABLE EconomicSnapshot (
+    CountryName VARCHAR(100),
+    Year INT,
+    GDPAnnualPercentGrowth DOUBLE,
+    CPI_2010_100 DOUBLE,
+    ExportsAnnualPercentGrowth DOUBLE,
+    ImportAnnualPercentGrowth DOUBLE,
+    UnemploymentPercent DOUBLE,
+    AgricultureAnnualPercentGrowth DOUBLE,
+    IndustryAnnualPercentGrowth DOUBLE,
+    ManufacturingAnnualPercentGrowth DOUBLE,
+    ServiceAnnualPercentGrowth DOUBLE,
+    HasNational TINYINT,
+    HasSectoral TINYINT,
+    PRIMARY KEY (CountryName, Year)
+);
+
+-- /global_stats groups the summary by year range and type across all countries
+CREATE INDEX idx_disastersummary_year_type ON DisasterSummary (Year, Type);
+
+CREATE TABLE State (
+    StateCode CHAR(2) PRIMARY KEY,
+    StateName VARCHAR(100) UNIQUE
+);
+
+CREATE TABLE StateEconomicTotals (
+    StateName VARCHAR(100),
+    Year INT,
+    GDP DOUBLE,
+    GDPGrowth DOUBLE,
+    PersonalIncome DOUBLE,
+    PersonalIncomeGrowth DOUBLE,
+    PRIMARY KEY (StateName, Year)
+);
+
+CREATE TABLE StateIndustryGrowth (
+    StateName VARCHAR(100),
+    Year INT,
+    AgriculturePercentGrowth DOUBLE,
+    ManufacturingPercentGrowth DOUBLE,
+    RealEstatePercentGrowth DOUBLE,
+    PRIMARY KEY (StateName, Year)
+);
+
+CREATE TABLE StateDisasters (
+    DisasterID INT PRIMARY KEY AUTO_INCREMENT,
+    StateCode CHAR(2),
+    Year INT,
+    DisasterType VARCHAR(100),
+    FOREIGN KEY (StateCode) REFERENCES State(StateCode)
+);
+
+CREATE TABLE Users (
+    UserID INT PRIMARY KEY AUTO_INCREMENT,
+    Username VARCHAR(100) UNIQUE,
+    Email VARCHAR(255) UNIQUE,
+    PasswordHash VARCHAR(255)
+);
+
+CREATE TABLE SavedGraphs (
+    GraphID INT PRIMARY KEY AUTO_INCREMENT,
+    Username VARCHAR(100),
+    GraphTitle VARCHAR(255),
+    Filters JSON,
+    Page VARCHAR(100)
+);
+
+CREATE TABLE Logs (
+    LogID INT PRIMARY KEY AUTO_INCREMENT,
+    ActionType VARCHAR(20),
+    GraphID INT,
+    Username VARCHAR(100),
+    Timestamp DATETIME,
+    Details TEXT
+);
+
+
+-- Saved graphs are always read per user in GraphID order (keyset pagination
+-- on /saved_graphs), so this turns each page into an index range scan
+CREATE INDEX idx_savedgraphs_user_graph ON SavedGraphs (Username, GraphID);